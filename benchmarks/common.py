@@ -0,0 +1,138 @@
+"""
+基准测试脚本的公共工具：Django初始化、临时数据库、计时统计与结果输出
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'travel_analysis.settings')
+
+
+def parse_rows(value):
+    """解析行数参数，支持 10k / 1M / 10M 形式"""
+    value = str(value).strip().lower()
+    multiplier = 1
+    if value.endswith('k'):
+        multiplier, value = 1000, value[:-1]
+    elif value.endswith('m'):
+        multiplier, value = 1000000, value[:-1]
+    rows = int(float(value) * multiplier)
+    if rows <= 0:
+        raise ValueError(f"行数必须为正整数：{value}")
+    return rows
+
+
+def setup_django(temp_database=False, debug=False, quiet=True):
+    """
+    初始化Django；temp_database为True时默认数据库切换到临时SQLite文件（不影响项目的 db.sqlite3）
+    quiet为True时去掉控制台日志输出（压测中的参数错误等日志仍写入错误日志文件）
+    :return: 临时数据库路径（未使用临时数据库时为None）
+    """
+    import logging
+
+    import django
+    from django.conf import settings
+
+    db_path = None
+    if temp_database:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='travel_bench_'), 'bench.sqlite3')
+        settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': db_path}
+    settings.DEBUG = debug
+    # 测试客户端需要 testserver 主机名
+    if 'testserver' not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS:
+        settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+    django.setup()
+    if quiet:
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if type(handler) is logging.StreamHandler:
+                root.removeHandler(handler)
+    return db_path
+
+
+def use_cleaned_data(csv_path, columnar_path=None):
+    """让清洁数据加载器读取指定文件（替代 data/ 目录下的清洁数据），并清空已有缓存"""
+    from travel_app import dataset
+
+    dataset.CLEANED_DATA_PATH = csv_path
+    dataset.CLEANED_COLUMNAR_PATH = columnar_path or os.path.splitext(csv_path)[0] + '.parquet'
+    for cache in list(dataset._caches.values()):
+        cache.clear()
+
+
+def summarize(samples):
+    """耗时样本（秒）的统计：次数/平均值/分位数（毫秒）"""
+    values = np.asarray(samples, dtype=float) * 1000
+    if values.size == 0:
+        return {"n": 0}
+    return {
+        "n": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "min_ms": round(float(values.min()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def time_call(func, repeat=1, warmup=0):
+    """重复调用func并记录每次耗时（秒），返回 (耗时列表, 最后一次的返回值)"""
+    result = None
+    for _ in range(warmup):
+        result = func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return samples, result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """运行环境信息，写入结果文件便于对比不同机器/版本的结果"""
+    import pandas as pd
+    import sklearn
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def write_results(name, results, output=None):
+    """将结果写为JSON（默认 benchmarks/results/<name>-<时间戳>.json），返回文件路径"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    payload = {"benchmark": name, "environment": environment(), "results": results}
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    return output
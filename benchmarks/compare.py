@@ -0,0 +1,71 @@
+"""
+对比两次基准测试结果
+
+逐项对比两个结果JSON中的耗时类指标（*_ms / seconds）与吞吐量类指标（*_per_sec / *_rps），
+输出变化百分比，便于优化前后或不同机器之间的比较。
+
+用法：python benchmarks/compare.py 优化前.json 优化后.json [--threshold 5]
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ('_ms', 'seconds')
+HIGHER_IS_BETTER = ('_per_sec', '_rps')
+
+
+def flatten(value, prefix=''):
+    """将嵌套结果展开为 {'a.b.c': 数值}"""
+    items = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            items.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        items[prefix] = value
+    return items
+
+
+def compare(before, after, threshold=5.0):
+    """返回 [(指标, 之前, 之后, 变化百分比, 结论)]，结论为 更好/更差/持平"""
+    rows = []
+    old, new = flatten(before.get('results', before)), flatten(after.get('results', after))
+    for key in sorted(set(old) & set(new)):
+        if key.endswith(LOWER_IS_BETTER):
+            better = -1
+        elif key.endswith(HIGHER_IS_BETTER):
+            better = 1
+        else:
+            continue
+        if old[key] == 0:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100
+        verdict = '持平'
+        if abs(change) >= threshold:
+            verdict = '更好' if change * better > 0 else '更差'
+        rows.append((key, old[key], new[key], change, verdict))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对比两次基准测试结果")
+    parser.add_argument('before', help="基准结果JSON")
+    parser.add_argument('after', help="对比结果JSON")
+    parser.add_argument('--threshold', type=float, default=5.0, help="变化超过该百分比才判定为更好/更差")
+    args = parser.parse_args(argv)
+
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+
+    rows = compare(before, after, args.threshold)
+    width = max((len(row[0]) for row in rows), default=10)
+    for key, old, new, change, verdict in rows:
+        print(f"{key:<{width}}  {old:>12.3f}  {new:>12.3f}  {change:>+8.1f}%  {verdict}")
+    worse = sum(1 for row in rows if row[4] == '更差')
+    print(f"\n共 {len(rows)} 项指标，更差 {worse} 项")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+合成原始旅行数据生成器
+
+从 data/Travel details dataset.csv 按行有放回抽样，生成任意行数（如 10k / 1M / 10M）的原始数据：
+- 整行抽样，保留各字段的分布及字段之间的关联（包括缺失值和"$1,200"等原始费用格式）
+- Trip ID 重新按 1..N 编号，保证导入数据库时唯一
+- 分块写入，生成千万行数据时内存占用只与块大小有关
+
+用法：python benchmarks/generate_data.py --rows 1M --output /tmp/travel_1m.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import BASE_DIR, parse_rows
+
+DEFAULT_SOURCE_PATH = os.path.join(BASE_DIR, 'data', 'Travel details dataset.csv')
+DEFAULT_CHUNK_ROWS = 500000
+
+
+def read_source(source_path=DEFAULT_SOURCE_PATH):
+    """按原始文本读取样本数据（不做类型转换，空值保持为空字符串）"""
+    return pd.read_csv(source_path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+
+
+def generate_raw_data(rows, output_path, source_path=DEFAULT_SOURCE_PATH, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """生成rows行合成原始数据并写入output_path，返回写入的行数"""
+    source = read_source(source_path)
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+
+    written = 0
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        while written < rows:
+            n = min(chunk_rows, rows - written)
+            chunk = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+            chunk['Trip ID'] = np.arange(written + 1, written + n + 1)
+            chunk.to_csv(f, index=False, header=(written == 0))
+            written += n
+    os.replace(tmp_path, output_path)
+    return written
+
+
+def ensure_raw_data(rows, directory, seed=42):
+    """在directory下生成（或复用已生成的）指定行数的合成原始数据，返回文件路径"""
+    path = os.path.join(directory, f"travel_raw_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        generate_raw_data(rows, path, seed=seed)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按原始数据分布生成指定行数的合成旅行数据")
+    parser.add_argument('--rows', default='10k', help="生成行数，如 10k / 1M / 10M")
+    parser.add_argument('--output', required=True, help="输出CSV路径")
+    parser.add_argument('--source', default=DEFAULT_SOURCE_PATH, help="样本数据CSV路径")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子（相同种子生成相同数据）")
+    args = parser.parse_args(argv)
+
+    rows = parse_rows(args.rows)
+    started = time.perf_counter()
+    written = generate_raw_data(rows, args.output, args.source, args.seed)
+    print(f"已生成 {written} 行合成数据：{args.output}（耗时 {time.perf_counter() - started:.1f}s）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+吞吐量/延迟压测
+
+按加权的请求组合并发访问各接口，输出总体与各接口的吞吐量（请求/秒）、延迟分位数和状态码分布。
+- 默认在进程内通过Django测试客户端发送请求（合成数据 + 临时数据库，测量应用本身的处理能力）
+- 指定 --base-url 时压测已运行的服务（如 gunicorn），数据由该服务自身决定
+
+结果写入 benchmarks/results/load-<时间戳>.json（或 --output 指定的路径）。
+
+用法：python benchmarks/load_test.py --rows 1M --concurrency 16 --duration 30
+      python benchmarks/load_test.py --base-url http://127.0.0.1:8000 --concurrency 32 --requests 20000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from common import parse_rows, setup_django, use_cleaned_data, write_results
+from loadgen import BenchRequest, report, run_load, transport_factory
+
+# (权重, 请求)：以可视化数据接口与单条预测为主
+DEFAULT_MIX = [
+    (4, BenchRequest('visualization_api', 'GET', '/api/visualization/')),
+    (2, BenchRequest('visualization_api:season', 'GET', '/api/visualization/', {'season': 'Summer'})),
+    (2, BenchRequest('visualization_api:region', 'GET', '/api/visualization/', {'region': 'Asia'})),
+    (1, BenchRequest('visualization_page', 'GET', '/visualization/')),
+    (6, BenchRequest('predict_api', 'POST', '/predict-api/',
+                     data={'traveler_age': '30', 'accommodation_cost': '1000', 'transportation_cost': '500'})),
+    (1, BenchRequest('predict_batch_api', 'POST', '/predict-api/batch/',
+                     data=[[25 + i % 40, 200 + i * 37 % 2500, 100 + i * 53 % 1200] for i in range(100)],
+                     content_type='application/json')),
+    (2, BenchRequest('cost_calculator', 'POST', '/cost-calculator/',
+                     data={'duration': '7', 'acc_cost': '300', 'trans_cost': '1500'})),
+]
+# 压测真实服务时费用计算器表单受CSRF保护，改为访问页面
+HTTP_REPLACEMENTS = {
+    'cost_calculator': BenchRequest('cost_calculator:page', 'GET', '/cost-calculator/'),
+}
+
+
+def build_sequence(mix, length=1000, seed=42):
+    """按权重生成请求序列（打乱顺序，使各接口交错出现）"""
+    sequence = [request for weight, request in mix for _ in range(weight)]
+    sequence = sequence * max(1, length // len(sequence))
+    random.Random(seed).shuffle(sequence)
+    return sequence
+
+
+def prepare_local_data(rows, seed, workdir):
+    """进程内压测：生成合成数据并让可视化视图读取其清洁结果"""
+    import contextlib
+    import io
+
+    import data_preprocess
+    from generate_data import ensure_raw_data
+
+    raw_path = ensure_raw_data(rows, workdir, seed)
+    output = os.path.join(workdir, 'cleaned_travel_data.csv')
+    columnar = os.path.join(workdir, 'cleaned_travel_data.parquet')
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_preprocess.preprocess_file(raw_path, output, columnar)
+    use_cleaned_data(output, columnar)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="并发压测各接口的吞吐量与延迟")
+    parser.add_argument('--base-url', help="已运行服务的地址（不指定时在进程内压测）")
+    parser.add_argument('--rows', default='10k', help="进程内压测使用的合成数据行数")
+    parser.add_argument('--seed', type=int, default=42, help="合成数据与请求顺序的随机种子")
+    parser.add_argument('--concurrency', type=int, default=8, help="并发工作线程数")
+    parser.add_argument('--requests', type=int, help="总请求数")
+    parser.add_argument('--duration', type=float, help="压测时长（秒），未指定总请求数时默认10秒")
+    parser.add_argument('--warmup', type=int, default=50, help="正式压测前的预热请求数（不计入结果）")
+    parser.add_argument('--endpoint', action='append', help="只压测指定名称的请求（可重复指定）")
+    parser.add_argument('--output', help="结果JSON路径（默认 benchmarks/results/load-<时间戳>.json）")
+    args = parser.parse_args(argv)
+
+    mix = DEFAULT_MIX
+    if args.base_url:
+        mix = [(weight, HTTP_REPLACEMENTS.get(request.name, request)) for weight, request in mix]
+    if args.endpoint:
+        mix = [(weight, request) for weight, request in mix if request.name in args.endpoint]
+        if not mix:
+            parser.error(f"未知的请求名称：{', '.join(args.endpoint)}")
+    duration = args.duration if args.duration is not None or args.requests else 10.0
+
+    workdir, db_path = None, None
+    if not args.base_url:
+        db_path = setup_django(temp_database=True)
+        workdir = tempfile.mkdtemp(prefix='travel_bench_')
+    try:
+        if workdir is not None:
+            prepare_local_data(parse_rows(args.rows), args.seed, workdir)
+        factory = transport_factory(args.base_url)
+        sequence = build_sequence(mix, seed=args.seed)
+
+        if args.warmup:
+            run_load(sequence, concurrency=args.concurrency, factory=factory, total=args.warmup)
+        samples, elapsed = run_load(sequence, concurrency=args.concurrency, factory=factory,
+                                    total=args.requests, duration=duration)
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+            shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+
+    results = {
+        "target": args.base_url or "in-process",
+        "rows": None if args.base_url else parse_rows(args.rows),
+        "concurrency": args.concurrency,
+        "mix": {request.name: weight for weight, request in mix},
+        **report(samples, elapsed),
+    }
+    output = write_results('load', results, args.output)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"结果已保存到：{output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+并发压测引擎
+
+- 请求描述为 BenchRequest(name, method, path, query, data, content_type, headers)
+- 三种发送方式：进程内 Django 测试客户端（InProcessTransport，经WSGI处理器，每个线程一个Client）、
+  进程内异步测试客户端（AsgiTransport，经ASGI处理器），或真实HTTP服务（HttpTransport，传入 --base-url）
+- run_load() 用固定数量的工作线程发送请求，记录每个请求的状态码与耗时；
+  指定 rate 时按固定速率发出请求（开环），耗时从计划发送时刻算起，服务变慢时排队等待的时间也计入延迟
+"""
+import asyncio
+import http.client
+import itertools
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from common import summarize
+
+BenchRequest = namedtuple('BenchRequest', ['name', 'method', 'path', 'query', 'data', 'content_type', 'headers'])
+BenchRequest.__new__.__defaults__ = (None, None, None, None)
+
+# 单个请求的结果：started为相对压测开始的秒数
+Sample = namedtuple('Sample', ['name', 'status', 'latency', 'started', 'error'])
+
+
+class InProcessTransport:
+    """通过Django测试客户端在进程内发送请求（不经过网络，测量应用本身的处理能力）"""
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client()
+
+    def send(self, request):
+        extra = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (request.headers or {}).items()}
+        path = request.path
+        if request.query:
+            path = f"{path}?{urlencode(request.query)}"
+        if request.method == 'GET':
+            response = self.client.get(path, **extra)
+        elif request.content_type:
+            response = self.client.generic(request.method, path, _encode_body(request),
+                                           content_type=request.content_type, **extra)
+        else:
+            response = self.client.post(path, request.data or {}, **extra)
+        return response.status_code
+
+
+class AsgiTransport:
+    """通过Django异步测试客户端在进程内发送请求（经ASGI处理器，每个线程一个事件循环）"""
+
+    def __init__(self):
+        from django.test import AsyncClient
+        self.client = AsyncClient()
+        self.loop = asyncio.new_event_loop()
+
+    def send(self, request):
+        extra = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (request.headers or {}).items()}
+        path = request.path
+        if request.query:
+            path = f"{path}?{urlencode(request.query)}"
+        if request.method == 'GET':
+            call = self.client.get(path, **extra)
+        elif request.content_type:
+            call = self.client.generic(request.method, path, _encode_body(request),
+                                       content_type=request.content_type, **extra)
+        else:
+            call = self.client.post(path, request.data or {}, **extra)
+        return self.loop.run_until_complete(call).status_code
+
+
+class HttpTransport:
+    """向真实HTTP服务发送请求（每个线程一个持久连接）"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.prefix = parts.path.rstrip('/')
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=timeout)
+
+    def send(self, request):
+        path = self.prefix + request.path
+        if request.query:
+            path = f"{path}?{urlencode(request.query)}"
+        headers = dict(request.headers or {})
+        body = None
+        if request.method != 'GET':
+            if request.content_type:
+                body = _encode_body(request)
+                headers['Content-Type'] = request.content_type
+            else:
+                body = urlencode(request.data or {}).encode('utf-8')
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self.connection.request(request.method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()  # 连接异常时重建连接后抛出，由调用方记录为错误
+            raise
+        return response.status
+
+
+def _encode_body(request):
+    data = request.data
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    import json
+    return json.dumps(data).encode('utf-8')
+
+
+def transport_factory(base_url=None, asgi=False):
+    """返回创建发送器的函数（每个工作线程调用一次）"""
+    if base_url:
+        return lambda: HttpTransport(base_url)
+    return AsgiTransport if asgi else InProcessTransport
+
+
+def run_load(requests, concurrency=8, factory=InProcessTransport, total=None, duration=None, rate=None):
+    """
+    并发发送请求
+    :param requests: BenchRequest的可迭代对象（循环使用直到达到total或duration）
+    :param total: 总请求数；duration: 压测时长（秒），两者至少指定一个
+    :param rate: 目标速率（请求/秒），None表示每个工作线程收到响应后立即发送下一个请求
+    :return: (Sample列表, 实际耗时秒)
+    """
+    if total is None and duration is None:
+        raise ValueError("total和duration至少指定一个")
+    source = itertools.cycle(requests)
+    source_lock = threading.Lock()
+    state = {"issued": 0}
+    samples = []
+    samples_lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = None if duration is None else started + duration
+
+    def next_request():
+        """返回 (请求, 计划发送时刻)，已达到总数或时长时返回 (None, None)"""
+        with source_lock:
+            if total is not None and state["issued"] >= total:
+                return None, None
+            scheduled = time.perf_counter() if rate is None else started + state["issued"] / rate
+            if deadline is not None and scheduled >= deadline:
+                return None, None
+            state["issued"] += 1
+            return next(source), scheduled
+
+    def worker():
+        transport = factory()
+        local = []
+        while True:
+            request, scheduled = next_request()
+            if request is None:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent = scheduled if rate is not None else time.perf_counter()
+            status, error = None, None
+            try:
+                status = transport.send(request)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            local.append(Sample(request.name, status, time.perf_counter() - sent, sent - started, error))
+        with samples_lock:
+            samples.extend(local)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return samples, time.perf_counter() - started
+
+
+def report(samples, elapsed):
+    """汇总压测结果：总体与按请求名的吞吐量、延迟分位数、状态码分布"""
+    def block(items):
+        statuses = Counter(str(s.status) if s.error is None else 'error' for s in items)
+        # 错误：连接/发送失败或5xx（4xx是参数校验等预期结果，只计入状态码分布）
+        errors = len([s for s in items if s.error is not None or (s.status or 0) >= 500])
+        return {
+            "requests": len(items),
+            "throughput_rps": round(len(items) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency": summarize([s.latency for s in items]),
+            "status": dict(sorted(statuses.items())),
+            "errors": errors,
+            "error_rate": round(errors / len(items), 4) if items else 0.0,
+        }
+
+    by_name = {}
+    for sample in samples:
+        by_name.setdefault(sample.name, []).append(sample)
+    return {
+        "elapsed_sec": round(elapsed, 3),
+        "overall": block(samples),
+        "endpoints": {name: block(items) for name, items in sorted(by_name.items())},
+    }
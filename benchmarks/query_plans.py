@@ -0,0 +1,179 @@
+"""
+可视化聚合查询的执行计划与耗时对比（有/无 TravelRecord 组合索引）
+
+在临时SQLite数据库中生成N行合成旅行记录（默认100万行），分别在
+迁移 0002（无组合索引）与 0003（组合索引）下执行 DatabaseAggregator 的查询，
+输出 EXPLAIN QUERY PLAN 与查询耗时。
+
+用法：python benchmarks/query_plans.py [--rows 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'travel_analysis.settings')
+
+import django
+from django.conf import settings
+
+BEFORE_MIGRATION = '0002_travelrecord_trip_id_unique'
+AFTER_MIGRATION = '0003_travelrecord_dashboard_indexes'
+
+# 合成数据的取值范围（与清洁数据的分类取值一致）
+GENDERS = ['Male', 'Female']
+NATIONALITIES = ['American', 'Canadian', 'Chinese', 'British', 'Japanese', 'Korean', 'Australian', 'German']
+ACCOMMODATIONS = ['Hotel', 'Airbnb', 'Hostel', 'Resort', 'Villa', 'Vacation rental', 'Guesthouse']
+TRANSPORTS = ['Plane', 'Flight', 'Train', 'Car rental', 'Bus', 'Ferry']
+REGIONS = ['Europe', 'North America', 'Asia', 'Oceania', 'Other']
+DESTINATIONS = {
+    'Europe': 'London, UK', 'North America': 'New York, USA', 'Asia': 'Tokyo, Japan',
+    'Oceania': 'Sydney, Australia', 'Other': 'Cairo, Egypt',
+}
+# (筛选季节, 筛选地域)
+FILTER_CASES = [(None, None), ('Summer', None), (None, 'Asia'), ('Summer', 'Asia')]
+
+
+def use_temp_database():
+    """将默认数据库切换到临时文件（须在 django.setup() 之前调用）"""
+    path = os.path.join(tempfile.mkdtemp(prefix='travel_bench_'), 'bench.sqlite3')
+    settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+    return path
+
+
+def generate_rows(n, seed=42):
+    """生成n行合成旅行记录（按TravelRecord字段顺序）"""
+    from data_preprocess import get_age_segment, get_cost_range, get_season
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D')
+    duration = rng.integers(1, 15, n)
+    end = start + pd.to_timedelta(duration, unit='D')
+    age = rng.integers(18, 70, n).astype(float)
+    acc_cost = rng.integers(100, 5000, n).astype(float)
+    trans_cost = rng.integers(50, 3000, n).astype(float)
+    total_cost = acc_cost + trans_cost
+    month = pd.Series(start.month, dtype='Int64')
+    region = np.array(REGIONS, dtype=object)[rng.integers(0, len(REGIONS), n)]
+
+    columns = [
+        np.arange(1, n + 1).tolist(),
+        [DESTINATIONS[r] for r in region],
+        start.strftime('%Y-%m-%d').tolist(),
+        end.strftime('%Y-%m-%d').tolist(),
+        duration.astype(float).tolist(),
+        [f"Traveler {i}" for i in range(n)],
+        age.tolist(),
+        np.array(GENDERS, dtype=object)[rng.integers(0, len(GENDERS), n)].tolist(),
+        np.array(NATIONALITIES, dtype=object)[rng.integers(0, len(NATIONALITIES), n)].tolist(),
+        np.array(ACCOMMODATIONS, dtype=object)[rng.integers(0, len(ACCOMMODATIONS), n)].tolist(),
+        acc_cost.tolist(),
+        np.array(TRANSPORTS, dtype=object)[rng.integers(0, len(TRANSPORTS), n)].tolist(),
+        trans_cost.tolist(),
+        month.astype(int).tolist(),
+        get_season(month).tolist(),
+        get_age_segment(pd.Series(age)).tolist(),
+        total_cost.tolist(),
+        get_cost_range(pd.Series(total_cost)).tolist(),
+        region.tolist(),
+    ]
+    return list(zip(*columns))
+
+
+def load_rows(rows, batch_size=100000):
+    from django.db import connection, transaction
+    from travel_app.ingest import FIELDS
+
+    qn = connection.ops.quote_name
+    sql = (f"INSERT INTO {qn('travel_app_travelrecord')} ({', '.join(qn(f) for f in FIELDS)}) "
+           f"VALUES ({', '.join(['%s'] * len(FIELDS))})")
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            with transaction.atomic():
+                cursor.executemany(sql, rows[i:i + batch_size])
+
+
+def capture_queries(season, region):
+    """执行一次聚合，返回 [(SQL, 耗时秒)]"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from travel_app.aggregates import DatabaseAggregator
+
+    with CaptureQueriesContext(connection) as ctx:
+        aggregator = DatabaseAggregator()
+        aggregator.all_seasons
+        aggregator.query(season, region)
+    return [(q['sql'], float(q['time'])) for q in ctx.captured_queries]
+
+
+def explain(sql):
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def run_cases(label, repeat):
+    print(f"\n==================== {label} ====================")
+    results = {}
+    for season, region in FILTER_CASES:
+        case = f"season={season or '-'} region={region or '-'}"
+        timings = []
+        for _ in range(repeat):
+            queries = capture_queries(season, region)
+            timings.append(sum(t for _, t in queries))
+        best = min(timings)
+        results[case] = best
+        print(f"\n[{case}] 最快 {best * 1000:.1f} ms（{len(queries)} 条查询，重复 {repeat} 次）")
+        for sql, _ in queries:
+            plan = explain(sql)
+            print("  " + "\n  ".join(plan))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对比有/无组合索引时可视化聚合查询的执行计划与耗时")
+    parser.add_argument('--rows', type=int, default=1000000, help="合成数据行数")
+    parser.add_argument('--repeat', type=int, default=3, help="每个查询重复执行次数（取最快一次）")
+    args = parser.parse_args(argv)
+
+    db_path = use_temp_database()
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command('migrate', 'travel_app', BEFORE_MIGRATION, verbosity=0)
+    started = time.perf_counter()
+    load_rows(generate_rows(args.rows))
+    print(f"已生成 {args.rows} 行合成数据（{time.perf_counter() - started:.1f}s）：{db_path}")
+
+    before = run_cases("无组合索引（迁移0002）", args.repeat)
+
+    started = time.perf_counter()
+    call_command('migrate', 'travel_app', AFTER_MIGRATION, verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    print(f"\n创建组合索引耗时 {time.perf_counter() - started:.1f}s")
+
+    after = run_cases("组合索引（迁移0003）", args.repeat)
+
+    print("\n==================== 汇总 ====================")
+    for case in before:
+        speedup = before[case] / after[case] if after[case] > 0 else float('inf')
+        print(f"{case:<36} {before[case] * 1000:>9.1f} ms -> {after[case] * 1000:>9.1f} ms  (x{speedup:.1f})")
+
+    connection.close()
+    shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+按请求记录回放流量
+
+读取JSONL格式的请求记录（每行一个请求），按配置的并发数与速率回放到应用，
+输出各接口的延迟分位数（p50/p95/p99）、错误率与吞吐量，用于在验证性能改动时复现线上的请求组合。
+
+每行记录的字段：
+- method（必填）：GET / POST 等
+- path（必填）：如 /predict-api/
+- query：查询参数，字典或 "season=Summer&region=Asia" 形式的字符串
+- form：表单字段字典（application/x-www-form-urlencoded）
+- json：JSON请求体（如批量预测的数组）
+- body + content_type：原始请求体
+- headers：请求头字典（如 {"If-None-Match": "..."}）
+- name：统计分组名称（默认为 "方法 路径"）
+缺少 method/path 的行（如项目根目录下的需求清单 requests.jsonl）会被跳过并计数。
+
+发送方式：默认在进程内经WSGI处理器发送，--asgi 经ASGI处理器发送，--base-url 发送到已运行的服务。
+进程内回放直接使用项目的清洁数据、模型文件与数据库配置。
+
+用法：python benchmarks/replay.py benchmarks/sample_requests.jsonl --concurrency 8 --rate 200 --loops 10
+      python benchmarks/replay.py captured.jsonl --base-url http://127.0.0.1:8000 --duration 60
+"""
+import argparse
+import json
+import os
+import sys
+from urllib.parse import parse_qsl
+
+from common import BASE_DIR, setup_django, write_results
+from loadgen import BenchRequest, report, run_load, transport_factory
+
+DEFAULT_LOG_PATH = os.path.join(BASE_DIR, 'benchmarks', 'sample_requests.jsonl')
+
+
+def parse_record(record):
+    """将一行请求记录转换为BenchRequest；不是请求记录时返回None"""
+    if not isinstance(record, dict):
+        return None
+    method, path = record.get('method'), record.get('path')
+    if not isinstance(method, str) or not isinstance(path, str) or not path.startswith('/'):
+        return None
+    method = method.upper()
+
+    query = record.get('query')
+    if isinstance(query, str):
+        query = parse_qsl(query.lstrip('?'), keep_blank_values=True)
+    elif query is not None and not isinstance(query, dict):
+        return None
+
+    data, content_type = None, None
+    if record.get('json') is not None:
+        data, content_type = record['json'], 'application/json'
+    elif record.get('body') is not None:
+        data, content_type = record['body'], record.get('content_type', 'application/octet-stream')
+    elif record.get('form') is not None:
+        data = record['form']
+
+    name = record.get('name') or f"{method} {path}"
+    return BenchRequest(name, method, path, query or None, data, content_type, record.get('headers'))
+
+
+def load_requests(path):
+    """读取请求记录文件，返回 (BenchRequest列表, 跳过的行数)"""
+    requests, skipped = [], 0
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = parse_record(json.loads(line))
+            except ValueError:
+                request = None
+            if request is None:
+                skipped += 1
+            else:
+                requests.append(request)
+    return requests, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按请求记录回放流量并统计各接口的延迟与错误率")
+    parser.add_argument('log', nargs='?', default=DEFAULT_LOG_PATH, help="JSONL请求记录文件")
+    parser.add_argument('--base-url', help="已运行服务的地址（不指定时在进程内回放）")
+    parser.add_argument('--asgi', action='store_true', help="进程内回放时经ASGI处理器发送请求")
+    parser.add_argument('--concurrency', type=int, default=8, help="并发工作线程数")
+    parser.add_argument('--rate', type=float, help="目标速率（请求/秒），不指定时尽可能快地发送")
+    parser.add_argument('--loops', type=int, default=1, help="回放次数（记录按顺序循环使用）")
+    parser.add_argument('--duration', type=float, help="回放时长（秒），指定时忽略 --loops")
+    parser.add_argument('--warmup', type=int,
+                        help="正式回放前的预热请求数（不计入结果，默认回放一遍记录，加载数据与模型）")
+    parser.add_argument('--output', help="结果JSON路径（默认 benchmarks/results/replay-<时间戳>.json）")
+    args = parser.parse_args(argv)
+
+    requests, skipped = load_requests(args.log)
+    if not requests:
+        parser.error(f"{args.log} 中没有可回放的请求记录（跳过 {skipped} 行，每行须包含 method 与 path）")
+    if args.base_url and args.asgi:
+        parser.error("--asgi 只用于进程内回放")
+
+    if not args.base_url:
+        setup_django()
+    factory = transport_factory(args.base_url, asgi=args.asgi)
+    warmup = len(requests) if args.warmup is None else args.warmup
+    if warmup:
+        run_load(requests, concurrency=args.concurrency, factory=factory, total=warmup)
+    total = None if args.duration else len(requests) * args.loops
+    samples, elapsed = run_load(requests, concurrency=args.concurrency, factory=factory,
+                                total=total, duration=args.duration, rate=args.rate)
+
+    results = {
+        "log": args.log,
+        "target": args.base_url or ("in-process-asgi" if args.asgi else "in-process-wsgi"),
+        "records": len(requests),
+        "skipped_lines": skipped,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        **report(samples, elapsed),
+    }
+    output = write_results('replay', results, args.output)
+
+    overall = results['overall']
+    print(f"回放 {overall['requests']} 个请求，耗时 {results['elapsed_sec']}s，"
+          f"吞吐量 {overall['throughput_rps']} 请求/秒，错误率 {overall['error_rate']:.2%}")
+    width = max(len(name) for name in results['endpoints'])
+    for name, stats in results['endpoints'].items():
+        latency = stats['latency']
+        print(f"  {name:<{width}}  n={stats['requests']:<6} p50={latency['p50_ms']:.2f}ms "
+              f"p95={latency['p95_ms']:.2f}ms p99={latency['p99_ms']:.2f}ms "
+              f"错误率={stats['error_rate']:.2%} 状态码={stats['status']}")
+    print(f"结果已保存到：{output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+离线脚本与视图的微基准测试
+
+在指定规模（--rows，如 10k / 1M / 10M）的合成数据上依次测量：
+- data_preprocess.py：一次性处理与分块处理的耗时、吞吐量
+- train_model.py：完整训练流程与数据未变化时的跳过（产物发布到临时目录，不覆盖 static/model 下的模型），
+  以及产物加载
+- import_data.py：导入临时SQLite数据库（ORM方式与 --sqlite-fast 方式）
+- 视图（Django测试客户端）：可视化页面、可视化数据接口（冷缓存/热缓存/304）、
+  单条预测、批量预测、费用计算器
+
+结果写入 benchmarks/results/micro-<时间戳>.json（或 --output 指定的路径）。
+
+用法：python benchmarks/run_benchmarks.py --rows 1M [--repeat 20] [--import-rows 200k] [--only views]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import parse_rows, setup_django, summarize, time_call, use_cleaned_data, write_results
+
+SUITES = ['preprocess', 'train', 'import', 'views']
+VISUALIZATION_FILTERS = [{}, {'season': 'Summer'}, {'region': 'Asia'}, {'season': 'Summer', 'region': 'Asia'}]
+PREDICT_FORM = {'traveler_age': '30', 'accommodation_cost': '1000', 'transportation_cost': '500'}
+COST_FORM = {'duration': '7', 'acc_cost': '300', 'trans_cost': '1500'}
+BATCH_ROWS = 1000
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测脚本的控制台输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def rate(rows, seconds):
+    return round(rows / seconds, 1) if seconds > 0 else None
+
+
+# ---------------------- 1. 数据预处理 ----------------------
+def bench_preprocess(raw_path, workdir, chunksize):
+    import data_preprocess
+
+    results = {}
+    output = os.path.join(workdir, 'cleaned_travel_data.csv')
+    columnar = os.path.join(workdir, 'cleaned_travel_data.parquet')
+
+    with quiet():
+        samples, progress = time_call(lambda: data_preprocess.preprocess_file(raw_path, output, columnar))
+    results['full'] = {"seconds": round(samples[0], 3), "rows_in": progress.rows_in, "rows_out": progress.rows_out,
+                       "rows_per_sec": rate(progress.rows_in, samples[0])}
+
+    chunk_output = os.path.join(workdir, 'cleaned_chunked.csv')
+    with quiet():
+        samples, progress = time_call(
+            lambda: data_preprocess.preprocess_file_in_chunks(raw_path, chunk_output, chunksize))
+    results['chunked'] = {"seconds": round(samples[0], 3), "chunksize": chunksize, "rows_in": progress.rows_in,
+                          "rows_per_sec": rate(progress.rows_in, samples[0])}
+    os.remove(chunk_output)
+
+    # 后续的训练与视图测试读取本次生成的清洁数据
+    use_cleaned_data(output, columnar)
+    return results
+
+
+# ---------------------- 2. 模型训练 ----------------------
+def bench_train(workdir):
+    from travel_app import train_model
+    from travel_app.artifacts import ArtifactStore
+    from travel_app.dataset import get_cleaned_data, resolve_data_path
+    from travel_app.incremental import compute_statistics, solve_statistics
+    from travel_app.training import FEATURE_COLS, TARGET_COL, dataset_hash, train_duration_model
+
+    # 训练流水线发布到临时产物目录；第二次运行数据未变化，只计算数据集哈希后跳过训练
+    store = ArtifactStore(os.path.join(workdir, 'artifacts'))
+    with quiet():
+        samples, _ = time_call(lambda: train_model.train_travel_duration_model(store=store))
+        skip_samples, outcome = time_call(lambda: train_model.train_travel_duration_model(store=store))
+    rows = len(get_cleaned_data(FEATURE_COLS + [TARGET_COL]))
+    results = {"train_model_script": {"seconds": round(samples[0], 3), "rows": rows,
+                                      "rows_per_sec": rate(rows, samples[0]),
+                                      "data_path": os.path.basename(resolve_data_path())},
+               "train_model_script_unchanged": {"seconds": round(skip_samples[0], 3),
+                                                "skipped": bool(outcome and outcome.skipped)}}
+
+    # 冷启动训练（training.train_duration_model），数据已在缓存中，只计拟合与评估
+    df = get_cleaned_data(FEATURE_COLS + [TARGET_COL])
+    samples, (_, metrics) = time_call(lambda: train_duration_model(df), repeat=3)
+    results['train_duration_model'] = dict(summarize(samples), rows=len(df), mae=round(metrics['mae'], 4))
+    samples, _ = time_call(lambda: dataset_hash(df), repeat=3)
+    results['dataset_hash'] = dict(summarize(samples), rows=len(df))
+
+    # 增量训练：计算一批数据的充分统计量，以及由统计量求解回归系数（与记录数无关）
+    data = df[FEATURE_COLS + [TARGET_COL]].dropna().to_numpy(dtype=float)
+    samples, stats = time_call(lambda: compute_statistics(data), repeat=3)
+    results['compute_statistics'] = dict(summarize(samples), rows=len(data))
+    samples, _ = time_call(lambda: solve_statistics(stats), repeat=1000)
+    results['solve_statistics'] = summarize(samples)
+
+    # 加载当前版本产物（内存映射与完整读取）
+    for name, mmap in [('load_artifact_mmap', True), ('load_artifact', False)]:
+        samples, _ = time_call(lambda: store.load(mmap=mmap), repeat=5)
+        results[name] = summarize(samples)
+    return results
+
+
+# ---------------------- 3. 数据导入 ----------------------
+def bench_import(raw_path, workdir, import_rows, batch_size):
+    import pandas as pd
+    from django.core.management import call_command
+    from django.db import connection
+
+    from travel_app.models import TravelAggregate, TravelRecord
+
+    path = raw_path
+    if import_rows:
+        path = os.path.join(workdir, f'import_{import_rows}.csv')
+        pd.read_csv(raw_path, nrows=import_rows, dtype=str, keep_default_na=False,
+                    encoding='utf-8-sig').to_csv(path, index=False)
+
+    with quiet():
+        call_command('migrate', 'travel_app', verbosity=0)
+
+    results = {}
+    for mode, options in [('orm', []), ('sqlite_fast', ['--sqlite-fast'])]:
+        if mode == 'sqlite_fast' and connection.vendor != 'sqlite':
+            continue
+        TravelRecord.objects.all().delete()
+        TravelAggregate.objects.all().delete()
+        with quiet():
+            samples, _ = time_call(lambda: call_command('import_travel_data', path, '--batch-size',
+                                                        str(batch_size), *options))
+        rows = TravelRecord.objects.count()
+        results[mode] = {"seconds": round(samples[0], 3), "rows": rows, "batch_size": batch_size,
+                         "rows_per_sec": rate(rows, samples[0])}
+    return results
+
+
+# ---------------------- 4. 视图 ----------------------
+def bench_views(repeat):
+    from django.core.cache import cache
+    from django.test import Client
+
+    client = Client()
+    results = {}
+
+    def get(path, **extra):
+        def call():
+            response = client.get(path, **extra)
+            assert response.status_code in (200, 304), f"{path} 返回 {response.status_code}"
+            return response
+        return call
+
+    samples, _ = time_call(get('/visualization/'), repeat=repeat, warmup=1)
+    results['visualization_page'] = summarize(samples)
+
+    for filters in VISUALIZATION_FILTERS:
+        query = '&'.join(f'{k}={v}' for k, v in filters.items())
+        path = '/api/visualization/' + (f'?{query}' if query else '')
+        label = query or 'all'
+
+        def cold():
+            cache.clear()
+            return get(path)()
+        samples, _ = time_call(cold, repeat=repeat, warmup=1)
+        results[f'visualization_api[{label}]:cold'] = summarize(samples)
+
+        samples, response = time_call(get(path), repeat=repeat, warmup=1)
+        results[f'visualization_api[{label}]:warm'] = summarize(samples)
+
+        etag = response.get('ETag')
+        if etag:
+            samples, response = time_call(get(path, HTTP_IF_NONE_MATCH=etag), repeat=repeat, warmup=1)
+            results[f'visualization_api[{label}]:not_modified'] = dict(summarize(samples),
+                                                                       status=response.status_code)
+
+    def predict():
+        response = client.post('/predict-api/', PREDICT_FORM)
+        assert response.status_code == 200, f"/predict-api/ 返回 {response.status_code}"
+    samples, _ = time_call(predict, repeat=repeat, warmup=1)
+    results['predict_api'] = summarize(samples)
+
+    rows = [[20 + i % 50, 100 + i % 3000, 50 + i % 1500] for i in range(BATCH_ROWS)]
+    body = json.dumps(rows)
+
+    def predict_batch():
+        response = client.post('/predict-api/batch/', body, content_type='application/json')
+        assert response.status_code == 200, f"/predict-api/batch/ 返回 {response.status_code}"
+    samples, _ = time_call(predict_batch, repeat=repeat, warmup=1)
+    results['predict_batch_api'] = dict(summarize(samples), batch_rows=BATCH_ROWS,
+                                        rows_per_sec=rate(BATCH_ROWS * len(samples), sum(samples)))
+
+    def cost():
+        response = client.post('/cost-calculator/', COST_FORM)
+        assert response.status_code == 200, f"/cost-calculator/ 返回 {response.status_code}"
+    samples, _ = time_call(cost, repeat=repeat, warmup=1)
+    results['cost_calculator'] = summarize(samples)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线脚本与视图的微基准测试")
+    parser.add_argument('--rows', default='10k', help="合成数据行数，如 10k / 1M / 10M")
+    parser.add_argument('--seed', type=int, default=42, help="合成数据随机种子")
+    parser.add_argument('--repeat', type=int, default=20, help="视图测试的重复次数")
+    parser.add_argument('--chunksize', type=int, default=100000, help="分块预处理的块大小")
+    parser.add_argument('--import-rows', default='200k',
+                        help="导入测试使用的行数上限（0表示全部，千万行导入SQLite耗时很长）")
+    parser.add_argument('--batch-size', type=int, default=5000, help="导入测试的批大小")
+    parser.add_argument('--only', action='append', choices=SUITES, help="只运行指定测试（可重复指定）")
+    parser.add_argument('--data-dir', help="合成数据目录（指定时复用已生成的数据，默认使用临时目录）")
+    parser.add_argument('--output', help="结果JSON路径（默认 benchmarks/results/micro-<时间戳>.json）")
+    args = parser.parse_args(argv)
+
+    rows = parse_rows(args.rows)
+    import_rows = parse_rows(args.import_rows) if str(args.import_rows) != '0' else 0
+    suites = args.only or SUITES
+
+    db_path = setup_django(temp_database=True)
+    from generate_data import ensure_raw_data
+
+    workdir = tempfile.mkdtemp(prefix='travel_bench_')
+    data_dir = args.data_dir or workdir
+    results = {"rows": rows, "suites": {}}
+    try:
+        started = time.perf_counter()
+        raw_path = ensure_raw_data(rows, data_dir, args.seed)
+        results['generate_seconds'] = round(time.perf_counter() - started, 3)
+
+        # 训练与视图依赖合成数据的清洁结果，未选择预处理测试时也先生成清洁数据
+        if 'preprocess' in suites:
+            print("预处理 ...")
+            results['suites']['preprocess'] = bench_preprocess(raw_path, workdir, args.chunksize)
+        else:
+            import data_preprocess
+            output = os.path.join(workdir, 'cleaned_travel_data.csv')
+            columnar = os.path.join(workdir, 'cleaned_travel_data.parquet')
+            with quiet():
+                data_preprocess.preprocess_file(raw_path, output, columnar)
+            use_cleaned_data(output, columnar)
+
+        if 'train' in suites:
+            print("模型训练 ...")
+            results['suites']['train'] = bench_train(workdir)
+        if 'import' in suites:
+            print("数据导入 ...")
+            results['suites']['import'] = bench_import(raw_path, workdir, min(import_rows, rows) or None,
+                                                       args.batch_size)
+        if 'views' in suites:
+            print("视图 ...")
+            results['suites']['views'] = bench_views(args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+
+    output = write_results('micro', results, args.output)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"结果已保存到：{output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,85 +1,430 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import glob
+import json
 import os
+import re
+import shutil
+import sys
+import tempfile
+import time
 
-# 读取原始数据（请替换为你的CSV文件实际路径）
-raw_data_path = r"C:\Users\Alice\PycharmProjects\travel_analysis\data\Travel details dataset.csv"
-df = pd.read_csv(raw_data_path)
+from travel_app.dataset import CATEGORICAL_COLUMNS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 默认输入/输出路径（可通过命令行参数覆盖）
+DEFAULT_RAW_DATA_PATH = os.path.join(BASE_DIR, 'data', 'Travel details dataset.csv')
+DEFAULT_OUTPUT_PATH = os.path.join(BASE_DIR, 'data', 'cleaned_travel_data.csv')
+DEFAULT_COLUMNAR_PATH = os.path.join(BASE_DIR, 'data', 'cleaned_travel_data.parquet')
+
+# 原始数据列类型：固定类型保证分块处理时每块的输出格式一致（不随块内是否有空值变化）
+RAW_DTYPES = {
+    'Trip ID': 'Int64',
+    'Destination': str,
+    'Start date': str,
+    'End date': str,
+    'Duration (days)': 'float64',
+    'Traveler name': str,
+    'Traveler age': 'float64',
+    'Traveler gender': str,
+    'Traveler nationality': str,
+    'Accommodation type': str,
+    'Accommodation cost': str,
+    'Transportation type': str,
+    'Transportation cost': str,
+}
+
+# 关键字段（任一缺失则删除该行）
+REQUIRED_COLUMNS = ['Duration (days)', 'Traveler age', 'Traveler gender', 'Accommodation cost', 'Transportation cost']
+
+# 月份 -> 季节 查找表（下标0对应缺失月份，归为Winter）
+SEASON_BY_MONTH = np.array(['Winter',
+                            'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                            'Summer', 'Summer', 'Autumn', 'Autumn', 'Autumn', 'Winter'], dtype=object)
+
+# 地域关键字（按优先级排列，目的地同时命中多个地域时取靠前的地域）
+REGION_KEYWORDS = [
+    ('Europe', ['uk', 'france', 'germany', 'italy', 'spain']),
+    ('North America', ['usa', 'canada', 'mexico']),
+    ('Asia', ['thailand', 'indonesia', 'japan', 'korea', 'china']),
+    ('Oceania', ['australia', 'new zealand']),
+]
+# 每个地域的关键字预编译为一个交替正则
+REGION_PATTERNS = [(region, re.compile('|'.join(map(re.escape, keywords)))) for region, keywords in REGION_KEYWORDS]
 
-# 1. 处理缺失值（删除关键字段缺失的行）
-df = df.dropna(subset=['Duration (days)', 'Traveler age', 'Traveler gender', 'Accommodation cost', 'Transportation cost'])
 
 # 2. 转换费用字段为数值类型（处理字符串格式的费用）
-def clean_cost(cost):
-    if isinstance(cost, str):
-        cost = ''.join(filter(str.isdigit, cost))  # 提取数字部分
-        return float(cost) if cost else 0.0
-    return float(cost) if not pd.isna(cost) else 0.0
-
-df['Accommodation cost'] = df['Accommodation cost'].apply(clean_cost)
-df['Transportation cost'] = df['Transportation cost'].apply(clean_cost)
-
-# 3. 提取季节和月份（从Start date）
-def get_season(month):
-    if month in [3,4,5]:
-        return 'Spring'
-    elif month in [6,7,8]:
-        return 'Summer'
-    elif month in [9,10,11]:
-        return 'Autumn'
-    else:
-        return 'Winter'
+def clean_cost(costs):
+    """字符串费用只保留数字字符（如"$1,500 " -> 1500.0），空字符串/缺失值记为0.0"""
+    if not (pd.api.types.is_object_dtype(costs) or pd.api.types.is_string_dtype(costs)):
+        return pd.to_numeric(costs).astype(float).fillna(0.0)
+    digits = costs.str.replace(r'\D', '', regex=True)  # 提取数字部分（非字符串元素为NaN）
+    from_str = digits.mask(digits == '', '0').astype(object).fillna('0').astype(float)
+    from_other = pd.to_numeric(costs.mask(digits.notna()), errors='coerce').fillna(0.0)
+    return from_str.where(digits.notna(), from_other).astype(float)
+
+
+# 3. 提取季节（从月份）
+def get_season(months):
+    return pd.Series(SEASON_BY_MONTH[months.fillna(0).astype(int).to_numpy()], index=months.index)
 
-df['Start date'] = pd.to_datetime(df['Start date'], format='%m/%d/%Y', errors='coerce')
-df['Month'] = df['Start date'].dt.month
-df['Season'] = df['Month'].apply(get_season)
 
 # 4. 划分年龄分段
-def get_age_segment(age):
-    if age <= 25:
-        return '18-25'
-    elif age <= 40:
-        return '26-40'
-    else:
-        return '40+'
+def get_age_segment(ages):
+    segments = pd.cut(ages, bins=[-np.inf, 25, 40, np.inf], labels=['18-25', '26-40', '40+'], include_lowest=True)
+    return segments.astype(object).fillna('40+')
 
-df['Age segment'] = df['Traveler age'].apply(get_age_segment)
 
 # 5. 划分费用区间（住宿+交通总费用）
-df['Total cost'] = df['Accommodation cost'] + df['Transportation cost']
-def get_cost_range(total_cost):
-    if total_cost <= 1000:
-        return 'Low'
-    elif total_cost <= 3000:
-        return 'Medium'
-    else:
-        return 'High'
+def get_cost_range(total_costs):
+    ranges = pd.cut(total_costs, bins=[-np.inf, 1000, 3000, np.inf], labels=['Low', 'Medium', 'High'], include_lowest=True)
+    return ranges.astype(object).fillna('High')
 
-df['Cost range'] = df['Total cost'].apply(get_cost_range)
 
 # 6. 划分地域（从Destination提取）
-def get_region(destination):
-    if pd.isna(destination):
-        return 'Unknown'
-    destination = destination.lower()
-    if any(reg in destination for reg in ['uk', 'france', 'germany', 'italy', 'spain']):
-        return 'Europe'
-    elif any(reg in destination for reg in ['usa', 'canada', 'mexico']):
-        return 'North America'
-    elif any(reg in destination for reg in ['thailand', 'indonesia', 'japan', 'korea', 'china']):
-        return 'Asia'
-    elif any(reg in destination for reg in ['australia', 'new zealand']):
-        return 'Oceania'
+def get_region(destinations):
+    lowered = destinations.str.lower()
+    conditions = [lowered.str.contains(pattern, na=False).to_numpy() for _, pattern in REGION_PATTERNS]
+    regions = np.select(conditions, [region for region, _ in REGION_PATTERNS], default='Other').astype(object)
+    regions[destinations.isna().to_numpy()] = 'Unknown'
+    return pd.Series(regions, index=destinations.index)
+
+
+def preprocess_travel_data(df):
+    """清洗原始数据并派生 Month/Season/Age segment/Total cost/Cost range/Region 字段"""
+    # 1. 处理缺失值（删除关键字段缺失的行）
+    df = df.dropna(subset=REQUIRED_COLUMNS).copy()
+
+    # 2. 转换费用字段为数值类型
+    df['Accommodation cost'] = clean_cost(df['Accommodation cost'])
+    df['Transportation cost'] = clean_cost(df['Transportation cost'])
+
+    # 3. 提取季节和月份（从Start date）
+    df['Start date'] = pd.to_datetime(df['Start date'], format='%m/%d/%Y', errors='coerce')
+    df['Month'] = df['Start date'].dt.month.astype('Int64')  # 日期缺失时为空，不把整列变成浮点数
+    df['Season'] = get_season(df['Month'])
+
+    # 4. 划分年龄分段
+    df['Age segment'] = get_age_segment(df['Traveler age'])
+
+    # 5. 划分费用区间（住宿+交通总费用）
+    df['Total cost'] = df['Accommodation cost'] + df['Transportation cost']
+    df['Cost range'] = get_cost_range(df['Total cost'])
+
+    # 6. 划分地域（从Destination提取）
+    df['Region'] = get_region(df['Destination'])
+    return df
+
+
+def read_raw_data(input_path, chunksize=None):
+    """读取原始数据（chunksize指定时返回分块迭代器）"""
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"原始数据文件不存在：{input_path}")
+    return pd.read_csv(input_path, dtype=RAW_DTYPES, chunksize=chunksize)
+
+
+def to_columnar(df):
+    """分类字段转为字典编码（category）"""
+    return df.astype({col: 'category' for col in CATEGORICAL_COLUMNS if col in df.columns})
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB），无法获取时返回None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux单位为KB，macOS单位为字节
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+class ProgressReporter:
+    """统计处理行数、吞吐量（行/秒）与峰值内存"""
+
+    def __init__(self, interval=5.0):
+        self.started = time.perf_counter()
+        self.interval = interval
+        self._last_report = self.started
+        self.rows_in = 0
+        self.rows_out = 0
+        self.chunks = 0
+
+    def update(self, rows_in, rows_out):
+        self.rows_in += rows_in
+        self.rows_out += rows_out
+        self.chunks += 1
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            print(f"已处理 {self.chunks} 块 / {self.rows_in} 行，{self.rows_per_sec():.0f} 行/秒")
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def rows_per_sec(self):
+        elapsed = self.elapsed()
+        return self.rows_in / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        peak = peak_rss_mb()
+        return (f"读取 {self.rows_in} 行，输出 {self.rows_out} 行，耗时 {self.elapsed():.2f}s，"
+                f"吞吐量 {self.rows_per_sec():.0f} 行/秒，"
+                f"峰值内存 {'未知' if peak is None else f'{peak:.1f} MB'}")
+
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def preprocess_file(input_path, output_path, columnar_path=None):
+    """一次性读取并处理整个原始文件"""
+    progress = ProgressReporter()
+    raw = read_raw_data(input_path)
+    df = preprocess_travel_data(raw)
+    progress.update(len(raw), len(df))
+
+    # 先写临时文件再替换，避免服务进程读到写了一半的数据
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    df.to_csv(_tmp_path(output_path), index=False)
+    os.replace(_tmp_path(output_path), output_path)
+    if columnar_path:
+        write_columnar(df, columnar_path)
+    return progress
+
+
+def write_columnar(df, columnar_path):
+    """保存列式文件（分类字段字典编码）；未安装pyarrow时跳过"""
+    try:
+        to_columnar(df).to_parquet(_tmp_path(columnar_path), index=False)
+    except ImportError:
+        print("未安装pyarrow，跳过列式文件生成（各加载器将回退读取CSV）")
+        return False
+    os.replace(_tmp_path(columnar_path), columnar_path)
+    return True
+
+
+class ColumnarChunkWriter:
+    """分块追加写入Parquet：以第一块为准固定表结构，字典索引统一为int32以容纳各块不同的类别"""
+
+    def __init__(self, path):
+        import pyarrow  # noqa: F401（未安装时抛出ImportError）
+        self.path = path
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(to_columnar(df), preserve_index=False)
+        if self._writer is None:
+            fields = []
+            for field in table.schema:
+                if pa.types.is_dictionary(field.type):
+                    field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+                elif pa.types.is_null(field.type):
+                    field = field.with_type(pa.string())
+                fields.append(field)
+            self._schema = pa.schema(fields, metadata=table.schema.metadata)
+            self._writer = pq.ParquetWriter(_tmp_path(self.path), self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(_tmp_path(self.path), self.path)
+
+    def abort(self):
+        """处理中断时关闭写入器并删除未完成的临时文件，保留原有输出"""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            finally:
+                self._writer = None
+                if os.path.exists(_tmp_path(self.path)):
+                    os.remove(_tmp_path(self.path))
+
+
+def preprocess_file_in_chunks(input_path, output_path, chunksize, columnar_path=None):
+    """分块流式处理：每块执行相同的清洗/派生逻辑后追加写出，内存占用只与块大小有关"""
+    progress = ProgressReporter()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    columnar_writer = None
+    if columnar_path:
+        try:
+            columnar_writer = ColumnarChunkWriter(columnar_path)
+        except ImportError:
+            print("未安装pyarrow，跳过列式文件生成（各加载器将回退读取CSV）")
+
+    tmp_output = _tmp_path(output_path)
+    try:
+        with open(tmp_output, 'w', encoding='utf-8', newline='') as f:
+            for i, chunk in enumerate(read_raw_data(input_path, chunksize=chunksize)):
+                df = preprocess_travel_data(chunk)
+                df.to_csv(f, header=(i == 0), index=False)
+                if columnar_writer is not None and not df.empty:
+                    columnar_writer.write(df)
+                progress.update(len(chunk), len(df))
+        if columnar_writer is not None:
+            columnar_writer.close()
+    except BaseException:
+        # 处理中断时删除未完成的临时文件（CSV与列式文件），保留原有输出
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
+        if columnar_writer is not None:
+            columnar_writer.abort()
+        raise
+    os.replace(tmp_output, output_path)
+    return progress
+
+
+def resolve_input_files(input_path):
+    """输入可以是单个文件、目录（处理其中全部*.csv）或通配符，按文件名排序保证合并顺序确定"""
+    if os.path.isdir(input_path):
+        files = sorted(glob.glob(os.path.join(input_path, '*.csv')))
+    elif glob.has_magic(input_path):
+        files = sorted(glob.glob(input_path))
+    else:
+        return [input_path]
+    if not files:
+        raise FileNotFoundError(f"未找到原始数据分片：{input_path}")
+    return files
+
+
+def _process_shard(task):
+    """子进程：清洗单个分片，输出部分清洁数据文件与分片统计（须为模块级函数以便序列化）"""
+    shard_path, part_path, part_columnar_path, chunksize = task
+    if chunksize > 0:
+        progress = preprocess_file_in_chunks(shard_path, part_path, chunksize, part_columnar_path)
     else:
-        return 'Other'
+        progress = preprocess_file(shard_path, part_path, part_columnar_path)
+    stats = {
+        "shard": shard_path,
+        "rows_in": progress.rows_in,
+        "rows_out": progress.rows_out,
+        "elapsed_sec": round(progress.elapsed(), 3),
+        "rows_per_sec": round(progress.rows_per_sec(), 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    with open(f"{part_path}.stats.json", 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+    return stats
+
+
+def merge_csv_parts(part_paths, output_path):
+    """按分片顺序拼接部分CSV（只保留第一个表头），逐块复制不解析数据"""
+    tmp_output = _tmp_path(output_path)
+    with open(tmp_output, 'wb') as out:
+        for i, part_path in enumerate(part_paths):
+            with open(part_path, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+    os.replace(tmp_output, output_path)
+
+
+def merge_columnar_parts(part_paths, columnar_path):
+    """按分片顺序合并部分Parquet文件，逐批读取以限制内存"""
+    import pyarrow.parquet as pq
+    writer = ColumnarChunkWriter(columnar_path)
+    for part_path in part_paths:
+        if not os.path.exists(part_path):  # 分片无有效数据时不生成列式文件
+            continue
+        for batch in pq.ParquetFile(part_path).iter_batches():
+            writer.write(batch.to_pandas())
+    writer.close()
+
+
+def preprocess_shards(shard_paths, output_path, columnar_path=None, chunksize=0, workers=None, keep_parts=False):
+    """多进程并行清洗多个原始数据分片，最后按分片顺序合并为标准清洁数据文件"""
+    progress = ProgressReporter()
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    parts_dir = tempfile.mkdtemp(prefix='cleaned_parts_', dir=output_dir)
+    tasks = []
+    for i, shard_path in enumerate(shard_paths):
+        part_path = os.path.join(parts_dir, f"part-{i:05d}.csv")
+        part_columnar_path = os.path.join(parts_dir, f"part-{i:05d}.parquet") if columnar_path else None
+        tasks.append((shard_path, part_path, part_columnar_path, chunksize))
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    shard_stats = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map按提交顺序返回结果，保证合并顺序与分片顺序一致
+            for stats in executor.map(_process_shard, tasks):
+                shard_stats.append(stats)
+                progress.update(stats["rows_in"], stats["rows_out"])
+                print(f"分片完成：{stats['shard']}，{stats['rows_out']} 行，{stats['rows_per_sec']:.0f} 行/秒")
+
+        merge_csv_parts([task[1] for task in tasks], output_path)
+        if columnar_path:
+            try:
+                merge_columnar_parts([task[2] for task in tasks], columnar_path)
+            except ImportError:
+                print("未安装pyarrow，跳过列式文件生成（各加载器将回退读取CSV）")
+    finally:
+        if not keep_parts:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    return progress, shard_stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="旅行数据预处理：清洗原始CSV并派生季节/年龄分段/费用区间/地域字段")
+    parser.add_argument('--input', default=DEFAULT_RAW_DATA_PATH,
+                        help="原始数据CSV路径；也可以是分片目录或通配符（如 'exports/*.csv'），多个分片时并行处理")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help="清洁数据CSV输出路径")
+    parser.add_argument('--columnar-output', default=DEFAULT_COLUMNAR_PATH, help="列式文件（Parquet）输出路径")
+    parser.add_argument('--no-columnar', action='store_true', help="不生成列式文件")
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help="流式模式：每块读取的行数（0表示一次性读取整个文件）")
+    parser.add_argument('--workers', type=int, default=0, help="并行处理分片的进程数（默认取CPU核数与分片数的较小值）")
+    parser.add_argument('--keep-parts', action='store_true', help="保留各分片的部分清洁数据与统计文件")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    columnar_path = None if args.no_columnar else args.columnar_output
+    shard_stats = None
+    try:
+        input_files = resolve_input_files(args.input)
+        if len(input_files) > 1:
+            progress, shard_stats = preprocess_shards(
+                input_files, args.output, columnar_path,
+                chunksize=args.chunksize, workers=args.workers, keep_parts=args.keep_parts,
+            )
+        elif args.chunksize > 0:
+            progress = preprocess_file_in_chunks(input_files[0], args.output, args.chunksize, columnar_path)
+        else:
+            progress = preprocess_file(input_files[0], args.output, columnar_path)
+    except FileNotFoundError as e:
+        print(f"错误：{str(e)}")
+        return 1
 
-df['Region'] = df['Destination'].apply(get_region)
+    print(f"数据预处理完成！清洁数据已保存到：{args.output}")
+    print(f"预处理后数据条数：{progress.rows_out}")
+    if columnar_path and os.path.exists(columnar_path):
+        print(f"列式数据已保存到：{columnar_path}")
+    print(progress.summary())
+    if shard_stats:
+        worker_peaks = [stats["peak_rss_mb"] for stats in shard_stats if stats["peak_rss_mb"] is not None]
+        print(f"并行处理 {len(shard_stats)} 个分片"
+              + (f"，单个工作进程峰值内存 {max(worker_peaks):.1f} MB" if worker_peaks else ""))
+    return 0
 
-# 保存预处理后的数据到static/data目录
-save_path = os.path.join(os.path.dirname(__file__), 'data/cleaned_travel_data.csv')
-os.makedirs(os.path.dirname(save_path), exist_ok=True)
-df.to_csv(save_path, index=False)
 
-print(f"数据预处理完成！清洁数据已保存到：{save_path}")
-print(f"预处理后数据条数：{len(df)}")
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
@@ -42,7 +42,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'travel_app.metrics.RequestTimingMiddleware',  # 请求耗时统计（放在最外层，包含其他中间件的耗时）
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',  # 压缩页面与JSON接口响应
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -120,4 +122,81 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]  # 关键配置
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 预测模型冷启动训练
+# 请求等待后台训练完成的最长时间（秒），超时返回503，并通过Retry-After提示客户端重试间隔（秒）
+MODEL_TRAINING_WAIT_TIMEOUT = 10
+MODEL_TRAINING_RETRY_AFTER = 5
+
+# 批量预测接口单次最多处理的行数
+PREDICTION_BATCH_MAX_ROWS = 10000
+
+# 费用方案批量接口单次最多计算的方案数（方案网格按展开后的行数计算），以及流式返回时每块的行数
+COST_SCENARIO_MAX_ROWS = 100000
+COST_SCENARIO_CHUNK_ROWS = 1000
+
+# 单条预测请求合并（可选）：并发到达的单条预测在等待窗口内（毫秒）或凑满批大小上限后合并为一次模型预测，
+# 适合高并发场景；低并发时每个请求最多多等待一个窗口。队列中的行数达到上限时返回429，
+# 等待结果超过 PREDICTION_COALESCE_TIMEOUT 秒时返回503
+PREDICTION_COALESCE_ENABLED = False
+PREDICTION_COALESCE_WINDOW_MS = 2
+PREDICTION_COALESCE_MAX_BATCH = 256
+PREDICTION_COALESCE_MAX_QUEUE = 4096
+PREDICTION_COALESCE_TIMEOUT = 5
+
+# 可视化聚合后端：dataframe（读取清洁数据文件并预聚合）/ orm（由数据库对TravelRecord表分组聚合）
+# / summary（读取导入时增量维护的TravelAggregate汇总表）
+# orm/summary的数据集版本（ETag）由汇总表校验值计算，orm另外包含TravelRecord的记录数与最大id；
+# 绕过 import_travel_data 原地修改TravelRecord（记录数与最大id不变）时版本不变，需清空缓存
+TRAVEL_AGGREGATION_BACKEND = 'dataframe'
+
+# 缓存（本地使用进程内缓存；多进程/多机部署时可替换为Redis等共享缓存，例如
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'）
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'travel-analysis',
+    }
+}
+# 可视化数据在服务端缓存中的保存时间（秒）；缓存键包含数据集版本，数据更新后无需等待过期
+VISUALIZATION_CACHE_TIMEOUT = 3600
+# 浏览器/反向代理缓存时间（Cache-Control max-age，秒）：页面外壳不含数据可长期缓存，数据接口短期缓存后用ETag重新验证
+VISUALIZATION_PAGE_MAX_AGE = 86400
+VISUALIZATION_API_MAX_AGE = 60
+
+# 异步视图（ASGI部署，/predict-api/async/ 与 /api/visualization/async/）执行模型推理与数据聚合的有界线程池：
+# 工作线程数（None表示 min(4, CPU核数)）、等待队列长度；执行与排队的任务数达到上限时返回429，Retry-After为重试间隔（秒）
+ASYNC_EXECUTOR_WORKERS = None
+ASYNC_EXECUTOR_QUEUE_SIZE = 32
+ASYNC_EXECUTOR_RETRY_AFTER = 1
+
+# 监控指标：记录请求/视图各阶段耗时直方图，并通过 /metrics 以Prometheus文本格式导出
+METRICS_ENABLED = True
+
+# 日志：ERROR及以上级别写入 travel_app_error.log 并输出到控制台
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'standard': {
+            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        },
+    },
+    'handlers': {
+        'file': {
+            'class': 'logging.FileHandler',
+            'filename': 'travel_app_error.log',
+            'formatter': 'standard',
+            'delay': True,
+        },
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'standard',
+        },
+    },
+    'root': {
+        'handlers': ['file', 'console'],
+        'level': 'ERROR',
+    },
+}
@@ -39,7 +39,13 @@ urlpatterns = [
     path('admin/', admin.site.urls),  # Django后台（可选）
     path('', views.index, name='index'),  # 首页（入口）
     path('visualization/', views.multi_visualization, name='visualization'),  # 多维度可视化
+    path('api/visualization/', views.visualization_api, name='visualization_api'),  # 可视化数据接口
+    path('api/visualization/async/', views.visualization_api_async, name='visualization_api_async'),  # 可视化数据接口（异步）
     path('prediction/', views.travel_prediction, name='prediction'),  # 旅行周期预测页面
     path('predict-api/', views.predict_api, name='predict_api'),  # 预测接口
+    path('predict-api/async/', views.predict_api_async, name='predict_api_async'),  # 预测接口（异步）
+    path('predict-api/batch/', views.predict_batch_api, name='predict_batch_api'),  # 批量预测接口
     path('cost-calculator/', views.cost_calculator, name='cost_calculator'),  # 费用计算器
+    path('cost-calculator/scenarios/', views.cost_scenarios_api, name='cost_scenarios_api'),  # 费用方案批量接口
+    path('metrics', views.metrics, name='metrics'),  # Prometheus监控指标
 ]
\ No newline at end of file
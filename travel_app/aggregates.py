@@ -0,0 +1,260 @@
+"""
+多维度可视化的预聚合数据立方体
+
+季节（4个）× 地域（5个）的筛选空间很小且固定，因此每个数据集版本只构建一次立方体：
+按 (季节, 地域, 维度, 标签) 存储旅行周期的记录数与总和。
+任意筛选组合（含不筛选/只筛选一项）的各维度均值都由同一份立方体汇总得到，
+计算量只与单元格数量有关，与原始数据行数无关。
+
+数据量较大、数据存放在数据库中时，可在settings中设置 TRAVEL_AGGREGATION_BACKEND：
+- 'orm'：由数据库按 TravelRecord 表分组聚合，只有聚合结果进入Python
+- 'summary'：读取导入时增量维护的汇总表 TravelAggregate，查询量只与单元格数量有关
+"""
+import hashlib
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Avg, CharField, Count, F, Max, Min, Sum, Value
+
+from .dataset import data_signature, get_cleaned_data
+from .models import TravelAggregate, TravelRecord
+
+# 可视化维度 -> 清洁数据列名
+DIMENSIONS = {
+    'gender': 'Traveler gender',
+    'age': 'Age segment',
+    'cost': 'Cost range',
+    'region': 'Region',
+    'season': 'Season',
+}
+SEASON_COL = 'Season'
+REGION_COL = 'Region'
+VALUE_COL = 'Duration (days)'
+# 可视化维度 -> TravelRecord字段名
+DB_DIMENSIONS = {
+    'gender': 'traveler_gender',
+    'age': 'age_segment',
+    'cost': 'cost_range',
+    'region': 'region',
+    'season': 'season',
+}
+# 数据集版本：tag为版本摘要（用于缓存键与ETag），last_modified为数据更新时间（未知时为None）
+DatasetVersion = namedtuple('DatasetVersion', ['tag', 'last_modified'])
+
+# 构建立方体只需读取的列
+CUBE_COLUMNS = list(dict.fromkeys([SEASON_COL, REGION_COL, VALUE_COL] + list(DIMENSIONS.values())))
+
+# 单个维度的全部单元格：season/region为筛选键，codes为标签编号，
+# size为行数（判断标签是否出现），count/total为非空旅行周期的个数与总和
+DimensionCells = namedtuple('DimensionCells', ['labels', 'season', 'region', 'codes', 'size', 'count', 'total'])
+
+
+class AggregateCube:
+    """(季节, 地域, 维度, 标签) -> (记录数, 总和) 预聚合立方体"""
+
+    def __init__(self, df):
+        missing_cols = [col for col in CUBE_COLUMNS if col not in df.columns]
+        if missing_cols:
+            raise KeyError(f"缺失必要列：{', '.join(missing_cols)}")
+
+        self.all_seasons = df[SEASON_COL].unique().tolist()
+        self.all_regions = df[REGION_COL].unique().tolist()
+        self._dimensions = {dim: self._build_dimension(df, col) for dim, col in DIMENSIONS.items()}
+
+    @staticmethod
+    def _build_dimension(df, col):
+        keys = [SEASON_COL, REGION_COL] if col in (SEASON_COL, REGION_COL) else [SEASON_COL, REGION_COL, col]
+        grouped = df.groupby(keys, dropna=False, observed=True)[VALUE_COL].agg(['size', 'count', 'sum']).reset_index()
+        # 与 groupby(col).mean() 一致：标签为空的行不参与该维度的统计
+        grouped = grouped[grouped[col].notna()]
+        labels, codes = np.unique(grouped[col].to_numpy(dtype=object), return_inverse=True)
+        return DimensionCells(
+            labels=labels,
+            season=grouped[SEASON_COL].to_numpy(dtype=object),
+            region=grouped[REGION_COL].to_numpy(dtype=object),
+            codes=codes.ravel(),
+            size=grouped['size'].to_numpy(dtype=float),
+            count=grouped['count'].to_numpy(dtype=float),
+            total=grouped['sum'].to_numpy(dtype=float),
+        )
+
+    def query(self, season=None, region=None):
+        """
+        汇总指定筛选条件下各维度的平均旅行周期（保留2位小数）
+        :return: {维度: {"labels": [...], "values": [...]}}，标签按字典序排列
+        """
+        result = {}
+        for dim, cells in self._dimensions.items():
+            mask = np.ones(len(cells.codes), dtype=bool)
+            if season:
+                mask &= cells.season == season
+            if region:
+                mask &= cells.region == region
+
+            n_labels = len(cells.labels)
+            codes = cells.codes[mask]
+            size = np.bincount(codes, weights=cells.size[mask], minlength=n_labels)
+            count = np.bincount(codes, weights=cells.count[mask], minlength=n_labels)
+            total = np.bincount(codes, weights=cells.total[mask], minlength=n_labels)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = np.where(count > 0, total / count, 0.0)  # 空值填充为0
+
+            present = size > 0
+            result[dim] = {
+                "labels": cells.labels[present].tolist(),
+                "values": np.round(means[present], 2).tolist(),
+            }
+        return result
+
+
+_cube_lock = threading.Lock()
+_cube_entry = None  # (构建立方体时的DataFrame, 立方体)
+
+
+def get_aggregate_cube():
+    """获取当前数据集版本的立方体；数据集重新加载后自动重建"""
+    global _cube_entry
+    df = get_cleaned_data(CUBE_COLUMNS)
+    entry = _cube_entry
+    if entry is not None and entry[0] is df:
+        return entry[1]
+    with _cube_lock:
+        entry = _cube_entry
+        if entry is not None and entry[0] is df:
+            return entry[1]
+        cube = AggregateCube(df)
+        _cube_entry = (df, cube)
+        return cube
+
+
+class DatabaseAggregator:
+    """
+    基于 TravelRecord 表的聚合后端，query() 的返回格式与 AggregateCube 相同
+    5个维度的分组均值合并为一条 UNION ALL 查询，一次数据库往返完成
+    """
+
+    def __init__(self, queryset=None):
+        self.queryset = TravelRecord.objects.all() if queryset is None else queryset
+        self._filter_values = None
+
+    def _load_filter_values(self):
+        # 季节/地域按首次出现的顺序排列（与从CSV读取时 unique() 的顺序一致）
+        if self._filter_values is None:
+            rows = (self.queryset.values('season', 'region')
+                    .annotate(first_id=Min('id'))
+                    .order_by('first_id'))
+            seasons, regions = {}, {}
+            for row in rows:
+                seasons.setdefault(row['season'], None)
+                regions.setdefault(row['region'], None)
+            self._filter_values = (list(seasons), list(regions))
+        return self._filter_values
+
+    @property
+    def all_seasons(self):
+        return self._load_filter_values()[0]
+
+    @property
+    def all_regions(self):
+        return self._load_filter_values()[1]
+
+    def _grouped_means(self, queryset):
+        """返回 [(维度, 标签, 平均旅行周期)]"""
+        # 每个维度一个分组查询，dimension为区分维度的常量列
+        grouped = [
+            queryset.annotate(dimension=Value(dim, output_field=CharField()))
+            .values('dimension', label=F(field))
+            .annotate(avg_duration=Avg('duration'), record_count=Count('id'))
+            .order_by()
+            for dim, field in DB_DIMENSIONS.items()
+        ]
+        return [
+            (row['dimension'], row['label'], row['avg_duration'] or 0.0)
+            for row in grouped[0].union(*grouped[1:], all=True)
+            if row['label'] is not None and row['record_count'] > 0
+        ]
+
+    def query(self, season=None, region=None):
+        """汇总指定筛选条件下各维度的平均旅行周期（保留2位小数），标签按字典序排列"""
+        queryset = self.queryset
+        if season:
+            queryset = queryset.filter(season=season)
+        if region:
+            queryset = queryset.filter(region=region)
+
+        rows = {dim: [] for dim in DB_DIMENSIONS}
+        for dim, label, mean in self._grouped_means(queryset):
+            rows[dim].append((label, mean))
+
+        result = {}
+        for dim, items in rows.items():
+            items.sort(key=lambda item: item[0])
+            result[dim] = {
+                "labels": [label for label, _ in items],
+                "values": np.round(np.array([value for _, value in items], dtype=float), 2).tolist(),
+            }
+        return result
+
+
+class SummaryAggregator(DatabaseAggregator):
+    """基于汇总表 TravelAggregate 的聚合后端：各单元格的记录数/总和已预先累计，一次分组求和即可"""
+
+    def __init__(self, queryset=None):
+        super().__init__(TravelAggregate.objects.all() if queryset is None else queryset)
+
+    def _grouped_means(self, queryset):
+        rows = (queryset.values('dimension', 'label')
+                .annotate(record_count=Sum('record_count'), duration_sum=Sum('duration_sum'))
+                .order_by())
+        return [
+            (row['dimension'], row['label'], row['duration_sum'] / row['record_count'])
+            for row in rows
+            if row['dimension'] in DB_DIMENSIONS and row['record_count'] > 0
+        ]
+
+
+def get_aggregator():
+    """按 settings.TRAVEL_AGGREGATION_BACKEND 选择聚合后端（'dataframe' / 'orm' / 'summary'）"""
+    backend = getattr(settings, 'TRAVEL_AGGREGATION_BACKEND', 'dataframe')
+    if backend == 'dataframe':
+        return get_aggregate_cube()
+    if backend == 'orm':
+        return DatabaseAggregator()
+    if backend == 'summary':
+        return SummaryAggregator()
+    raise ImproperlyConfigured(f"未知的聚合后端：{backend}（可选 'dataframe' / 'orm' / 'summary'）")
+
+
+def get_dataset_version():
+    """
+    获取当前聚合后端数据的版本，只读取文件元数据或汇总表的校验值，不加载数据
+    - dataframe：清洁数据文件的 (路径, mtime, size)
+    - orm / summary：导入时增量维护的汇总表 TravelAggregate 的校验值（单元格数与按id加权的计数/总和）
+    - orm 另外加入 TravelRecord 的记录数与最大id：未经导入流程（不更新汇总表）新增/删除记录时版本同样变化；
+      未经导入流程原地修改已有记录（记录数与最大id不变）时无法察觉，需经 import_travel_data 写入或清空缓存
+    """
+    backend = getattr(settings, 'TRAVEL_AGGREGATION_BACKEND', 'dataframe')
+    if backend == 'dataframe':
+        path, mtime_ns, size = data_signature()
+        raw = f"{backend}:{path}:{mtime_ns}:{size}"
+        last_modified = datetime.fromtimestamp(mtime_ns / 1e9, tz=timezone.utc)
+    elif backend in ('orm', 'summary'):
+        stats = TravelAggregate.objects.aggregate(
+            cells=Count('id'),
+            last_id=Max('id'),
+            records=Sum(F('record_count') * F('id')),
+            total=Sum(F('duration_sum') * F('id')),
+        )
+        raw = f"{backend}:{stats['cells']}:{stats['last_id']}:{stats['records']}:{stats['total']}"
+        if backend == 'orm':
+            # orm后端直接聚合TravelRecord表：加入记录数与最大id（只读取id，不读取记录内容）
+            records = TravelRecord.objects.aggregate(count=Count('id'), last_id=Max('id'))
+            raw += f":{records['count']}:{records['last_id']}"
+        last_modified = None
+    else:
+        raise ImproperlyConfigured(f"未知的聚合后端：{backend}（可选 'dataframe' / 'orm' / 'summary'）")
+    return DatasetVersion(hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16], last_modified)
@@ -0,0 +1,188 @@
+"""
+版本化模型产物存储
+
+每次训练生成一个不可变的版本目录 static/model/artifacts/<版本>/：
+- model.joblib：模型（不压缩保存，加载时以内存映射方式读取其中的数组）
+- metrics.json：评估指标（MAE、R²、训练/测试样本数等）
+- schema.json：特征与目标列
+- manifest.json：版本号、创建时间、模型来源、数据哈希、模型类型、依赖库版本
+artifacts/current 文件保存当前使用的版本号，发布新版本时先完整写入版本目录，
+再原子替换 current，读取方不会看到写了一半的产物。
+
+manifest 的 data_hashes 按数据种类（清洁数据 dataset / 增量统计量 statistics）记录数据哈希，
+发布新版本时沿用当前版本中其他种类的哈希：各发布方只与同种类的哈希比较，
+训练参数或模型来源不同不会使其他发布方误判数据已变化。
+"""
+import json
+import os
+import shutil
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import sklearn
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, 'static', 'model')
+ARTIFACT_ROOT = os.path.join(MODEL_DIR, 'artifacts')
+CURRENT_POINTER = 'current'
+MODEL_FILE = 'model.joblib'
+METRICS_FILE = 'metrics.json'
+SCHEMA_FILE = 'schema.json'
+MANIFEST_FILE = 'manifest.json'
+# 保留的历史版本数（不含当前版本），更早的版本在发布新版本后删除
+DEFAULT_KEEP_VERSIONS = 5
+
+# 已加载的产物：model为模型对象，metrics/schema/manifest为对应JSON内容
+Artifact = namedtuple('Artifact', ['version', 'model', 'metrics', 'schema', 'manifest'])
+
+
+def _write_json(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ArtifactStore:
+    """模型产物目录：发布、读取当前版本、加载与清理历史版本"""
+
+    def __init__(self, root=ARTIFACT_ROOT, keep_versions=DEFAULT_KEEP_VERSIONS):
+        self.root = root
+        self.keep_versions = keep_versions
+        self._publish_lock = threading.Lock()
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.root, CURRENT_POINTER)
+
+    def version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def current_version(self):
+        """当前版本号；尚未发布任何版本时返回None"""
+        try:
+            with open(self.pointer_path, encoding='utf-8') as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def pointer_signature(self):
+        """current 文件的签名（mtime/size），用于判断是否发布了新版本；不存在时抛出FileNotFoundError"""
+        st = os.stat(self.pointer_path)
+        return st.st_mtime_ns, st.st_size
+
+    def read_manifest(self, version):
+        return _read_json(os.path.join(self.version_dir(version), MANIFEST_FILE))
+
+    def read_metrics(self, version):
+        return _read_json(os.path.join(self.version_dir(version), METRICS_FILE))
+
+    def current_manifest(self):
+        """当前版本的manifest；尚未发布或文件缺失时返回None"""
+        version = self.current_version()
+        if version is None:
+            return None
+        try:
+            return self.read_manifest(version)
+        except FileNotFoundError:
+            return None
+
+    def current_data_hash(self, kind):
+        """当前版本记录的某种类数据的哈希；尚未发布或没有记录时返回None"""
+        manifest = self.current_manifest()
+        if manifest is None:
+            return None
+        return manifest.get('data_hashes', {}).get(kind)
+
+    def load(self, version=None, mmap=True):
+        """加载指定版本（默认当前版本）的产物；mmap为True时模型中的数组以只读内存映射方式读取"""
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"模型产物不存在：{self.pointer_path}")
+        directory = self.version_dir(version)
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"模型产物目录不存在：{directory}")
+        model = joblib.load(os.path.join(directory, MODEL_FILE), mmap_mode='r' if mmap else None)
+        return Artifact(
+            version,
+            model,
+            _read_json(os.path.join(directory, METRICS_FILE)),
+            _read_json(os.path.join(directory, SCHEMA_FILE)),
+            _read_json(os.path.join(directory, MANIFEST_FILE)),
+        )
+
+    def publish(self, model, metrics, schema, dataset_hash, extra=None, source='pipeline', hash_kind='dataset'):
+        """
+        写入新版本并切换 current，返回版本号
+        :param dataset_hash: 训练数据的哈希（只由数据决定，不包含训练参数）
+        :param extra: 写入manifest的附加信息（如训练参数）
+        :param source: 模型来源（pipeline / sweep / incremental）
+        :param hash_kind: 数据哈希的种类（dataset / statistics）
+        """
+        # 版本号使用UTC时间：不同时区设置的进程（如Django服务与独立脚本）发布的版本号仍按发布顺序排序
+        created_at = datetime.now(timezone.utc)
+        version = f"{created_at.strftime('%Y%m%d-%H%M%S-%f')}-{dataset_hash[:8]}"
+        previous = self.current_manifest() or {}
+        manifest = {
+            "version": version,
+            "created_at": created_at.isoformat(timespec='seconds'),
+            "model_source": source,
+            "dataset_hash": dataset_hash,
+            "data_hashes": {**previous.get('data_hashes', {}), hash_kind: dataset_hash},
+            "model_type": type(model).__name__,
+            "files": {"model": MODEL_FILE, "metrics": METRICS_FILE, "schema": SCHEMA_FILE},
+            "library_versions": {"sklearn": sklearn.__version__, "numpy": np.__version__},
+            **(extra or {}),
+        }
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = os.path.join(self.root, f".{version}.{os.getpid()}.tmp")
+        os.makedirs(tmp_dir)
+        try:
+            joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+            _write_json(metrics, os.path.join(tmp_dir, METRICS_FILE))
+            _write_json(schema, os.path.join(tmp_dir, SCHEMA_FILE))
+            _write_json(manifest, os.path.join(tmp_dir, MANIFEST_FILE))
+            os.replace(tmp_dir, self.version_dir(version))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        with self._publish_lock:
+            tmp_pointer = f"{self.pointer_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_pointer, 'w', encoding='utf-8') as f:
+                f.write(version)
+            os.replace(tmp_pointer, self.pointer_path)
+        self.prune()
+        return version
+
+    def versions(self):
+        """全部已发布的版本号（按发布时间排序）"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.startswith('.') and os.path.isdir(os.path.join(self.root, name)))
+
+    def prune(self):
+        """删除超出保留数量的历史版本（当前版本始终保留），返回删除的版本号"""
+        current = self.current_version()
+        history = [v for v in self.versions() if v != current]
+        removed = []
+        for version in history[:max(0, len(history) - self.keep_versions)]:
+            try:
+                shutil.rmtree(self.version_dir(version))
+                removed.append(version)
+            except OSError:
+                # 其他进程仍在使用（如Windows下被内存映射的文件）时跳过，下次发布时再清理
+                pass
+        return removed
+
+
+# 进程级单例
+artifact_store = ArtifactStore()
@@ -0,0 +1,173 @@
+"""
+单条预测请求的合并执行（micro-batching）
+
+并发到达的单条预测请求先进入队列，由后台线程在一个很短的等待窗口内（默认2ms）
+或凑满批大小上限（默认256行）后合并为一个 n×3 特征矩阵，执行一次模型加载与一次预测，
+再把每行结果分发给各自等待的请求：
+- 同步视图在请求线程中等待结果；异步视图await结果，等待期间不占用线程
+- 队列中的行数达到上限时立即抛出 ExecutorBusy（视图返回429）
+- 模型加载/预测失败时，同一批的所有请求得到同一个异常，由视图按原有规则转换为错误响应；
+  执行一批时出现的其他异常同样只让这一批请求失败，后台线程继续运行（线程意外退出时下次提交会重新启动）
+- 请求最多等待 PREDICTION_COALESCE_TIMEOUT 秒，超时抛出 PredictionTimeout（视图返回503 + Retry-After）
+- 后台线程不等待模型训练：model_getter 应在模型缺失时立即抛出异常，冷启动训练由请求线程等待
+- 记录每批行数、排队等待时间与批次数（按触发原因 window/full）
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+from django.conf import settings
+
+from .executor import ExecutorBusy
+from .metrics import record_rejected, registry
+from .prediction import predict_durations
+
+logger = logging.getLogger('travel_app')
+
+# 单行预测结果：预测值、区间下限、区间上限、结果解读、区间置信度标签
+PredictionResult = namedtuple('PredictionResult',
+                              ['pred_duration', 'lower_bound', 'upper_bound', 'analysis', 'confidence'])
+
+_Pending = namedtuple('_Pending', ['row', 'future', 'enqueued'])
+
+
+class PredictionTimeout(Exception):
+    """等待合并预测结果超时，调用方应稍后重试"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"预测服务繁忙，请{retry_after}秒后重试")
+        self.retry_after = retry_after
+
+
+class PredictionBatcher:
+    """合并并发的单条预测请求（首次提交时启动后台线程）"""
+
+    def __init__(self, model_getter, window=None, max_batch=None, max_queue=None, timeout=None):
+        """
+        :param model_getter: 返回 (model, intervals) 的函数，每批调用一次（不应等待模型训练）
+        :param window: 等待窗口（秒），max_batch: 批大小上限，max_queue: 队列行数上限，
+                       timeout: 请求等待结果的上限（秒）；None表示取settings
+        """
+        self.model_getter = model_getter
+        self._window = window
+        self._max_batch = max_batch
+        self._max_queue = max_queue
+        self._timeout = timeout
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @property
+    def window(self):
+        if self._window is not None:
+            return self._window
+        return getattr(settings, 'PREDICTION_COALESCE_WINDOW_MS', 2) / 1000
+
+    @property
+    def max_batch(self):
+        return self._max_batch or getattr(settings, 'PREDICTION_COALESCE_MAX_BATCH', 256)
+
+    @property
+    def max_queue(self):
+        return self._max_queue or getattr(settings, 'PREDICTION_COALESCE_MAX_QUEUE', 4096)
+
+    @property
+    def timeout(self):
+        return self._timeout or getattr(settings, 'PREDICTION_COALESCE_TIMEOUT', 5)
+
+    def _timed_out(self, future):
+        future.cancel()
+        logger.warning(f"合并预测等待超时（{self.timeout}秒）")
+        return PredictionTimeout(getattr(settings, 'ASYNC_EXECUTOR_RETRY_AFTER', 1))
+
+    def submit(self, row):
+        """提交一行特征 [age, acc_cost, trans_cost]，返回结果为PredictionResult的Future"""
+        future = Future()
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                record_rejected('prediction-batcher')
+                raise ExecutorBusy(getattr(settings, 'ASYNC_EXECUTOR_RETRY_AFTER', 1))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+                self._thread.start()
+            self._queue.append(_Pending(row, future, time.monotonic()))
+            # 队列由空变为非空时唤醒后台线程开始计时；凑满一批时唤醒其提前执行
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._condition.notify()
+        return future
+
+    def predict(self, row):
+        """同步等待一行的预测结果（最多等待 timeout 秒）"""
+        future = self.submit(row)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            raise self._timed_out(future)
+
+    async def apredict(self, row):
+        """异步等待一行的预测结果（等待期间不占用线程，最多等待 timeout 秒）"""
+        future = self.submit(row)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out(future)
+
+    def _next_batch(self):
+        """等待第一行到达后，再等到窗口到期或凑满一批，取出一批待预测的行"""
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            deadline = self._queue[0].enqueued + self.window
+            max_batch = self.max_batch
+            while len(self._queue) < max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            reason = 'full' if len(self._queue) >= max_batch else 'window'
+            size = min(len(self._queue), max_batch)
+            return [self._queue.popleft() for _ in range(size)], reason
+
+    def _run(self):
+        while True:
+            batch, reason = self._next_batch()
+            try:
+                self._execute(batch, reason)
+            except Exception as e:
+                # 任何异常都只让这一批请求失败，后台线程继续处理后续请求
+                logger.error(f"合并预测执行失败: {str(e)}", exc_info=True)
+                for item in batch:
+                    try:
+                        item.future.set_exception(e)
+                    except InvalidStateError:
+                        pass  # 已得到结果或已取消
+
+    def _execute(self, batch, reason):
+        started = time.monotonic()
+        # 跳过已取消的请求（异步请求的客户端断开后，其Future被取消）
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            model, intervals = self.model_getter()
+            features = np.array([item.row for item in batch], dtype=float)
+            pred, lower, upper, analysis = predict_durations(model, intervals, features)
+        except Exception as e:
+            for item in batch:
+                item.future.set_exception(e)
+        else:
+            rows = zip(batch, pred.tolist(), lower.tolist(), upper.tolist(), analysis.tolist())
+            for item, pred_duration, lower_bound, upper_bound, text in rows:
+                item.future.set_result(
+                    PredictionResult(pred_duration, lower_bound, upper_bound, text, intervals.confidence))
+
+        if getattr(settings, 'METRICS_ENABLED', True):
+            registry.observe('travel_prediction_batch_size', len(batch))
+            registry.inc('travel_prediction_batches_total', reason=reason)
+            for item in batch:
+                registry.observe('travel_prediction_batch_wait_seconds', started - item.enqueued)
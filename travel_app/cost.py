@@ -0,0 +1,204 @@
+"""
+旅行费用计算的输入校验与结果计算
+
+费用计算器页面与费用方案批量接口共用同一套规则：
+- 参数缺失 / 非数字（布尔值、数组、对象以及 nan/inf 同样视为非数字）/ 旅行时长不在0-365之间 / 费用为负数 均视为无效输入
+- 总预算 = 日均住宿费用 × 旅行时长 + 总交通费用，日均预算 = 总预算 / 旅行时长
+- 优化建议按 住宿占比 > 交通占比 > 日均预算 的优先级给出
+批量计算全部基于NumPy数组：方案网格（如 时长1-30天 × 多档住宿费用）先展开为笛卡尔积，
+再一次校验、一次计算整批数据。
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from .prediction import parse_numeric_column
+
+# 接口参数名（与费用计算器页面表单字段一致）
+COST_FIELDS = ['duration', 'acc_cost', 'trans_cost']
+
+MSG_MISSING = "缺失必要参数：旅行时长/日均住宿费用/总交通费用"
+MSG_FORMAT = "参数格式错误：所有参数必须为数字"
+MSG_DURATION = "旅行时长必须为0-365之间的正数"
+MSG_COST = "住宿/交通费用不能为负数"
+MSG_ROW = "行格式错误：每行必须为对象或 [duration, acc_cost, trans_cost] 数组"
+
+MAX_DURATION = 365
+# 建议阈值：住宿占比（%）、交通占比（%）、日均预算（元）
+HIGH_ACC_RATIO = 60
+HIGH_TRANS_RATIO = 50
+LOW_DAILY_COST = 200
+
+# 建议代码 -> 建议内容（代码按优先级排列，最后一项为默认值）
+SUGGESTIONS = {
+    'high_acc_ratio': "住宿费用占比过高（>60%），建议选择性价比更高的住宿（如民宿、青旅），可降低10-20%成本",
+    'high_trans_ratio': "交通费用占比过高（>50%），建议提前预订机票/火车票，或选择更经济的交通方式（如高铁替代飞机）",
+    'low_daily_cost': "日均预算较低（<200元），建议提前规划行程，避免临时消费超支",
+    'balanced': "费用分配合理，符合中等旅行预算水平，可按此计划出行",
+}
+
+
+def validate_cost_input(duration_str, acc_cost_str, trans_cost_str):
+    """校验单条费用计算参数，返回 (duration, acc_cost, trans_cost)，无效时抛出ValueError"""
+    # 异常1：参数缺失
+    if not all([duration_str, acc_cost_str, trans_cost_str]):
+        raise ValueError(MSG_MISSING)
+
+    # 异常2：参数类型转换失败
+    try:
+        duration = float(duration_str)
+        acc_cost = float(acc_cost_str)
+        trans_cost = float(trans_cost_str)
+    except ValueError:
+        raise ValueError(MSG_FORMAT)
+    # float()可以解析 "nan" / "inf"，与批量接口一致按非数字处理
+    if not all(math.isfinite(value) for value in (duration, acc_cost, trans_cost)):
+        raise ValueError(MSG_FORMAT)
+
+    # 异常3：参数值无效
+    if duration <= 0 or duration > MAX_DURATION:
+        raise ValueError(MSG_DURATION)
+    if acc_cost < 0 or trans_cost < 0:
+        raise ValueError(MSG_COST)
+    return duration, acc_cost, trans_cost
+
+
+def suggestion_code(acc_ratio, trans_ratio, daily_cost):
+    """单条费用的建议代码（优先级与 compute_costs 一致）"""
+    if acc_ratio > HIGH_ACC_RATIO:
+        return 'high_acc_ratio'
+    if trans_ratio > HIGH_TRANS_RATIO:
+        return 'high_trans_ratio'
+    if daily_cost < LOW_DAILY_COST:
+        return 'low_daily_cost'
+    return 'balanced'
+
+
+def validate_cost_batch(frame, malformed=None):
+    """
+    向量化校验批量费用参数
+    :param frame: 包含 COST_FIELDS 列的DataFrame（值可以是字符串或数字）
+    :param malformed: 格式错误的行掩码（如JSON中既不是对象也不是数组的行），这些行返回 MSG_ROW
+    :return: (values, errors, valid)：values为 n×3 的float数组，
+             errors为长度n的object数组（有效行为None，无效行为错误信息），valid为有效行掩码
+    """
+    n = len(frame)
+    missing = np.zeros(n, dtype=bool)
+    invalid = np.zeros(n, dtype=bool)
+    columns = []
+    for field in COST_FIELDS:
+        if field not in frame.columns:
+            missing[:] = True
+            columns.append(np.full(n, np.nan))
+            continue
+        values, is_missing, is_invalid = parse_numeric_column(frame[field])
+        missing |= is_missing
+        invalid |= is_invalid
+        columns.append(values)
+
+    values = np.column_stack(columns) if n else np.empty((0, len(COST_FIELDS)))
+    duration, acc_cost, trans_cost = values[:, 0], values[:, 1], values[:, 2]
+    with np.errstate(invalid='ignore'):
+        bad_duration = (duration <= 0) | (duration > MAX_DURATION)
+        bad_cost = (acc_cost < 0) | (trans_cost < 0)
+
+    if malformed is None:
+        malformed = np.zeros(n, dtype=bool)
+    errors = np.select(
+        [malformed, missing, invalid, bad_duration, bad_cost],
+        [MSG_ROW, MSG_MISSING, MSG_FORMAT, MSG_DURATION, MSG_COST],
+        default='',
+    ).astype(object)
+    valid = ~(malformed | missing | invalid | bad_duration | bad_cost)
+    errors[valid] = None
+    return values, errors, valid
+
+
+def compute_costs(values):
+    """
+    对 n×3 的 (时长, 日均住宿费用, 总交通费用) 矩阵一次计算全部结果
+    :return: 字典，total_cost/daily_cost（保留2位小数）、acc_ratio/trans_ratio（%，保留1位小数）、
+             suggestion_code 均为长度n的数组
+    """
+    duration, acc_cost, trans_cost = values[:, 0], values[:, 1], values[:, 2]
+    total_acc_cost = acc_cost * duration
+    total_cost = total_acc_cost + trans_cost
+    daily_cost = total_cost / duration
+
+    # 总预算为0时占比记为0
+    nonzero = total_cost != 0
+    acc_ratio = np.divide(total_acc_cost, total_cost, out=np.zeros_like(total_cost), where=nonzero) * 100
+    trans_ratio = np.divide(trans_cost, total_cost, out=np.zeros_like(total_cost), where=nonzero) * 100
+
+    codes = list(SUGGESTIONS)
+    code = np.select(
+        [acc_ratio > HIGH_ACC_RATIO, trans_ratio > HIGH_TRANS_RATIO, daily_cost < LOW_DAILY_COST],
+        codes[:-1],
+        default=codes[-1],
+    )
+    return {
+        "total_cost": np.round(total_cost, 2),
+        "daily_cost": np.round(daily_cost, 2),
+        "acc_ratio": np.round(acc_ratio, 1),
+        "trans_ratio": np.round(trans_ratio, 1),
+        "suggestion_code": code,
+    }
+
+
+def _grid_range(name, spec, max_rows=None):
+    """
+    等差序列维度 {"start", "stop", "step"}（包含stop），返回 (start, step, 取值个数)
+    取值个数超出 max_rows 或无法表示（如 step 极小、start/stop 相差极大）时抛出ValueError
+    """
+    try:
+        start, stop = float(spec['start']), float(spec['stop'])
+        step = float(spec.get('step', 1))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"方案网格的{name}范围格式错误：需要数字 start/stop（可选 step）")
+    if not np.isfinite([start, stop, step]).all() or step <= 0 or stop < start:
+        raise ValueError(f"方案网格的{name}范围无效：需要 step > 0 且 stop ≥ start")
+    # 先以浮点数检查个数，再转换为整数（个数为inf时int()会抛出OverflowError）
+    count = np.floor((stop - start) / step + 1e-9) + 1
+    if not np.isfinite(count) or (max_rows is not None and count > max_rows):
+        limit = f"（单次最多计算{max_rows}个费用方案）" if max_rows is not None else ""
+        raise ValueError(f"方案网格的{name}范围取值个数过多{limit}")
+    return start, step, int(count)
+
+
+def _grid_axis(name, spec):
+    """网格的一个维度：取值列表，或 {"start", "stop", "step"} 等差序列"""
+    if isinstance(spec, dict):
+        start, step, count = _grid_range(name, spec)
+        return start + step * np.arange(count)
+    if isinstance(spec, (list, tuple)) and spec:
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in spec):
+            return np.asarray(spec, dtype=float)
+        return np.asarray(spec, dtype=object)
+    if isinstance(spec, (int, float, str)) and not isinstance(spec, bool):
+        return np.asarray([spec], dtype=object)
+    raise ValueError(f"方案网格缺少{name}取值：需要非空数组或 {{\"start\", \"stop\", \"step\"}} 范围")
+
+
+def grid_size(grid, max_rows=None):
+    """
+    方案网格展开后的行数（不实际展开，用于在展开前检查行数上限）
+    :param max_rows: 等差序列维度的取值个数上限，超出时直接抛出ValueError
+    """
+    size = 1
+    for field in COST_FIELDS:
+        spec = grid.get(field)
+        size *= _grid_range(field, spec, max_rows)[2] if isinstance(spec, dict) else len(_grid_axis(field, spec))
+    return size
+
+
+def expand_grid(grid):
+    """
+    将方案网格展开为笛卡尔积（时长变化最快）
+    :param grid: {"duration": [...] 或 {"start", "stop", "step"}, "acc_cost": [...], "trans_cost": [...]}
+    :return: 包含 COST_FIELDS 列的DataFrame
+    """
+    axes = [_grid_axis(field, grid.get(field)) for field in COST_FIELDS]
+    mesh = np.meshgrid(*axes, indexing='ij')
+    # 按 (交通, 住宿, 时长) 的顺序排列，同一档费用的各时长方案相邻
+    return pd.DataFrame({field: m.transpose(2, 1, 0).ravel() for field, m in zip(COST_FIELDS, mesh)})
@@ -0,0 +1,183 @@
+"""
+清洁数据集共享加载器
+
+进程内缓存清洁数据解析后的DataFrame：
+- 每个worker只解析一次，后续请求直接复用内存中的DataFrame
+- 仅当文件mtime/size变化时才重新加载，重新加载过程由锁保护
+- 记录命中/未命中/重新加载次数，便于观察缓存效果
+
+数据源优先使用 data_preprocess.py 生成的列式文件 cleaned_travel_data.parquet
+（分类字段为字典编码，可只读取需要的列）；列式文件不存在、早于CSV或未安装pyarrow时
+回退读取 cleaned_travel_data.csv。两种数据源得到的分类字段均为category类型。
+
+注意：返回的DataFrame在多个请求间共享，调用方只能读取，不能原地修改。
+"""
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # 未安装pyarrow时只使用CSV
+    pq = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLEANED_DATA_PATH = os.path.join(BASE_DIR, 'data', 'cleaned_travel_data.csv')
+CLEANED_COLUMNAR_PATH = os.path.join(BASE_DIR, 'data', 'cleaned_travel_data.parquet')
+
+# 以字典编码（category）存储的低基数字符串字段
+CATEGORICAL_COLUMNS = [
+    'Traveler gender', 'Traveler nationality', 'Accommodation type', 'Transportation type',
+    'Season', 'Age segment', 'Cost range', 'Region',
+]
+
+
+def resolve_data_path():
+    """选择数据源：列式文件存在、不早于CSV且pyarrow可用时优先使用，否则回退CSV"""
+    if pq is not None and os.path.exists(CLEANED_COLUMNAR_PATH):
+        if not os.path.exists(CLEANED_DATA_PATH) or \
+                os.path.getmtime(CLEANED_COLUMNAR_PATH) >= os.path.getmtime(CLEANED_DATA_PATH):
+            return CLEANED_COLUMNAR_PATH
+    return CLEANED_DATA_PATH
+
+
+def data_signature(resolver=resolve_data_path):
+    """当前数据源的文件签名：(路径, mtime_ns, size)，只执行stat不读取数据；文件不存在时抛出FileNotFoundError"""
+    path = resolver()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"清洁数据文件不存在：{path}")
+    return path, st.st_mtime_ns, st.st_size
+
+
+def read_cleaned_csv(path, columns=None):
+    """读取清洁数据CSV，并将pandas解析异常转换为统一的异常类型"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"清洁数据文件不存在：{path}")
+    wanted = None if columns is None else set(columns)
+    try:
+        return pd.read_csv(
+            path,
+            # 缺失的列不在此处报错，由使用方按需校验
+            usecols=None if wanted is None else (lambda col: col in wanted),
+            dtype={col: 'category' for col in CATEGORICAL_COLUMNS},
+        )
+    except PermissionError:
+        raise PermissionError(f"无读取权限：{path}")
+    except pd.errors.EmptyDataError:
+        raise ValueError(f"CSV文件为空：{path}")
+    except pd.errors.ParserError:
+        raise ValueError(f"CSV文件格式错误，无法解析：{path}")
+
+
+def read_cleaned_columnar(path, columns=None):
+    """读取清洁数据列式文件，只解码需要的列"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"清洁数据文件不存在：{path}")
+    try:
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [col for col in columns if col in available]
+        return pd.read_parquet(path, columns=columns)
+    except PermissionError:
+        raise PermissionError(f"无读取权限：{path}")
+    except (OSError, ValueError) as e:
+        raise ValueError(f"列式数据文件格式错误，无法解析：{path}（{str(e)}）")
+
+
+def read_cleaned_data(path, columns=None):
+    """按文件类型读取清洁数据"""
+    if path.endswith('.parquet'):
+        return read_cleaned_columnar(path, columns)
+    return read_cleaned_csv(path, columns)
+
+
+class DatasetCache:
+    """按文件mtime/size失效的DataFrame缓存（线程安全），每个实例缓存一种列投影"""
+
+    def __init__(self, columns=None, resolver=resolve_data_path, loader=read_cleaned_data):
+        self.columns = columns
+        self.resolver = resolver
+        self.loader = loader
+        # (文件签名, DataFrame) 作为一个整体替换，读取时无需加锁
+        self._entry = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def signature(self):
+        """文件签名：(路径, mtime_ns, size)，文件不存在时抛出FileNotFoundError"""
+        return data_signature(self.resolver)
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self):
+        """返回缓存的DataFrame，文件变化时自动重新加载"""
+        signature = self.signature()
+        entry = self._entry
+        if entry is not None and entry[0] == signature:
+            self._count('hits')
+            return entry[1]
+
+        with self._lock:
+            # 双重检查：等待锁期间可能已有其他线程完成加载
+            entry = self._entry
+            if entry is not None and entry[0] == signature:
+                self._count('hits')
+                return entry[1]
+
+            self._count('misses')
+            df = self.loader(signature[0], self.columns)
+            # 使用加载前的签名：加载期间文件若再次变化，下次访问会重新加载
+            self._entry = (signature, df)
+            if entry is not None:
+                self._count('reloads')
+            return df
+
+    def clear(self):
+        """清空缓存（下次访问时重新加载）"""
+        with self._lock:
+            self._entry = None
+
+    def stats(self):
+        """返回缓存统计信息"""
+        entry = self._entry
+        with self._stats_lock:
+            return {
+                "path": entry[0][0] if entry is not None else None,
+                "columns": list(self.columns) if self.columns is not None else None,
+                "loaded": entry is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+            }
+
+
+# 进程级单例：同一worker内所有视图/脚本共享，按列投影分别缓存
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _get_cache(columns):
+    key = None if columns is None else tuple(columns)
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(key, DatasetCache(key))
+    return cache
+
+
+def get_cleaned_data(columns=None):
+    """获取清洁数据DataFrame（只读，共享）；columns指定时只加载这些列"""
+    return _get_cache(columns).get()
+
+
+def get_cache_stats():
+    """获取各列投影缓存的命中/未命中/重新加载统计"""
+    return [cache.stats() for cache in list(_caches.values())]
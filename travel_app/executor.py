@@ -0,0 +1,92 @@
+"""
+异步视图使用的有界线程池
+
+ASGI部署下，异步视图把模型推理、数据聚合等CPU密集/阻塞的工作交给固定数量的工作线程执行，
+事件循环只负责收发请求，同一个worker在计算进行时仍可继续接受连接。
+- 同时进行（执行中 + 排队）的任务数不超过 工作线程数 + 队列长度
+- 超过上限时立即抛出 ExecutorBusy（视图返回429 + Retry-After），不在服务端无限排队
+- 任务结束后关闭本线程中过期的数据库连接，与请求结束时Django的处理一致
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .metrics import record_rejected
+
+
+class ExecutorBusy(Exception):
+    """线程池已满，调用方应稍后重试"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"服务繁忙，请{retry_after}秒后重试")
+        self.retry_after = retry_after
+
+
+def _run_task(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+class BoundedExecutor:
+    """固定工作线程数 + 有界等待队列的线程池（首次使用时按settings创建）"""
+
+    def __init__(self, name='travel-cpu'):
+        self.name = name
+        self._executor = None
+        self._capacity = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _limits():
+        """返回 (工作线程数, 队列长度)"""
+        workers = getattr(settings, 'ASYNC_EXECUTOR_WORKERS', None) or min(4, os.cpu_count() or 1)
+        return workers, getattr(settings, 'ASYNC_EXECUTOR_QUEUE_SIZE', 32)
+
+    def _configure(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    workers, queue_size = self._limits()
+                    self._capacity = workers + queue_size
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, func, *args, **kwargs):
+        """在线程池中执行 func(*args, **kwargs) 并等待结果；线程池已满时抛出ExecutorBusy"""
+        executor = self._configure()
+        with self._lock:
+            if self._pending >= self._capacity:
+                full = True
+            else:
+                full = False
+                self._pending += 1
+        if full:
+            record_rejected(self.name)
+            raise ExecutorBusy(getattr(settings, 'ASYNC_EXECUTOR_RETRY_AFTER', 1))
+
+        # 名额在任务真正结束（或未开始即被取消）时释放：客户端断开导致协程被取消时，
+        # 已在执行的任务仍占用名额，避免实际并发超过上限
+        future = executor.submit(_run_task, func, args, kwargs)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        """当前进行中的任务数与容量（线程池尚未创建时按settings计算容量）"""
+        with self._lock:
+            capacity = self._capacity if self._executor is not None else sum(self._limits())
+            return {"pending": self._pending, "capacity": capacity}
+
+
+# 进程级单例
+cpu_executor = BoundedExecutor()
@@ -0,0 +1,234 @@
+"""
+预测模型的增量训练（正规方程）
+
+线性回归的最小二乘解只依赖充分统计量 AᵀA、Aᵀy（A为 [1, 年龄, 住宿费用, 交通费用]），
+不需要保留全部历史数据：
+- 导入/更新/删除记录时，在同一事务内按差值（新增 +，更新 先-旧值再+新值，删除 -）
+  累加到 TrainingStatistics 表（与汇总表 TravelAggregate 的维护方式相同，见 ingest.py）
+- solve_statistics() 由统计量求解 3 个特征的线性方程组（中心化后最小二乘，与 LinearRegression 的解一致），
+  耗时为微秒级，与记录数无关
+- publish_incremental_model() 将求解结果作为新版本发布到产物目录（见 artifacts.py），
+  manifest 中以 statistics 种类记录统计量哈希，只与上一次增量发布时的统计量哈希比较
+- refit_model() 从 TravelRecord 全量重新拟合 LinearRegression，verify_incremental_model() 对比两者，
+  rebuild_statistics() / check_statistics() 全量重建或校验统计量
+"""
+import hashlib
+import math
+from collections import namedtuple
+
+import numpy as np
+from django.db import transaction
+from sklearn.linear_model import LinearRegression
+
+from .artifacts import artifact_store
+from .intervals import DEFAULT_LEVEL, normal_interval
+from .models import TrainingStatistics, TravelRecord
+from .training import FEATURE_COLS, MODEL_SCHEMA
+
+STATISTICS_NAME = 'travel_duration'
+# 特征与目标对应的 TravelRecord 字段（顺序与 training.FEATURE_COLS 一致）
+FEATURE_FIELDS = ['traveler_age', 'accommodation_cost', 'transportation_cost']
+TARGET_FIELD = 'duration'
+TRAINING_FIELDS = FEATURE_FIELDS + [TARGET_FIELD]
+INCREMENTAL_CONFIG = {"model": "LinearRegression", "method": "normal_equations", "interval_level": DEFAULT_LEVEL}
+
+# row_count为记录数，xtx为 4×4 的AᵀA，xty为长度4的Aᵀy，yty为yᵀy
+Statistics = namedtuple('Statistics', ['row_count', 'xtx', 'xty', 'yty'])
+# 一次发布的结果：statistics_version为统计量的数据版本，skipped为True表示统计量未变化、未发布新版本
+IncrementalOutcome = namedtuple('IncrementalOutcome', ['version', 'metrics', 'statistics_version', 'skipped'])
+
+
+# ---------------------- 1. 统计量计算与求解 ----------------------
+def empty_statistics():
+    size = len(FEATURE_FIELDS) + 1
+    return Statistics(0, np.zeros((size, size)), np.zeros(size), 0.0)
+
+
+def compute_statistics(records, sign=1):
+    """
+    计算一批记录的充分统计量
+    :param records: 每行为 (年龄, 住宿费用, 交通费用, 旅行周期) 的二维数组（或可转换为数组的行列表）
+    :param sign: 1 表示新增，-1 表示移除
+    """
+    data = np.asarray(records, dtype=float).reshape(-1, len(TRAINING_FIELDS))
+    if not len(data):
+        return empty_statistics()
+    design = np.column_stack([np.ones(len(data)), data[:, :-1]])
+    y = data[:, -1]
+    return Statistics(sign * len(data), sign * (design.T @ design), sign * (design.T @ y), sign * float(y @ y))
+
+
+def merge_statistics(*stats):
+    """合并多组统计量（对应位置相加）"""
+    total = empty_statistics()
+    for s in stats:
+        total = Statistics(total.row_count + s.row_count, total.xtx + s.xtx, total.xty + s.xty, total.yty + s.yty)
+    return total
+
+
+def solve_statistics(stats):
+    """
+    由统计量求解线性回归系数，返回 (coef, intercept)
+    在中心化后的正规方程上做最小二乘（与 LinearRegression 先中心化再求解的方式一致，特征共线时取最小范数解）
+    """
+    n = stats.row_count
+    if n <= 0:
+        raise ValueError("训练统计量为空，请先导入数据")
+    sum_x, sum_y = stats.xtx[0, 1:], stats.xty[0]
+    cxx = stats.xtx[1:, 1:] - np.outer(sum_x, sum_x) / n
+    cxy = stats.xty[1:] - sum_x * sum_y / n
+    coef = np.linalg.lstsq(cxx, cxy, rcond=None)[0]
+    return coef, float((sum_y - sum_x @ coef) / n)
+
+
+def statistics_metrics(stats, coef, intercept):
+    """
+    由统计量计算训练集上的评估指标：RMSE、R²，以及按残差近似正态估计的MAE（RMSE×√(2/π)）；
+    不保留明细数据时无法精确计算MAE与残差分位数，预测区间同样按正态近似由RMSE计算
+    """
+    n = stats.row_count
+    beta = np.concatenate([[intercept], coef])
+    sse = max(stats.yty - 2 * beta @ stats.xty + beta @ stats.xtx @ beta, 0.0)
+    sst = stats.yty - stats.xty[0] ** 2 / n
+    rmse = math.sqrt(sse / n)
+    return {
+        "mae": rmse * math.sqrt(2 / math.pi),
+        "mae_estimated": True,
+        "rmse": rmse,
+        "r2": float(1 - sse / sst) if sst > 0 else None,
+        "n_train": n,
+        "n_test": 0,
+        "interval": normal_interval(rmse, INCREMENTAL_CONFIG['interval_level']),
+    }
+
+
+def build_model(coef, intercept):
+    """构造与 LinearRegression.fit 结果等价的模型对象（预测只需要 coef_ 与 intercept_）"""
+    model = LinearRegression()
+    model.coef_ = np.asarray(coef, dtype=float)
+    model.intercept_ = float(intercept)
+    model.n_features_in_ = len(FEATURE_COLS)
+    model.feature_names_in_ = np.array(FEATURE_COLS, dtype=object)
+    return model
+
+
+# ---------------------- 2. 统计量的存储与增量更新 ----------------------
+def _to_statistics(row):
+    if not row.row_count and not row.xtx:
+        return empty_statistics()
+    return Statistics(row.row_count, np.array(row.xtx, dtype=float), np.array(row.xty, dtype=float), row.yty)
+
+
+def _save_statistics(row, stats):
+    row.row_count = int(stats.row_count)
+    row.xtx = stats.xtx.tolist()
+    row.xty = stats.xty.tolist()
+    row.yty = float(stats.yty)
+    row.version += 1
+    row.save()
+
+
+def apply_statistics(delta):
+    """将差值累加到统计量表（须在事务内调用，统计量行加锁后更新），返回更新后的数据版本"""
+    if not delta.row_count and not delta.xtx.any() and not delta.xty.any() and not delta.yty:
+        return None
+    row, _ = TrainingStatistics.objects.select_for_update().get_or_create(name=STATISTICS_NAME)
+    _save_statistics(row, merge_statistics(_to_statistics(row), delta))
+    return row.version
+
+
+def load_statistics():
+    """返回 (统计量, 数据版本)；尚未导入数据时返回空统计量与版本0"""
+    row = TrainingStatistics.objects.filter(name=STATISTICS_NAME).first()
+    if row is None:
+        return empty_statistics(), 0
+    return _to_statistics(row), row.version
+
+
+def _all_training_rows():
+    rows = TravelRecord.objects.order_by('id').values_list(*TRAINING_FIELDS)
+    return np.array(list(rows), dtype=float).reshape(-1, len(TRAINING_FIELDS))
+
+
+@transaction.atomic
+def rebuild_statistics():
+    """从 TravelRecord 全量重建统计量，返回记录数"""
+    stats = compute_statistics(_all_training_rows())
+    row, _ = TrainingStatistics.objects.select_for_update().get_or_create(name=STATISTICS_NAME)
+    _save_statistics(row, stats)
+    return stats.row_count
+
+
+def check_statistics(rel_tol=1e-9, abs_tol=1e-6):
+    """
+    对比统计量表与 TravelRecord 全量计算的结果
+    :return: 不一致的项列表 [(名称, 统计量表中的值, 全量计算的值)]
+    """
+    actual, _ = load_statistics()
+    expected = compute_statistics(_all_training_rows())
+    mismatches = []
+    if actual.row_count != expected.row_count:
+        mismatches.append(('row_count', actual.row_count, expected.row_count))
+    for name in ('xtx', 'xty', 'yty'):
+        got, want = np.asarray(getattr(actual, name)), np.asarray(getattr(expected, name))
+        if not np.allclose(got, want, rtol=rel_tol, atol=abs_tol):
+            mismatches.append((name, got.tolist(), want.tolist()))
+    return mismatches
+
+
+# ---------------------- 3. 发布与全量校验 ----------------------
+def statistics_hash(stats):
+    """统计量的SHA-256摘要（写入manifest的data_hashes.statistics，统计量未变化时跳过发布）"""
+    digest = hashlib.sha256(np.array([stats.row_count, stats.yty], dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(stats.xtx, dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(stats.xty, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def publish_incremental_model(force=False, store=artifact_store):
+    """
+    由当前统计量求解模型并发布为新版本；统计量自上一次增量发布以来未变化时跳过
+    （当前版本是其后由训练流水线发布的模型时同样保留，不与清洁数据的哈希比较）
+    :return: IncrementalOutcome
+    """
+    stats, statistics_version = load_statistics()
+    data_hash = statistics_hash(stats)
+    if not force and store.current_data_hash('statistics') == data_hash:
+        version = store.current_version()
+        return IncrementalOutcome(version, store.read_metrics(version), statistics_version, True)
+
+    coef, intercept = solve_statistics(stats)
+    metrics = statistics_metrics(stats, coef, intercept)
+    version = store.publish(build_model(coef, intercept), metrics, MODEL_SCHEMA, data_hash,
+                            extra={"train_config": INCREMENTAL_CONFIG, "statistics_version": statistics_version},
+                            source='incremental', hash_kind='statistics')
+    return IncrementalOutcome(version, metrics, statistics_version, False)
+
+
+def refit_model():
+    """从 TravelRecord 全量拟合 LinearRegression（用于校验增量结果），返回 (coef, intercept, 记录数)"""
+    data = _all_training_rows()
+    if not len(data):
+        raise ValueError("数据库中没有旅行记录，请先导入数据")
+    model = LinearRegression().fit(data[:, :-1], data[:, -1])
+    return model.coef_, float(model.intercept_), len(data)
+
+
+def verify_incremental_model(rel_tol=1e-6, abs_tol=1e-9):
+    """
+    对比统计量求解结果与全量拟合结果
+    :return: (是否一致, 详情字典)
+    """
+    stats, statistics_version = load_statistics()
+    coef, intercept = solve_statistics(stats)
+    refit_coef, refit_intercept, rows = refit_model()
+    expected = np.concatenate([[refit_intercept], refit_coef])
+    actual = np.concatenate([[intercept], coef])
+    matched = rows == stats.row_count and np.allclose(actual, expected, rtol=rel_tol, atol=abs_tol)
+    return matched, {
+        "statistics_version": statistics_version,
+        "rows": {"statistics": int(stats.row_count), "refit": rows},
+        "incremental": {"intercept": intercept, "coef": coef.tolist()},
+        "refit": {"intercept": refit_intercept, "coef": refit_coef.tolist()},
+        "max_abs_diff": float(np.max(np.abs(actual - expected))),
+    }
@@ -0,0 +1,209 @@
+"""
+旅行原始数据批量导入数据库
+
+- 原始CSV按 batch_size 分块读取，派生字段（月份/季节/年龄分段/总费用/费用区间/地域）
+  复用 data_preprocess.preprocess_travel_data，与清洁数据CSV的规则完全一致
+- 记录由列数组直接构建（不逐行iterrows），每批一个事务
+- 按 trip_id 执行 upsert：重复导入时更新已有记录，不会插入重复数据
+- 可选SQLite快速路径：PRAGMA synchronous=OFF + journal_mode=WAL，
+  使用 executemany 执行 INSERT ... ON CONFLICT(trip_id) DO UPDATE，适合百万行以上的导入
+- 汇总表 TravelAggregate 在每批的事务内按差值增量更新（见 summary.py）
+- 预测模型的训练统计量 TrainingStatistics 在同一事务内按差值增量更新（见 incremental.py）
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+
+from data_preprocess import DEFAULT_RAW_DATA_PATH, preprocess_travel_data, read_raw_data
+
+from .incremental import TRAINING_FIELDS, apply_statistics, compute_statistics, merge_statistics
+from .models import TravelRecord
+from .summary import (
+    LOOKUP_CHUNK_SIZE, SUMMARY_FIELDS, apply_deltas, compute_deltas, fetch_summary_rows, merge_deltas,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# 模型字段 -> 预处理后的数据列
+FIELD_COLUMNS = {
+    'trip_id': 'Trip ID',
+    'destination': 'Destination',
+    'start_date': 'Start date',
+    'end_date': 'End date',
+    'duration': 'Duration (days)',
+    'traveler_name': 'Traveler name',
+    'traveler_age': 'Traveler age',
+    'traveler_gender': 'Traveler gender',
+    'traveler_nationality': 'Traveler nationality',
+    'accommodation_type': 'Accommodation type',
+    'accommodation_cost': 'Accommodation cost',
+    'transportation_type': 'Transportation type',
+    'transportation_cost': 'Transportation cost',
+    'month': 'Month',
+    'season': 'Season',
+    'age_segment': 'Age segment',
+    'total_cost': 'Total cost',
+    'cost_range': 'Cost range',
+    'region': 'Region',
+}
+FIELDS = list(FIELD_COLUMNS)
+UNIQUE_FIELD = 'trip_id'
+UPDATE_FIELDS = [field for field in FIELDS if field != UNIQUE_FIELD]
+DATE_FIELDS = ['start_date', 'end_date']
+# 更新/删除前需要读取旧值的字段（汇总表 + 训练统计量）
+DELTA_FIELDS = list(dict.fromkeys(SUMMARY_FIELDS + TRAINING_FIELDS))
+
+# 导入结果：rows_in为读取的原始行数，rows_written为新增或更新的记录数，skipped为跳过的无效行数
+ImportResult = namedtuple('ImportResult', ['rows_in', 'rows_written', 'skipped', 'batches', 'elapsed'])
+
+
+def prepare_batch(raw):
+    """
+    清洗一批原始数据并转换为模型字段
+    :return: {模型字段: 列数组}，数据库字段均不允许为空，任一字段缺失的行被跳过
+    """
+    df = preprocess_travel_data(raw)
+    df['End date'] = pd.to_datetime(df['End date'], format='%m/%d/%Y', errors='coerce')
+    df = df[list(FIELD_COLUMNS.values())].dropna()
+    # 同一批内trip_id重复时保留最后一条（与逐条upsert的结果一致）
+    df = df.drop_duplicates(subset='Trip ID', keep='last')
+
+    columns = {}
+    for field, col in FIELD_COLUMNS.items():
+        if field in DATE_FIELDS:
+            columns[field] = df[col].dt.date.tolist()
+        elif field in ('trip_id', 'month'):
+            columns[field] = df[col].astype(int).tolist()
+        else:
+            columns[field] = df[col].tolist()
+    return columns
+
+
+def _write_batch_orm(columns):
+    """ORM路径：bulk_create + update_conflicts，按trip_id upsert"""
+    records = [TravelRecord(**dict(zip(FIELDS, values))) for values in zip(*(columns[f] for f in FIELDS))]
+    TravelRecord.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=[UNIQUE_FIELD],
+        update_fields=UPDATE_FIELDS,
+    )
+    return len(records)
+
+
+def _upsert_sql():
+    qn = connection.ops.quote_name
+    table = qn(TravelRecord._meta.db_table)
+    columns = ', '.join(qn(field) for field in FIELDS)
+    placeholders = ', '.join(['%s'] * len(FIELDS))
+    updates = ', '.join(f"{qn(field)} = excluded.{qn(field)}" for field in UPDATE_FIELDS)
+    return (f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT({qn(UNIQUE_FIELD)}) DO UPDATE SET {updates}")
+
+
+def _write_batch_sqlite(cursor, sql, columns):
+    """SQLite快速路径：一次executemany写入整批数据"""
+    values = {field: ([d.isoformat() for d in columns[field]] if field in DATE_FIELDS else columns[field])
+              for field in FIELDS}
+    rows = list(zip(*(values[f] for f in FIELDS)))
+    cursor.executemany(sql, rows)
+    return len(rows)
+
+
+class _SQLiteFastMode:
+    """导入期间临时关闭同步写盘并切换为WAL日志模式，结束后恢复原设置"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def _pragma(self, name, value=None):
+        if value is None:
+            self.cursor.execute(f"PRAGMA {name}")
+            return self.cursor.fetchone()[0]
+        self.cursor.execute(f"PRAGMA {name} = {value}")
+
+    def __enter__(self):
+        self.synchronous = self._pragma('synchronous')
+        self.journal_mode = self._pragma('journal_mode')
+        self._pragma('synchronous', 'OFF')
+        self._pragma('journal_mode', 'WAL')
+        return self
+
+    def __exit__(self, *exc):
+        self._pragma('synchronous', self.synchronous)
+        self._pragma('journal_mode', self.journal_mode)
+
+
+def _existing_rows(trip_ids):
+    return pd.DataFrame(fetch_summary_rows(trip_ids, DELTA_FIELDS), columns=DELTA_FIELDS)
+
+
+def _upsert_batch(columns, write):
+    """在一个事务内写入一批记录，并按 旧值-1 / 新值+1 增量更新汇总表与训练统计量"""
+    with transaction.atomic():
+        # 必须在upsert之前读取旧值：已存在的记录先从汇总表/统计量中移除，再按新值加入
+        existing = _existing_rows(columns['trip_id'])
+        removed = compute_deltas(existing, sign=-1)
+        removed_stats = compute_statistics(existing[TRAINING_FIELDS].to_numpy(), sign=-1)
+        written = write()
+        added = compute_deltas({field: columns[field] for field in SUMMARY_FIELDS})
+        added_stats = compute_statistics(np.column_stack([columns[field] for field in TRAINING_FIELDS]))
+        apply_deltas(merge_deltas(removed, added))
+        apply_statistics(merge_statistics(removed_stats, added_stats))
+    return written
+
+
+def delete_travel_records(trip_ids):
+    """按trip_id删除记录，并在同一事务内从汇总表与训练统计量中减去这些记录，返回删除的记录数"""
+    trip_ids = list(trip_ids)
+    with transaction.atomic():
+        existing = _existing_rows(trip_ids)
+        removed = compute_deltas(existing, sign=-1)
+        removed_stats = compute_statistics(existing[TRAINING_FIELDS].to_numpy(), sign=-1)
+        deleted = 0
+        for i in range(0, len(trip_ids), LOOKUP_CHUNK_SIZE):
+            deleted += TravelRecord.objects.filter(trip_id__in=trip_ids[i:i + LOOKUP_CHUNK_SIZE]).delete()[0]
+        apply_deltas(removed)
+        apply_statistics(removed_stats)
+    return deleted
+
+
+def import_travel_data(csv_path=DEFAULT_RAW_DATA_PATH, batch_size=DEFAULT_BATCH_SIZE, sqlite_fast=False):
+    """
+    将原始旅行数据CSV导入 TravelRecord 表（按trip_id upsert，每批一个事务）
+    :param sqlite_fast: 使用SQLite快速路径（仅支持SQLite数据库）
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size必须为正整数")
+    if sqlite_fast and connection.vendor != 'sqlite':
+        raise ValueError(f"SQLite快速路径仅支持SQLite数据库，当前数据库：{connection.vendor}")
+
+    started = time.perf_counter()
+    rows_in = rows_written = batches = 0
+    chunks = read_raw_data(csv_path, chunksize=batch_size)
+
+    if sqlite_fast:
+        sql = _upsert_sql()
+        with connection.cursor() as cursor, _SQLiteFastMode(cursor):
+            for raw in chunks:
+                columns = prepare_batch(raw)
+                rows_written += _upsert_batch(columns, lambda: _write_batch_sqlite(cursor, sql, columns))
+                rows_in += len(raw)
+                batches += 1
+    else:
+        for raw in chunks:
+            columns = prepare_batch(raw)
+            rows_written += _upsert_batch(columns, lambda: _write_batch_orm(columns))
+            rows_in += len(raw)
+            batches += 1
+
+    return ImportResult(
+        rows_in=rows_in,
+        rows_written=rows_written,
+        skipped=rows_in - rows_written,
+        batches=batches,
+        elapsed=time.perf_counter() - started,
+    )
@@ -0,0 +1,100 @@
+"""
+预测区间的训练时校准与服务时查表
+
+训练时在留出数据（测试集 / 交叉验证的折外预测）上计算残差 y - ŷ 的分位数，
+与模型一起保存在产物的 metrics.json 中（"interval" 字段）：
+- 全局区间：残差的 (1-level)/2 与 1-(1-level)/2 分位数（按留出样本数做有限样本修正，覆盖率不低于 level）
+- 分箱区间：留出样本足够多时，按预测值分位数分箱，每箱单独计算残差分位数（误差随预测值变化时区间更贴合）
+- 增量训练没有留出样本，按残差近似正态由 RMSE 计算区间
+服务时 IntervalTable 只做 预测值 + 偏移量（分箱时先在几个分箱边界中定位），不在请求中做任何统计计算。
+"""
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+# 区间的目标覆盖率
+DEFAULT_LEVEL = 0.95
+# 分箱数，以及分箱时每箱至少需要的留出样本数（不足时只使用全局区间）
+DEFAULT_BINS = 4
+MIN_BIN_ROWS = 100
+
+
+def _residual_quantiles(residuals, level):
+    """残差的下/上分位数；分位数水平按 (n+1)/n 修正（split conformal），保证有限样本下的覆盖率"""
+    n = len(residuals)
+    alpha = 1 - level
+    low = max(0.0, math.floor((n + 1) * alpha / 2) / n)
+    high = min(1.0, math.ceil((n + 1) * (1 - alpha / 2)) / n)
+    return (float(np.quantile(residuals, low, method='lower')),
+            float(np.quantile(residuals, high, method='higher')))
+
+
+def calibrate_intervals(y_true, y_pred, level=DEFAULT_LEVEL, bins=DEFAULT_BINS, min_bin_rows=MIN_BIN_ROWS):
+    """
+    由留出数据的残差计算区间偏移量
+    :return: 可写入metrics.json的字典 {"method", "level", "n_calibration", "lower", "upper", "edges"}，
+             lower/upper为各箱的偏移量列表（不分箱时长度为1），edges为分箱边界（预测值）
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    if not len(y_true):
+        raise ValueError("区间校准数据为空")
+    residuals = y_true - y_pred
+
+    edges = []
+    if bins > 1 and len(residuals) >= bins * min_bin_rows:
+        edges = np.unique(np.quantile(y_pred, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+    index = np.searchsorted(edges, y_pred, side='right')
+    bounds = [_residual_quantiles(residuals[index == i], level) for i in range(len(edges) + 1)]
+    return {
+        "method": "residual_quantile",
+        "level": level,
+        "n_calibration": len(residuals),
+        "lower": [low for low, _ in bounds],
+        "upper": [high for _, high in bounds],
+        "edges": edges,
+    }
+
+
+def normal_interval(rmse, level=DEFAULT_LEVEL):
+    """残差近似正态时的区间偏移量（±z·RMSE），用于没有留出数据的增量训练"""
+    z = NormalDist().inv_cdf(1 - (1 - level) / 2)
+    return {"method": "normal", "level": level, "n_calibration": 0,
+            "lower": [-z * rmse], "upper": [z * rmse], "edges": []}
+
+
+class IntervalTable:
+    """服务时使用的区间查找表（模型加载时构建一次）"""
+
+    def __init__(self, lower, upper, edges=(), level=None, method='mae'):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.edges = np.asarray(edges, dtype=float)
+        self.level = level
+        self.method = method
+
+    @classmethod
+    def from_metrics(cls, metrics):
+        """由产物指标构建；没有校准区间的旧模型使用 ±MAE（不对应任何覆盖率）"""
+        interval = metrics.get('interval')
+        if not interval:
+            return cls.symmetric(metrics['mae'])
+        return cls(interval['lower'], interval['upper'], interval.get('edges') or (),
+                   interval.get('level'), interval.get('method', 'residual_quantile'))
+
+    @classmethod
+    def symmetric(cls, mae):
+        return cls([-mae], [mae])
+
+    @property
+    def confidence(self):
+        """接口中的置信度标签（如 "95%"），±MAE区间为None"""
+        return None if self.level is None else f"{self.level:.0%}"
+
+    def bounds(self, pred):
+        """预测值数组对应的 (下限, 上限)"""
+        if not len(self.edges):
+            return pred + self.lower[0], pred + self.upper[0]
+        index = np.searchsorted(self.edges, pred, side='right')
+        return pred + self.lower[index], pred + self.upper[index]
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from data_preprocess import DEFAULT_RAW_DATA_PATH
+from travel_app.incremental import publish_incremental_model
+from travel_app.ingest import DEFAULT_BATCH_SIZE, import_travel_data
+
+
+class Command(BaseCommand):
+    help = "批量导入原始旅行数据到数据库（按trip_id upsert，重复导入会更新已有记录）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', nargs='?', default=DEFAULT_RAW_DATA_PATH, help="原始数据CSV路径")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="每批（每个事务）写入的行数")
+        parser.add_argument('--sqlite-fast', action='store_true',
+                            help="SQLite快速路径（synchronous=OFF + WAL + executemany），适合大批量导入")
+        parser.add_argument('--update-model', action='store_true',
+                            help="导入完成后由增量维护的训练统计量求解并发布预测模型（见 update_model 命令）")
+
+    def handle(self, *args, **options):
+        try:
+            result = import_travel_data(
+                options['csv_path'],
+                batch_size=options['batch_size'],
+                sqlite_fast=options['sqlite_fast'],
+            )
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(f"数据导入失败：{str(e)}")
+
+        rows_per_sec = result.rows_in / result.elapsed if result.elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"数据导入成功！共写入（新增或更新） {result.rows_written} 条旅行记录"
+        ))
+        self.stdout.write(f"CSV文件原始行数：{result.rows_in}")
+        self.stdout.write(f"跳过的无效行数：{result.skipped}")
+        self.stdout.write(f"批次数：{result.batches}，耗时 {result.elapsed:.2f}s，吞吐量 {rows_per_sec:.0f} 行/秒")
+
+        if options['update_model']:
+            try:
+                outcome = publish_incremental_model()
+            except (ValueError, PermissionError) as e:
+                raise CommandError(f"模型更新失败：{str(e)}")
+            state = "训练统计量未变化，沿用" if outcome.skipped else "已发布"
+            self.stdout.write(f"预测模型{state}版本 {outcome.version}（统计量版本 {outcome.statistics_version}）")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from travel_app.summary import check_summary, rebuild_summary
+
+
+class Command(BaseCommand):
+    help = "从TravelRecord全量重建可视化汇总表TravelAggregate，或使用--check检查汇总表与明细数据是否一致"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="只检查一致性，不修改汇总表（不一致时以非0状态退出）")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = check_summary()
+            if mismatches:
+                for key, got, want in mismatches[:20]:
+                    self.stderr.write(f"不一致：{key} 汇总表={got} 明细数据={want}")
+                raise CommandError(f"汇总表与明细数据不一致：共 {len(mismatches)} 个单元格，可执行 rebuild_aggregates 重建")
+            self.stdout.write(self.style.SUCCESS("汇总表与明细数据一致"))
+            return
+
+        cells = rebuild_summary()
+        self.stdout.write(self.style.SUCCESS(f"汇总表重建完成：共 {cells} 个单元格"))
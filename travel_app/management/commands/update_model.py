@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from travel_app.incremental import (
+    check_statistics, publish_incremental_model, rebuild_statistics, verify_incremental_model,
+)
+
+
+class Command(BaseCommand):
+    help = "由导入过程增量维护的训练统计量求解预测模型并发布新版本（无需重新读取全部历史数据）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="统计量未变化时也发布新版本")
+        parser.add_argument('--rebuild', action='store_true', help="先从TravelRecord全量重建训练统计量")
+        parser.add_argument('--verify', action='store_true',
+                            help="只校验：对比统计量与明细数据、增量求解结果与全量拟合结果（不一致时以非0状态退出），不发布")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rows = rebuild_statistics()
+            self.stdout.write(f"训练统计量重建完成：共 {rows} 条记录")
+
+        if options['verify']:
+            self._verify()
+            return
+
+        try:
+            outcome = publish_incremental_model(force=options['force'])
+        except (ValueError, PermissionError) as e:
+            raise CommandError(f"模型更新失败：{str(e)}")
+
+        metrics = outcome.metrics
+        if outcome.skipped:
+            self.stdout.write(f"训练统计量未变化，跳过发布（当前版本：{outcome.version}）")
+        r2 = metrics.get('r2')
+        self.stdout.write(self.style.SUCCESS(
+            f"模型已就绪：版本 {outcome.version}（统计量版本 {outcome.statistics_version}，{metrics['n_train']} 条记录），"
+            f"R²={'-' if r2 is None else f'{r2:.3f}'}，RMSE={metrics.get('rmse', 0.0):.2f} 天"
+        ))
+
+    def _verify(self):
+        mismatches = check_statistics()
+        for name, got, want in mismatches:
+            self.stderr.write(f"不一致：{name} 统计量表={got} 明细数据={want}")
+        try:
+            matched, details = verify_incremental_model()
+        except ValueError as e:
+            raise CommandError(f"校验失败：{str(e)}")
+        self.stdout.write(json.dumps(details, ensure_ascii=False, indent=2))
+        if mismatches or not matched:
+            raise CommandError("增量训练结果与全量拟合不一致，可执行 update_model --rebuild 重建训练统计量")
+        self.stdout.write(self.style.SUCCESS("增量训练结果与全量拟合一致"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from travel_app.model_registry import model_registry
+from travel_app.training import training_coordinator
+
+
+class Command(BaseCommand):
+    help = ("预热预测模型：模型缺失（或只有旧版本模型文件）时训练并发布版本化产物，"
+            "确保服务启动后首个预测请求无需训练，且预测区间为训练时校准的区间")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="即使模型已存在且训练数据未变化也重新训练")
+
+    def handle(self, *args, **options):
+        try:
+            if options['force']:
+                bundle = training_coordinator.train(force=True)
+            else:
+                try:
+                    bundle = model_registry.get(force_check=True)
+                except FileNotFoundError:
+                    bundle = training_coordinator.train()
+                else:
+                    if isinstance(bundle.version, str):
+                        self.stdout.write("模型已存在，跳过训练")
+                    else:
+                        bundle = self._publish_from_legacy(bundle)
+        except Exception as e:
+            raise CommandError(f"模型预热失败：{str(e)}")
+
+        self._report(bundle)
+
+    def _publish_from_legacy(self, legacy):
+        """只有旧版本模型文件（±MAE区间，没有校准的预测区间）时训练并发布版本化产物；训练失败时继续使用旧文件"""
+        self.stdout.write("只有旧版本模型文件（预测区间为±MAE），训练并发布版本化产物")
+        try:
+            return training_coordinator.train(force=True)
+        except Exception as e:
+            self.stderr.write(self.style.WARNING(f"发布版本化产物失败，继续使用旧版本模型文件：{str(e)}"))
+            return legacy
+
+    def _report(self, bundle):
+        if isinstance(bundle.version, str):
+            source = f"版本 {bundle.version}（{model_registry.store.version_dir(bundle.version)}）"
+        else:
+            source = f"模型文件：{model_registry.model_path}"
+        r2 = bundle.metrics.get('r2')
+        self.stdout.write(self.style.SUCCESS(
+            f"模型已就绪：MAE={bundle.mae:.2f} 天，R²={'-' if r2 is None else f'{r2:.3f}'}，{source}"
+        ))
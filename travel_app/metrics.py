@@ -0,0 +1,298 @@
+"""
+请求耗时统计与Prometheus指标导出
+
+- span(view, phase)：记录视图内各阶段（加载/筛选/聚合/模型加载/预测/渲染等）的耗时
+- RequestTimingMiddleware：记录每个请求的总耗时（按视图/方法/状态码），同时支持同步与异步请求处理
+- 耗时按固定分桶累计为直方图（每次记录只需一次二分查找和一次加锁累加），开销很小，可在生产环境常开
+- render_metrics() 输出Prometheus文本格式，包含直方图、计数器、数据集缓存命中率与模型版本
+"""
+import bisect
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# 直方图分桶上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 非耗时类直方图的分桶上限
+BUCKETS = {
+    'travel_prediction_batch_size': (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024),
+}
+
+HELP = {
+    'travel_request_duration_seconds': "请求总耗时（秒）",
+    'travel_view_phase_duration_seconds': "视图各阶段耗时（秒）",
+    'travel_cache_requests_total': "响应缓存查询次数（result为hit/miss）",
+    'travel_executor_rejected_total': "异步视图线程池已满被拒绝（429）的请求数",
+    'travel_prediction_batch_size': "单条预测请求合并后每批的行数",
+    'travel_prediction_batch_wait_seconds': "单条预测请求在合并队列中等待的时间（秒）",
+    'travel_prediction_batches_total': "合并执行的预测批次数（reason为window/full，即等待窗口到期/达到批大小上限）",
+}
+
+
+def _enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+class Histogram:
+    """线程安全的固定分桶直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """返回 (累计分桶计数, 总和, 总次数)"""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class MetricsRegistry:
+    """按 (指标名, 标签) 保存直方图与计数器"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(BUCKETS.get(name, DEFAULT_BUCKETS)))
+        histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def collect(self):
+        """返回 (直方图列表, 计数器列表) 的快照"""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        return histograms, counters
+
+
+# 进程级单例（多worker部署时每个进程分别统计，由Prometheus按实例汇总）
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(view, phase):
+    """记录视图中一个阶段的耗时：with span('predict_api', 'predict'): ..."""
+    if not _enabled():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('travel_view_phase_duration_seconds', time.perf_counter() - started, view=view, phase=phase)
+
+
+def record_cache(cache_name, hit):
+    """记录一次响应缓存查询结果"""
+    if _enabled():
+        registry.inc('travel_cache_requests_total', cache=cache_name, result='hit' if hit else 'miss')
+
+
+def record_rejected(executor):
+    """记录一次因线程池/队列已满而被拒绝的任务"""
+    if _enabled():
+        registry.inc('travel_executor_rejected_total', executor=executor)
+
+
+class RequestTimingMiddleware:
+    """
+    记录每个请求的总耗时；视图名取自URL路由名称（未匹配路由时为unmatched）
+    同时支持同步与异步调用：ASGI部署下不会迫使异步视图切换到线程中执行
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _enabled():
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        if not _enabled():
+            return await self.get_response(request)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, started)
+        return response
+
+    @staticmethod
+    def _observe(request, response, started):
+        match = getattr(request, 'resolver_match', None)
+        registry.observe(
+            'travel_request_duration_seconds',
+            time.perf_counter() - started,
+            view=(match.url_name or match.view_name) if match is not None else 'unmatched',
+            method=request.method,
+            status=str(response.status_code),
+        )
+
+
+# ---------------------- Prometheus文本格式 ----------------------
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def _histogram_lines(name, items):
+    lines = [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+    for labels, histogram in sorted(items, key=lambda item: item[0]):
+        cumulative, total, count = histogram.snapshot()
+        bounds = [_format_bound(b) for b in histogram.buckets] + ['+Inf']
+        for bound, value in zip(bounds, cumulative):
+            lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {value}")
+        lines.append(f"{name}_sum{_labels(labels)} {total}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+    return lines
+
+
+def _gauge_lines(name, help_text, samples, metric_type='gauge'):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {value}")
+    return lines
+
+
+def _dataset_cache_lines():
+    from .dataset import get_cache_stats
+
+    hits, misses, reloads, ratios = [], [], [], []
+    for stats in get_cache_stats():
+        columns = ','.join(stats['columns']) if stats['columns'] is not None else '*'
+        labels = (('columns', columns),)
+        hits.append((labels, stats['hits']))
+        misses.append((labels, stats['misses']))
+        reloads.append((labels, stats['reloads']))
+        lookups = stats['hits'] + stats['misses']
+        ratios.append((labels, stats['hits'] / lookups if lookups else 0.0))
+    return (
+        _gauge_lines('travel_dataset_cache_hits_total', "清洁数据缓存命中次数", hits, 'counter')
+        + _gauge_lines('travel_dataset_cache_misses_total', "清洁数据缓存未命中（加载）次数", misses, 'counter')
+        + _gauge_lines('travel_dataset_cache_reloads_total', "清洁数据文件变化后的重新加载次数", reloads, 'counter')
+        + _gauge_lines('travel_dataset_cache_hit_ratio', "清洁数据缓存命中率", ratios)
+    )
+
+
+def _response_cache_ratio_lines(counters):
+    totals = {}
+    for (name, labels), value in counters:
+        if name != 'travel_cache_requests_total':
+            continue
+        labels = dict(labels)
+        hit, total = totals.get(labels['cache'], (0, 0))
+        totals[labels['cache']] = (hit + (value if labels['result'] == 'hit' else 0), total + value)
+    samples = [((('cache', cache_name),), hit / total if total else 0.0)
+               for cache_name, (hit, total) in sorted(totals.items())]
+    return _gauge_lines('travel_cache_hit_ratio', "响应缓存命中率", samples)
+
+
+def _model_lines():
+    from .model_registry import model_registry
+
+    stats = model_registry.stats()
+    lines = _gauge_lines('travel_model_loads_total', "模型加载次数", [((), stats['loads'])], 'counter')
+    if not stats['loaded']:
+        return lines + _gauge_lines('travel_model_loaded', "模型是否已加载", [((), 0)])
+    # 版本化产物直接使用版本号，旧版本模型文件使用文件签名摘要
+    version = stats['version']
+    if not isinstance(version, str):
+        version = hashlib.sha1(repr(version).encode('utf-8')).hexdigest()[:12]
+    return (
+        lines
+        + _gauge_lines('travel_model_loaded', "模型是否已加载", [((), 1)])
+        + _gauge_lines('travel_model_info', "当前模型版本",
+                       [((('version', version), ('model_type', stats['model_type'])), 1)])
+        + _gauge_lines('travel_model_mae_days', "当前模型的MAE（天）", [((), stats['mae'])])
+        + _gauge_lines('travel_model_loaded_timestamp_seconds', "当前模型的加载时间", [((), stats['loaded_at'])])
+    )
+
+
+def _executor_lines():
+    from .executor import cpu_executor
+
+    stats = cpu_executor.stats()
+    labels = (('executor', cpu_executor.name),)
+    return (
+        _gauge_lines('travel_executor_pending', "异步视图线程池中进行中（执行+排队）的任务数", [(labels, stats['pending'])])
+        + _gauge_lines('travel_executor_capacity', "异步视图线程池容量（工作线程数+队列长度）", [(labels, stats['capacity'])])
+    )
+
+
+def render_metrics():
+    """生成Prometheus文本格式（text/plain; version=0.0.4）的全部指标"""
+    histograms, counters = registry.collect()
+    lines = []
+
+    by_name = {}
+    for (name, labels), histogram in histograms:
+        by_name.setdefault(name, []).append((labels, histogram))
+    for name in sorted(by_name):
+        lines.extend(_histogram_lines(name, by_name[name]))
+
+    counters_by_name = {}
+    for (name, labels), value in counters:
+        counters_by_name.setdefault(name, []).append((labels, value))
+    for name in sorted(counters_by_name):
+        lines.extend(_gauge_lines(name, HELP.get(name, name), sorted(counters_by_name[name]), 'counter'))
+
+    lines.extend(_response_cache_ratio_lines(counters))
+    lines.extend(_dataset_cache_lines())
+    lines.extend(_model_lines())
+    lines.extend(_executor_lines())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='travelrecord',
+            name='trip_id',
+            field=models.IntegerField(unique=True, verbose_name='旅行ID'),
+        ),
+    ]
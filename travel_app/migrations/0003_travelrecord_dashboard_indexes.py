@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_app', '0002_travelrecord_trip_id_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelrecord',
+            index=models.Index(fields=['season', 'region', 'traveler_gender', 'duration'], name='tr_season_region_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelrecord',
+            index=models.Index(fields=['season', 'region', 'age_segment', 'duration'], name='tr_season_region_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelrecord',
+            index=models.Index(fields=['season', 'region', 'cost_range', 'duration'], name='tr_season_region_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelrecord',
+            index=models.Index(fields=['region', 'traveler_gender', 'duration'], name='tr_region_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelrecord',
+            index=models.Index(fields=['region', 'age_segment', 'duration'], name='tr_region_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelrecord',
+            index=models.Index(fields=['region', 'cost_range', 'duration'], name='tr_region_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelrecord',
+            index=models.Index(fields=['region', 'season', 'duration'], name='tr_region_season_idx'),
+        ),
+    ]
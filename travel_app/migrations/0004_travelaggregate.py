@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_app', '0003_travelrecord_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(max_length=10, verbose_name='出行季节')),
+                ('region', models.CharField(max_length=20, verbose_name='地域')),
+                ('dimension', models.CharField(max_length=10, verbose_name='维度')),
+                ('label', models.CharField(max_length=20, verbose_name='标签')),
+                ('record_count', models.IntegerField(default=0, verbose_name='记录数')),
+                ('duration_sum', models.FloatField(default=0.0, verbose_name='旅行周期总和（天）')),
+            ],
+            options={
+                'verbose_name': '旅行汇总',
+                'verbose_name_plural': '旅行汇总',
+                'constraints': [models.UniqueConstraint(fields=('season', 'region', 'dimension', 'label'), name='travel_aggregate_cell_unique')],
+            },
+        ),
+    ]
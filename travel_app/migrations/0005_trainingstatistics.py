@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_app', '0004_travelaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='模型名称')),
+                ('version', models.IntegerField(default=0, verbose_name='数据版本')),
+                ('row_count', models.IntegerField(default=0, verbose_name='记录数')),
+                ('xtx', models.JSONField(default=list, verbose_name='AᵀA')),
+                ('xty', models.JSONField(default=list, verbose_name='Aᵀy')),
+                ('yty', models.FloatField(default=0.0, verbose_name='yᵀy')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '训练统计量',
+                'verbose_name_plural': '训练统计量',
+            },
+        ),
+    ]
@@ -1,90 +1,100 @@
 # 导入必要库
-import pandas as pd
+import argparse
+import os
+import sys
+
 import numpy as np
-from sklearn.linear_model import LinearRegression
+import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error  # 库函数计算MAE
-import os
 
-# ---------------------- 步骤1：配置路径与参数 ----------------------
-# 请根据你的文件实际路径修改（默认与项目根目录下的data文件夹对应）
-DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data/cleaned_travel_data.csv")
-# 特征列（与models.py、views.py一致）
-FEATURE_COLS = ["Traveler age", "Accommodation cost", "Transportation cost"]
-# 目标列（旅行周期，与数据集中列名一致）
-TARGET_COL = "Duration (days)"
-# 数据划分参数（与views.py中的模型训练逻辑一致）
-TEST_SIZE = 0.2
-RANDOM_STATE = 42
+# 添加项目根目录到Python路径（以脚本方式运行时可导入travel_app）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from travel_app.artifacts import METRICS_FILE, ArtifactStore, artifact_store
+from travel_app.dataset import get_cleaned_data, resolve_data_path
+from travel_app.training import FEATURE_COLS, TARGET_COL, TRAIN_CONFIG, train_pipeline
 
-# ---------------------- 步骤2：加载并预处理数据 ----------------------
-# 加载CSV数据
+# ---------------------- 步骤1：配置参数 ----------------------
+parser = argparse.ArgumentParser(description="查看当前预测模型的评估指标（MAE、R²）")
+parser.add_argument('--force', action='store_true', help="训练数据未变化时也重新训练")
+parser.add_argument('--artifact-root', help="产物目录（默认 static/model/artifacts）")
+args = parser.parse_args()
+store = ArtifactStore(args.artifact_root) if args.artifact_root else artifact_store
+
+# ---------------------- 步骤2：加载数据 ----------------------
+# 默认与项目根目录下的data文件夹对应（由travel_app.dataset统一管理，优先列式文件，回退CSV）
 try:
-    df = pd.read_csv(DATA_PATH)
+    df = get_cleaned_data(FEATURE_COLS + [TARGET_COL])
     print(f"✅ 成功加载数据，共{len(df)}条记录")
 except FileNotFoundError:
-    print(f"❌ 数据文件未找到，请检查路径：{DATA_PATH}")
-    exit()
-
-# 筛选特征和目标列，删除可能的缺失值（避免模型报错）
-df_model = df[FEATURE_COLS + [TARGET_COL]].dropna()
-print(f"✅ 预处理后数据量：{len(df_model)}条（已删除缺失值）")
-
-# 分离特征矩阵X和目标变量y
-X = df_model[FEATURE_COLS]
-y = df_model[TARGET_COL]
-
-# ---------------------- 步骤3：划分训练集与测试集 ----------------------
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, shuffle=True
-)
-print(f"\n📊 数据划分结果：")
-print(f"训练集：{len(X_train)}条样本 | 测试集：{len(X_test)}条样本")
-
-# ---------------------- 步骤4：训练线性回归模型（与views.py一致） ----------------------
-model = LinearRegression()
-model.fit(X_train, y_train)
-print(f"\n✅ 模型训练完成，线性回归系数：")
-for col, coef in zip(FEATURE_COLS, model.coef_):
-    print(f"  {col}系数：{coef:.6f}（系数正负表示对旅行周期的正负影响）")
-print(f"  模型截距：{model.intercept_:.6f}")
+    print(f"❌ 数据文件未找到，请检查路径：{resolve_data_path()}")
+    sys.exit(1)
 
-# ---------------------- 步骤5：在测试集上预测 ----------------------
-y_pred = model.predict(X_test)
-# 确保预测值合理（旅行周期至少1天）
-y_pred = np.maximum(y_pred, 1.0)
+# ---------------------- 步骤3：训练或复用当前版本（统一训练流水线） ----------------------
+# 训练数据（数据集哈希）未变化时直接复用当前版本的模型与指标，不重复训练；只修改训练配置时需使用 --force
+outcome = train_pipeline(force=args.force, store=store, df=df)
+metrics = outcome.metrics
+artifact = store.load(outcome.version)
+model = artifact.model
+# 只有训练流水线发布的模型留出了测试集；模型对比（sweep）与增量训练（incremental）的模型在全部数据上训练，
+# 前者的指标为k折交叉验证结果，后者为由训练统计量计算的训练集内指标
+source = artifact.manifest.get('model_source', 'pipeline')
+print(f"\n📦 模型版本：{outcome.version}（{'数据未变化，复用已有版本' if outcome.skipped else '新训练'}，来源：{source}）")
+if source == 'sweep':
+    print(f"训练数据：{metrics['n_train']}条样本（全部用于训练）| 评估方式：{metrics['cv_folds']}折交叉验证")
+elif source == 'incremental':
+    print(f"训练数据：{metrics['n_train']}条样本（全部用于训练）| 评估方式：训练集内估计（无留出数据）")
+else:
+    print(f"训练集：{metrics['n_train']}条样本 | 测试集：{metrics['n_test']}条样本")
+# 对比选出的模型可能不是线性模型（如梯度提升树），按模型类型输出系数或特征重要性
+if hasattr(model, 'coef_'):
+    print(f"\n✅ 线性模型系数（{type(model).__name__}）：")
+    for col, coef in zip(FEATURE_COLS, model.coef_):
+        print(f"  {col}系数：{coef:.6f}（系数正负表示对旅行周期的正负影响）")
+    print(f"  模型截距：{model.intercept_:.6f}")
+elif hasattr(model, 'feature_importances_'):
+    print(f"\n✅ 特征重要性（{type(model).__name__}）：")
+    for col, importance in zip(FEATURE_COLS, model.feature_importances_):
+        print(f"  {col}：{importance:.4f}")
+else:
+    print(f"\n✅ 模型类型：{type(model).__name__}")
 
-# 打印前5条测试集预测结果（直观验证）
-print(f"\n🔍 测试集前5条预测示例：")
-sample_result = pd.DataFrame({
-    "旅行者年龄": X_test["Traveler age"].values[:5],
-    "住宿费用": X_test["Accommodation cost"].values[:5],
-    "交通费用": X_test["Transportation cost"].values[:5],
-    "实际旅行周期（天）": y_test.values[:5],
-    "预测旅行周期（天）": np.round(y_pred[:5], 1)
-})
-print(sample_result)
-
-# ---------------------- 步骤6：计算测试集MAE ----------------------
-# 方法1：使用scikit-learn库函数（推荐，简洁高效）
-mae_sklearn = mean_absolute_error(y_test, y_pred)
-
-# 方法2：手动计算MAE（验证原理，与库函数结果一致）
-absolute_errors = np.abs(y_test.values - y_pred)  # 每个样本的绝对误差
-mae_manual = np.mean(absolute_errors)  # 绝对误差的平均值
-
-# 输出MAE结果
-print(f"\n📈 测试集MAE计算结果：")
-print(f"  库函数计算MAE：{mae_sklearn:.2f} 天")
-print(f"  手动计算MAE：{mae_manual:.2f} 天")
-print(f"  解释：模型预测的旅行周期与实际值的平均绝对误差为 {mae_sklearn:.2f} 天，误差越小模型越精准")
+# ---------------------- 步骤4：预测示例 ----------------------
+df_model = df[FEATURE_COLS + [TARGET_COL]].dropna()
+if source == 'pipeline':
+    # 按与训练相同的参数划分，得到同一个测试集
+    _, X_sample, _, y_sample = train_test_split(
+        df_model[FEATURE_COLS], df_model[TARGET_COL],
+        test_size=TRAIN_CONFIG['test_size'], random_state=TRAIN_CONFIG['random_state']
+    )
+    sample_title = "测试集前5条预测示例"
+else:
+    # 模型在全部数据上训练，没有留出的测试集：示例为训练数据内的预测，不代表对新数据的误差
+    X_sample, y_sample = df_model[FEATURE_COLS], df_model[TARGET_COL]
+    sample_title = "训练集内前5条预测示例（模型在全部数据上训练）"
+# 模型对比/增量训练的模型以NumPy数组训练（没有特征名），按训练时的输入形式预测
+X_input = X_sample[:5] if hasattr(model, 'feature_names_in_') else X_sample[:5].to_numpy(dtype=float)
+y_pred = np.maximum(model.predict(X_input), 1.0)  # 旅行周期至少1天
+print(f"\n🔍 {sample_title}：")
+print(pd.DataFrame({
+    "旅行者年龄": X_sample["Traveler age"].values[:5],
+    "住宿费用": X_sample["Accommodation cost"].values[:5],
+    "交通费用": X_sample["Transportation cost"].values[:5],
+    "实际旅行周期（天）": y_sample.values[:5],
+    "预测旅行周期（天）": np.round(y_pred, 1)
+}))
 
-# ---------------------- （可选）保存MAE结果到文件 ----------------------
-mae_save_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static/model/model_mae.pkl")
-os.makedirs(os.path.dirname(mae_save_path), exist_ok=True)
-pd.DataFrame({
-    "测试集样本数": [len(X_test)],
-    "MAE（天）": [mae_sklearn],
-    "计算时间": [pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")]
-}).to_csv(mae_save_path, index=False)
-print(f"\n💾 MAE结果已保存到：{mae_save_path}")
\ No newline at end of file
+# ---------------------- 步骤5：输出评估指标 ----------------------
+# 指标与模型一起保存在产物目录的 metrics.json 中；预测区间使用其中按残差分位数校准的区间（interval），
+# 不再按MAE计算（只有旧版本模型文件时才使用±MAE）
+r2 = metrics.get('r2')
+if source == 'sweep':
+    print(f"\n📈 {metrics['cv_folds']}折交叉验证评估结果（各折留出数据上的平均值）：")
+elif source == 'incremental':
+    print(f"\n📈 训练集内评估结果（由训练统计量计算，MAE按残差近似正态估计）：")
+else:
+    print(f"\n📈 测试集评估结果：")
+print(f"  MAE：{metrics['mae']:.2f} 天{'（估计值）' if metrics.get('mae_estimated') else ''}")
+print(f"  R²：{'-' if r2 is None else f'{r2:.3f}'}")
+print(f"  解释：模型预测的旅行周期与实际值的平均绝对误差为 {metrics['mae']:.2f} 天，误差越小模型越精准")
+print(f"\n💾 指标文件：{os.path.join(store.version_dir(outcome.version), METRICS_FILE)}")
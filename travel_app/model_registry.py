@@ -0,0 +1,154 @@
+"""
+预测模型注册表
+
+进程内缓存已加载的模型及其MAE，预测请求直接使用内存中的模型：
+- 首次访问时加载 static/model/artifacts/current 指向的版本化产物（见 artifacts.py，模型数组以内存映射方式读取）；
+  尚未发布任何版本时兼容读取旧版本的 travel_model.pkl 与 model_mae.pkl
+- 每隔 RELOAD_CHECK_INTERVAL 秒最多检查一次 current 文件签名（mtime/size），
+  两次检查之间的请求不产生任何文件I/O
+- 检测到新版本后在锁内完整加载，再一次性替换模型引用（原子指针交换），
+  正在处理的请求始终持有完整的旧版本，不会看到加载到一半的模型
+- 新版本加载失败时记录错误日志并继续使用旧版本；同一签名间隔 FAILED_RELOAD_RETRY_INTERVAL 秒后再重试，
+  发布了新的版本（签名变化）时立即尝试加载
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import joblib
+
+from .artifacts import MODEL_DIR, artifact_store
+from .intervals import IntervalTable
+
+logger = logging.getLogger('travel_app')
+
+# 旧版本模型文件（未使用版本化产物时）
+MODEL_PATH = os.path.join(MODEL_DIR, 'travel_model.pkl')
+MAE_PATH = os.path.join(MODEL_DIR, 'model_mae.pkl')
+
+# 文件签名检查间隔（秒）
+RELOAD_CHECK_INTERVAL = 5.0
+# 加载失败的版本的重试间隔（秒）
+FAILED_RELOAD_RETRY_INTERVAL = 60.0
+
+# 不可变的模型快照：model为已训练的回归模型，mae为测试集平均绝对误差，
+# version为产物版本号（旧版本模型文件为文件签名），metrics为产物中的评估指标，
+# intervals为加载时按指标中的校准区间构建的查找表（IntervalTable）
+ModelBundle = namedtuple('ModelBundle', ['model', 'mae', 'version', 'loaded_at', 'metrics', 'intervals'])
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class ModelRegistry:
+    """模型注册表：加载一次，按 current 文件签名热替换"""
+
+    def __init__(self, store, model_path, mae_path, check_interval=RELOAD_CHECK_INTERVAL):
+        self.store = store
+        self.model_path = model_path
+        self.mae_path = mae_path
+        self.check_interval = check_interval
+        self._bundle = None
+        self._signature = None
+        self._failed_signature = None
+        self._retry_failed_at = 0.0
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def signature(self):
+        """
+        当前模型的签名：('artifact', current文件签名)，未发布版本化产物时为
+        ('legacy', 模型文件签名, MAE文件签名)；均不存在时抛出FileNotFoundError
+        """
+        try:
+            return 'artifact', self.store.pointer_signature()
+        except FileNotFoundError:
+            pass
+        try:
+            return 'legacy', _file_signature(self.model_path), _file_signature(self.mae_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"模型文件缺失：{self.store.pointer_path} 或 {self.model_path}")
+
+    def _load(self, signature):
+        """按签名类型加载模型快照"""
+        if signature[0] == 'artifact':
+            artifact = self.store.load()
+            return ModelBundle(artifact.model, float(artifact.metrics['mae']), artifact.version,
+                               time.time(), artifact.metrics, IntervalTable.from_metrics(artifact.metrics))
+        model = joblib.load(self.model_path)
+        mae = float(joblib.load(self.mae_path))
+        return ModelBundle(model, mae, signature, time.time(), {"mae": mae}, IntervalTable.symmetric(mae))
+
+    def get(self, force_check=False):
+        """返回当前模型快照；到达检查间隔时才访问磁盘"""
+        bundle = self._bundle
+        if bundle is not None and not force_check and time.monotonic() < self._next_check:
+            return bundle
+        return self._refresh(force_check)
+
+    def _refresh(self, force_check):
+        with self._lock:
+            bundle = self._bundle
+            now = time.monotonic()
+            # 双重检查：等待锁期间其他线程可能已完成检查
+            if bundle is not None and not force_check and now < self._next_check:
+                return bundle
+
+            try:
+                signature = self.signature()
+            except FileNotFoundError:
+                # 文件被临时移走时继续使用已加载的版本
+                if bundle is not None:
+                    self._next_check = now + self.check_interval
+                    return bundle
+                raise
+
+            if bundle is not None and signature == self._failed_signature and now < self._retry_failed_at:
+                # 该版本刚加载失败过：继续使用旧版本，到达重试间隔或发布新的版本后再加载
+                self._next_check = now + self.check_interval
+                return bundle
+            if bundle is None or self._signature != signature:
+                try:
+                    loaded = self._load(signature)
+                except Exception:
+                    if bundle is None:
+                        raise
+                    # 新版本文件不完整/格式错误时记录日志并保留旧版本
+                    logger.exception(f"模型新版本加载失败，继续使用当前版本 {bundle.version}（签名 {signature}），"
+                                     f"{FAILED_RELOAD_RETRY_INTERVAL:.0f}秒后重试")
+                    self._failed_signature = signature
+                    self._retry_failed_at = now + FAILED_RELOAD_RETRY_INTERVAL
+                    self._next_check = now + self.check_interval
+                    return bundle
+                self._failed_signature = None
+                if bundle is None or loaded.version != bundle.version:
+                    bundle = loaded
+                    # 引用赋值是原子的：其他线程要么拿到旧快照，要么拿到完整的新快照
+                    self._bundle = bundle
+                    self.loads += 1
+                self._signature = signature
+
+            self._next_check = now + self.check_interval
+            return bundle
+
+    def stats(self):
+        """当前已加载模型的信息（不触发文件检查或加载）"""
+        bundle = self._bundle
+        return {
+            "loaded": bundle is not None,
+            "version": bundle.version if bundle is not None else None,
+            "model_type": type(bundle.model).__name__ if bundle is not None else None,
+            "mae": bundle.mae if bundle is not None else None,
+            "metrics": bundle.metrics if bundle is not None else None,
+            "loaded_at": bundle.loaded_at if bundle is not None else None,
+            "loads": self.loads,
+        }
+
+
+# 进程级单例
+model_registry = ModelRegistry(artifact_store, MODEL_PATH, MAE_PATH)
@@ -0,0 +1,199 @@
+"""
+预测模型的候选模型对比（k折交叉验证 + 推理延迟）
+
+- 候选模型：线性回归、岭回归（多个alpha）、梯度提升树、分位数回归（中位数，直接最小化绝对误差；训练行数有上限）
+- 每个 (候选模型, 折) 为一个任务，由joblib的进程池并行执行；特征矩阵先写入临时文件，
+  各进程以只读内存映射方式打开同一份数据，不为每个任务复制数据集
+- 每个候选模型记录交叉验证的 MAE / RMSE / R²、按折外预测残差校准的预测区间（见 intervals.py）及其平均宽度，
+  以及在全部数据上拟合后的单条预测延迟（p50/p95）与批量预测吞吐量
+- 在单条预测 p95 延迟不超过延迟预算的候选模型中选择 MAE 最小的模型，可发布为新版本产物（见 artifacts.py）
+"""
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, QuantileRegressor, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+from .artifacts import artifact_store
+from .intervals import DEFAULT_LEVEL, calibrate_intervals
+from .prediction import model_predict
+from .training import FEATURE_COLS, MODEL_SCHEMA, TARGET_COL, dataset_hash, training_frame
+
+DEFAULT_FOLDS = 5
+# 单条预测的p95延迟预算（毫秒）
+DEFAULT_LATENCY_BUDGET_MS = 1.0
+RANDOM_STATE = 42
+# 延迟测量：单条预测的调用次数，批量预测的行数
+LATENCY_CALLS = 200
+LATENCY_BATCH_ROWS = 1000
+
+# 候选模型：名称 -> 未训练的估计器
+CANDIDATES = {
+    'linear': LinearRegression(),
+    'ridge_1': Ridge(alpha=1.0),
+    'ridge_100': Ridge(alpha=100.0),
+    'gbr_100_d3': GradientBoostingRegressor(n_estimators=100, max_depth=3, random_state=RANDOM_STATE),
+    'gbr_300_d2': GradientBoostingRegressor(n_estimators=300, max_depth=2, learning_rate=0.05,
+                                            random_state=RANDOM_STATE),
+    'quantile_p50': QuantileRegressor(quantile=0.5, alpha=0.0, solver='highs'),
+}
+
+# 训练行数上限：分位数回归按线性规划求解，耗时随行数超线性增长，超过上限时在随机抽样的行上训练（评估仍使用完整的测试折）
+FIT_MAX_ROWS = {'quantile_p50': 5000}
+
+# 一次对比的结果：candidates为各候选模型的指标（按MAE排序），best为选中的候选模型名称（没有满足延迟预算的模型时为None）
+SweepResult = namedtuple('SweepResult', ['candidates', 'best', 'folds', 'rows', 'latency_budget_ms', 'elapsed'])
+
+
+def _sample_rows(name, idx):
+    max_rows = FIT_MAX_ROWS.get(name)
+    if max_rows is None or len(idx) <= max_rows:
+        return idx
+    return np.sort(np.random.default_rng(RANDOM_STATE).choice(idx, size=max_rows, replace=False))
+
+
+def _fit_fold(name, estimator, x, y, train_idx, test_idx):
+    """在一折上训练并评估（在工作进程中执行，x/y为内存映射数组）"""
+    started = time.perf_counter()
+    fit_idx = _sample_rows(name, train_idx)
+    model = clone(estimator).fit(x[fit_idx], y[fit_idx])
+    fit_seconds = time.perf_counter() - started
+    y_test = y[test_idx]
+    pred = model.predict(x[test_idx])
+    return name, test_idx, pred, {
+        "mae": mean_absolute_error(y_test, pred),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, pred))),
+        "r2": r2_score(y_test, pred) if len(test_idx) > 1 else np.nan,
+        "fit_seconds": fit_seconds,
+    }
+
+
+def _fit_full(name, estimator, x, y):
+    fit_idx = _sample_rows(name, np.arange(len(x)))
+    return name, clone(estimator).fit(x[fit_idx], y[fit_idx])
+
+
+def measure_latency(model, x, calls=LATENCY_CALLS, batch_rows=LATENCY_BATCH_ROWS):
+    """测量单条预测延迟（p50/p95，毫秒）与批量预测吞吐量（行/秒），与服务端一样经 model_predict 调用"""
+    rng = np.random.default_rng(RANDOM_STATE)
+    rows = x[rng.integers(0, len(x), size=calls)]
+    model_predict(model, rows[:1])  # 预热
+    samples = []
+    for i in range(calls):
+        row = rows[i:i + 1]
+        started = time.perf_counter()
+        model_predict(model, row)
+        samples.append(time.perf_counter() - started)
+    batch = x[rng.integers(0, len(x), size=batch_rows)]
+    started = time.perf_counter()
+    model_predict(model, batch)
+    batch_seconds = time.perf_counter() - started
+    samples_ms = np.array(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(samples_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples_ms, 95)), 4),
+        "batch_rows_per_sec": round(batch_rows / batch_seconds, 1) if batch_seconds > 0 else None,
+    }
+
+
+def sweep_models(df, candidates=None, folds=DEFAULT_FOLDS, n_jobs=-1,
+                 latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS, interval_level=DEFAULT_LEVEL, return_models=False):
+    """
+    对候选模型做k折交叉验证并测量推理延迟
+    :param candidates: 候选模型名称列表（CANDIDATES的键），默认全部
+    :param n_jobs: 并行进程数，-1表示使用全部CPU核心
+    :return: SweepResult；return_models为True时返回 (SweepResult, {名称: 在全部数据上拟合的模型})
+    """
+    names = list(CANDIDATES) if candidates is None else list(candidates)
+    unknown = [name for name in names if name not in CANDIDATES]
+    if unknown:
+        raise KeyError(f"未知的候选模型：{', '.join(unknown)}（可选：{', '.join(CANDIDATES)}）")
+    data = training_frame(df)
+    if len(data) < folds:
+        raise ValueError(f"有效训练数据量（{len(data)}条）少于交叉验证折数（{folds}）")
+
+    started = time.perf_counter()
+    workdir = tempfile.mkdtemp(prefix='travel-sweep-')
+    try:
+        # 特征矩阵写入临时文件后以内存映射方式打开：joblib向工作进程传递的是文件引用，而不是数据副本
+        path = os.path.join(workdir, 'data.joblib')
+        joblib.dump((data[FEATURE_COLS].to_numpy(dtype=float), data[TARGET_COL].to_numpy(dtype=float)), path)
+        x, y = joblib.load(path, mmap_mode='r')
+        splits = list(KFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE).split(x))
+
+        with Parallel(n_jobs=n_jobs) as parallel:
+            fold_results = parallel(
+                delayed(_fit_fold)(name, CANDIDATES[name], x, y, train_idx, test_idx)
+                for name in names for train_idx, test_idx in splits
+            )
+            models = dict(parallel(delayed(_fit_full)(name, CANDIDATES[name], x, y) for name in names))
+
+        # 延迟在主进程中逐个测量，避免与其他任务争用CPU
+        x_array = np.asarray(x)
+        results = {}
+        for name in names:
+            scores = [score for fold_name, _, _, score in fold_results if fold_name == name]
+            # 折外预测：每行数据恰好在一折中作为测试数据被预测一次
+            oof = np.empty(len(y))
+            for fold_name, test_idx, pred, _ in fold_results:
+                if fold_name == name:
+                    oof[test_idx] = pred
+            interval = calibrate_intervals(y, oof, level=interval_level)
+            results[name] = {
+                "estimator": type(CANDIDATES[name]).__name__,
+                "params": {k: v for k, v in CANDIDATES[name].get_params().items()
+                           if isinstance(v, (int, float, str, bool)) or v is None},
+                **{metric: round(float(np.nanmean([s[metric] for s in scores])), 6)
+                   for metric in ('mae', 'rmse', 'r2')},
+                "mae_std": round(float(np.std([s['mae'] for s in scores])), 6),
+                "fit_seconds": round(float(np.mean([s['fit_seconds'] for s in scores])), 4),
+                "interval": interval,
+                "interval_width": round(float(np.mean(np.subtract(interval['upper'], interval['lower']))), 6),
+                "latency": measure_latency(models[name], x_array),
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ranked = dict(sorted(results.items(), key=lambda item: item[1]['mae']))
+    within_budget = [name for name, r in ranked.items() if r['latency']['p95_ms'] <= latency_budget_ms]
+    for name, r in ranked.items():
+        r['within_budget'] = name in within_budget
+    result = SweepResult(ranked, within_budget[0] if within_budget else None, folds, len(data),
+                         latency_budget_ms, round(time.perf_counter() - started, 3))
+    if return_models:
+        return result, models
+    return result
+
+
+def publish_sweep_model(result, models, df, store=artifact_store):
+    """将选中的候选模型（在全部数据上拟合）发布为新版本，指标为交叉验证结果，返回版本号"""
+    if result.best is None:
+        raise ValueError(f"没有候选模型满足延迟预算（p95 ≤ {result.latency_budget_ms}ms）")
+    best = result.candidates[result.best]
+    config = {"model": result.best, "estimator": best['estimator'], "params": best['params'],
+              "cv_folds": result.folds, "selection": "sweep", "interval_level": best['interval']['level']}
+    metrics = {
+        "mae": best['mae'],
+        "r2": best['r2'],
+        "rmse": best['rmse'],
+        "n_train": result.rows,
+        "n_test": 0,
+        "cv_folds": result.folds,
+        "latency": best['latency'],
+        "interval": best['interval'],
+    }
+    sweep = {name: {k: r[k] for k in ('mae', 'r2', 'interval_width', 'latency', 'within_budget')}
+             for name, r in result.candidates.items()}
+    return store.publish(models[result.best], metrics, MODEL_SCHEMA, dataset_hash(df),
+                         extra={"train_config": config, "latency_budget_ms": result.latency_budget_ms,
+                                "sweep": sweep},
+                         source='sweep')
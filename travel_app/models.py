@@ -3,7 +3,7 @@ from django.core.validators import MinValueValidator
 import re
 
 class TravelRecord(models.Model):
-    trip_id = models.IntegerField(verbose_name="旅行ID")
+    trip_id = models.IntegerField(unique=True, verbose_name="旅行ID")
     destination = models.CharField(max_length=100, verbose_name="目的地")
     start_date = models.DateField(verbose_name="开始日期")
     end_date = models.DateField(verbose_name="结束日期")
@@ -26,10 +26,61 @@ class TravelRecord(models.Model):
     class Meta:
         verbose_name = "旅行记录"
         verbose_name_plural = "旅行记录"
+        # 可视化筛选（季节+地域 / 仅地域）后按维度分组求平均旅行周期，索引末尾带duration即可覆盖查询，无需回表
+        indexes = [
+            models.Index(fields=['season', 'region', 'traveler_gender', 'duration'], name='tr_season_region_gender_idx'),
+            models.Index(fields=['season', 'region', 'age_segment', 'duration'], name='tr_season_region_age_idx'),
+            models.Index(fields=['season', 'region', 'cost_range', 'duration'], name='tr_season_region_cost_idx'),
+            models.Index(fields=['region', 'traveler_gender', 'duration'], name='tr_region_gender_idx'),
+            models.Index(fields=['region', 'age_segment', 'duration'], name='tr_region_age_idx'),
+            models.Index(fields=['region', 'cost_range', 'duration'], name='tr_region_cost_idx'),
+            models.Index(fields=['region', 'season', 'duration'], name='tr_region_season_idx'),
+        ]
 
     def __str__(self):
         return f"{self.destination}-{self.traveler_name}-{self.duration}天"
 
+
+class TravelAggregate(models.Model):
+    """可视化汇总表：每个 (季节, 地域, 维度, 标签) 单元格的记录数与旅行周期总和，由导入过程增量维护"""
+    season = models.CharField(max_length=10, verbose_name="出行季节")
+    region = models.CharField(max_length=20, verbose_name="地域")
+    dimension = models.CharField(max_length=10, verbose_name="维度")
+    label = models.CharField(max_length=20, verbose_name="标签")
+    record_count = models.IntegerField(default=0, verbose_name="记录数")
+    duration_sum = models.FloatField(default=0.0, verbose_name="旅行周期总和（天）")
+
+    class Meta:
+        verbose_name = "旅行汇总"
+        verbose_name_plural = "旅行汇总"
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'region', 'dimension', 'label'], name='travel_aggregate_cell_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.season}-{self.region}-{self.dimension}:{self.label}（{self.record_count}条）"
+
+
+class TrainingStatistics(models.Model):
+    """
+    线性回归的充分统计量 AᵀA、Aᵀy、yᵀy（A为带常数列的特征矩阵），由导入过程增量维护；
+    version 在每次更新后加1，用于标识统计量对应的数据版本
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name="模型名称")
+    version = models.IntegerField(default=0, verbose_name="数据版本")
+    row_count = models.IntegerField(default=0, verbose_name="记录数")
+    xtx = models.JSONField(default=list, verbose_name="AᵀA")
+    xty = models.JSONField(default=list, verbose_name="Aᵀy")
+    yty = models.FloatField(default=0.0, verbose_name="yᵀy")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "训练统计量"
+        verbose_name_plural = "训练统计量"
+
+    def __str__(self):
+        return f"{self.name}（版本{self.version}，{self.row_count}条）"
+
 '''class TravelRecord(models.Model):
     """
     旅行记录数据模型
@@ -0,0 +1,161 @@
+"""
+旅行周期预测的输入校验与结果计算
+
+单条预测接口与批量预测接口共用同一套规则：
+- 参数缺失 / 非数字（布尔值、数组、对象以及 nan/inf 同样视为非数字）/ 年龄不在0-120之间 / 费用为负数 均视为无效输入
+- 预测区间为 pred + 训练时校准的残差分位数（见 intervals.py，旧模型为 pred ± mae），下限至少1天，上限不小于下限
+- 结果解读按 住宿费用 > 交通费用 > 年龄 的优先级给出
+批量计算全部基于NumPy数组，一次校验、一次 model.predict 完成整批数据；
+线性模型直接计算 X @ coef_ + intercept_，省去sklearn每次调用的输入检查开销。
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, QuantileRegressor, Ridge
+
+# 接口参数名（与预测页面表单字段一致）
+FEATURE_FIELDS = ['traveler_age', 'accommodation_cost', 'transportation_cost']
+# 兼容清洁数据CSV中的列名
+FIELD_ALIASES = {
+    'Traveler age': 'traveler_age',
+    'Accommodation cost': 'accommodation_cost',
+    'Transportation cost': 'transportation_cost',
+}
+
+MSG_MISSING = "缺失必要参数：age/acc_cost/trans_cost"
+MSG_FORMAT = "参数格式错误：age/acc_cost/trans_cost必须为数字"
+MSG_AGE = "年龄必须为0-120之间的正数"
+MSG_COST = "住宿/交通费用不能为负数"
+MSG_ROW = "行格式错误：每行必须为对象或 [age, acc_cost, trans_cost] 数组"
+
+ANALYSIS_HIGH_ACC = "住宿费用较高，旅行周期偏短（高住宿成本可能压缩旅行时长）"
+ANALYSIS_HIGH_TRANS = "交通费用较高，旅行周期偏短（长途交通可能减少停留时间）"
+ANALYSIS_OLDER = "年龄较大，旅行周期偏长（中老年旅行者节奏较慢）"
+ANALYSIS_NORMAL = "旅行周期合理，符合同类旅行者的平均水平"
+
+# 预测值为 X @ coef_ + intercept_ 的线性模型（与其 predict 的计算方式相同）
+LINEAR_MODELS = (LinearRegression, Ridge, Lasso, ElasticNet, QuantileRegressor)
+
+
+def validate_prediction_input(age_str, acc_cost_str, trans_cost_str):
+    """校验单条预测参数，返回 (age, acc_cost, trans_cost)，无效时抛出ValueError"""
+    # 异常2：参数缺失
+    if not all([age_str, acc_cost_str, trans_cost_str]):
+        raise ValueError(MSG_MISSING)
+
+    # 异常3：参数类型转换失败
+    try:
+        age = float(age_str)
+        acc_cost = float(acc_cost_str)
+        trans_cost = float(trans_cost_str)
+    except ValueError:
+        raise ValueError(MSG_FORMAT)
+    # float()可以解析 "nan" / "inf"，与批量接口一致按非数字处理
+    if not all(math.isfinite(value) for value in (age, acc_cost, trans_cost)):
+        raise ValueError(MSG_FORMAT)
+
+    # 异常4：参数值无效（负数/不合理值）
+    if age <= 0 or age > 120:
+        raise ValueError(MSG_AGE)
+    if acc_cost < 0 or trans_cost < 0:
+        raise ValueError(MSG_COST)
+    return age, acc_cost, trans_cost
+
+
+def parse_numeric_column(raw):
+    """
+    将一列参数（字符串或JSON值）转换为float数组
+    :return: (values, missing, invalid)：missing为空值/空字符串掩码，invalid为非数字掩码
+             （JSON中的布尔值、数组、对象不按数字处理，如 true 不会被当作1）
+    """
+    if pd.api.types.is_bool_dtype(raw):
+        n = len(raw)
+        return np.full(n, np.nan), np.zeros(n, dtype=bool), np.ones(n, dtype=bool)
+    if pd.api.types.is_numeric_dtype(raw):
+        # 数值列不需要逐个检查空字符串与值的类型
+        values = raw.to_numpy(dtype=float)
+        missing = np.isnan(values)
+        return values, missing, ~missing & ~np.isfinite(values)
+    non_scalar = raw.map(lambda v: isinstance(v, (bool, np.bool_, list, tuple, dict))).to_numpy(dtype=bool)
+    raw = raw.where(~non_scalar)
+    missing = ~non_scalar & (raw.isna() | raw.astype(str).str.strip().eq('')).to_numpy()
+    values = pd.to_numeric(raw.where(~missing), errors='coerce').to_numpy(dtype=float)
+    invalid = non_scalar | (~missing & ~np.isfinite(values))
+    return values, missing, invalid
+
+
+def validate_prediction_batch(frame, malformed=None):
+    """
+    向量化校验批量预测参数
+    :param frame: 包含 FEATURE_FIELDS 列的DataFrame（值可以是字符串或数字）
+    :param malformed: 格式错误的行掩码（如JSON中既不是对象也不是数组的行），这些行返回 MSG_ROW
+    :return: (features, errors, valid)：features为 n×3 的float数组，
+             errors为长度n的object数组（有效行为None，无效行为错误信息），valid为有效行掩码
+    """
+    frame = frame.rename(columns=FIELD_ALIASES)
+    n = len(frame)
+    missing = np.zeros(n, dtype=bool)
+    invalid = np.zeros(n, dtype=bool)
+    columns = []
+    for field in FEATURE_FIELDS:
+        if field not in frame.columns:
+            missing[:] = True
+            columns.append(np.full(n, np.nan))
+            continue
+        values, is_missing, is_invalid = parse_numeric_column(frame[field])
+        missing |= is_missing
+        invalid |= is_invalid
+        columns.append(values)
+
+    features = np.column_stack(columns) if n else np.empty((0, len(FEATURE_FIELDS)))
+    age, acc_cost, trans_cost = features[:, 0], features[:, 1], features[:, 2]
+    with np.errstate(invalid='ignore'):
+        bad_age = (age <= 0) | (age > 120)
+        bad_cost = (acc_cost < 0) | (trans_cost < 0)
+
+    if malformed is None:
+        malformed = np.zeros(n, dtype=bool)
+    errors = np.select(
+        [malformed, missing, invalid, bad_age, bad_cost],
+        [MSG_ROW, MSG_MISSING, MSG_FORMAT, MSG_AGE, MSG_COST],
+        default='',
+    ).astype(object)
+    valid = ~(malformed | missing | invalid | bad_age | bad_cost)
+    errors[valid] = None
+    return features, errors, valid
+
+
+def analyze(features):
+    """按输入特征给出结果解读（向量化）"""
+    age, acc_cost, trans_cost = features[:, 0], features[:, 1], features[:, 2]
+    return np.select(
+        [acc_cost > 1500, trans_cost > 1000, age > 40],
+        [ANALYSIS_HIGH_ACC, ANALYSIS_HIGH_TRANS, ANALYSIS_OLDER],
+        default=ANALYSIS_NORMAL,
+    )
+
+
+def model_predict(model, features):
+    """执行模型预测；单输出线性模型直接做矩阵乘法（结果与 model.predict 一致）"""
+    coef = getattr(model, 'coef_', None)
+    if isinstance(model, LINEAR_MODELS) and coef is not None and coef.ndim == 1 \
+            and features.ndim == 2 and features.shape[1] == coef.shape[0]:
+        return np.asarray(features, dtype=float) @ coef + model.intercept_
+    return model.predict(features)
+
+
+def predict_durations(model, intervals, features):
+    """
+    对 n×3 特征矩阵执行一次预测，返回 (pred, lower, upper, analysis) 四个长度为n的数组
+    预测值保留1位小数，区间由 intervals（IntervalTable）查表得到，下限至少1天，上限不小于下限
+    """
+    try:
+        pred = model_predict(model, features)
+    except Exception as e:
+        raise ValueError(f"模型预测失败：{str(e)}")
+    pred = np.round(pred, 1)
+    lower, upper = intervals.bounds(pred)
+    lower = np.maximum(np.round(lower, 1), 1)  # 确保至少1天
+    upper = np.maximum(np.round(upper, 1), lower)  # 预测值很小时上限可能低于1天，不能小于下限
+    return pred, lower, upper, analyze(features)
@@ -0,0 +1,160 @@
+"""
+可视化汇总表（TravelAggregate）的增量维护与全量重建
+
+每条旅行记录对应5个单元格：(季节, 地域, 维度, 标签)，维度为 gender/age/cost/region/season。
+- 导入/更新/删除记录时，在同一事务内按差值（新增 +1，更新 先-1再+1，删除 -1）
+  更新单元格的记录数与旅行周期总和，不需要重新扫描 TravelRecord 表
+- 记录数减为0的单元格被删除，与从明细数据聚合的结果保持一致
+- rebuild_summary() 从 TravelRecord 全量重建，check_summary() 对比汇总表与明细表是否一致
+"""
+import math
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+
+from .aggregates import DB_DIMENSIONS
+from .models import TravelAggregate, TravelRecord
+
+CELL_KEY = ['season', 'region', 'dimension', 'label']
+# 计算差值所需的 TravelRecord 字段
+SUMMARY_FIELDS = list(dict.fromkeys(['season', 'region', 'duration'] + list(DB_DIMENSIONS.values())))
+# 单个 IN 查询最多携带的trip_id数（低于SQLite的参数个数上限）
+LOOKUP_CHUNK_SIZE = 900
+
+
+def _empty_deltas():
+    return pd.DataFrame(columns=['record_count', 'duration_sum'],
+                        index=pd.MultiIndex.from_tuples([], names=CELL_KEY))
+
+
+def compute_deltas(records, sign=1):
+    """
+    计算一批记录对汇总表的差值
+    :param records: 包含 SUMMARY_FIELDS 列的DataFrame（或可构造DataFrame的字典/列表）
+    :param sign: 1 表示新增，-1 表示移除
+    :return: 以 CELL_KEY 为索引、包含 record_count/duration_sum 两列的DataFrame
+    """
+    df = pd.DataFrame(records, columns=SUMMARY_FIELDS)
+    if df.empty:
+        return _empty_deltas()
+    parts = []
+    for dim, field in DB_DIMENSIONS.items():
+        grouped = df.groupby(['season', 'region', field], sort=False)['duration'].agg(['size', 'sum'])
+        grouped.index = grouped.index.set_names(['season', 'region', 'label'])
+        grouped = grouped.reset_index()
+        grouped['dimension'] = dim
+        parts.append(grouped)
+    deltas = pd.concat(parts, ignore_index=True)
+    deltas['record_count'] = deltas['size'] * sign
+    deltas['duration_sum'] = deltas['sum'] * sign
+    return deltas.set_index(CELL_KEY)[['record_count', 'duration_sum']]
+
+
+def merge_deltas(*deltas):
+    """合并多组差值（同一单元格的差值相加）"""
+    frames = [d for d in deltas if len(d)]
+    if not frames:
+        return _empty_deltas()
+    return pd.concat(frames).groupby(level=CELL_KEY, sort=False).sum()
+
+
+def fetch_summary_rows(trip_ids, fields=SUMMARY_FIELDS):
+    """查询已存在记录的汇总字段（更新/删除前的旧值），fields可指定额外字段（如训练统计量所需字段）"""
+    rows = []
+    trip_ids = list(trip_ids)
+    for i in range(0, len(trip_ids), LOOKUP_CHUNK_SIZE):
+        chunk = trip_ids[i:i + LOOKUP_CHUNK_SIZE]
+        rows.extend(TravelRecord.objects.filter(trip_id__in=chunk).values_list(*fields))
+    return rows
+
+
+def apply_deltas(deltas):
+    """将差值写入汇总表（须在事务内调用；已有单元格加锁后更新，新单元格批量插入）"""
+    deltas = deltas[(deltas['record_count'] != 0) | (deltas['duration_sum'] != 0)]
+    if deltas.empty:
+        return 0
+
+    changes = {key: (int(row.record_count), float(row.duration_sum))
+               for key, row in zip(deltas.index, deltas.itertuples(index=False))}
+    existing = {}
+    seasons = {key[0] for key in changes}
+    regions = {key[1] for key in changes}
+    cells = (TravelAggregate.objects.select_for_update()
+             .filter(season__in=seasons, region__in=regions))
+    for cell in cells:
+        key = (cell.season, cell.region, cell.dimension, cell.label)
+        if key in changes:
+            existing[key] = cell
+
+    to_create, to_update, to_delete = [], [], []
+    for key, (count, total) in changes.items():
+        cell = existing.get(key)
+        if cell is None:
+            to_create.append(TravelAggregate(**dict(zip(CELL_KEY, key)), record_count=count, duration_sum=total))
+            continue
+        cell.record_count += count
+        cell.duration_sum += total
+        if cell.record_count <= 0:
+            to_delete.append(cell.pk)
+        else:
+            to_update.append(cell)
+
+    if to_create:
+        TravelAggregate.objects.bulk_create(to_create)
+    if to_update:
+        TravelAggregate.objects.bulk_update(to_update, ['record_count', 'duration_sum'])
+    if to_delete:
+        TravelAggregate.objects.filter(pk__in=to_delete).delete()
+    return len(changes)
+
+
+def expected_cells(queryset=None):
+    """
+    从 TravelRecord 明细数据聚合出汇总表应有的单元格
+    :return: {(季节, 地域, 维度, 标签): (记录数, 总和, 首次出现的记录id)}
+    """
+    queryset = TravelRecord.objects.all() if queryset is None else queryset
+    cells = {}
+    for dim, field in DB_DIMENSIONS.items():
+        rows = (queryset.values('season', 'region', label=F(field))
+                .annotate(record_count=Count('id'), duration_sum=Sum('duration'), first_id=Min('id'))
+                .order_by())
+        for row in rows:
+            key = (row['season'], row['region'], dim, row['label'])
+            cells[key] = (row['record_count'], row['duration_sum'] or 0.0, row['first_id'])
+    return cells
+
+
+@transaction.atomic
+def rebuild_summary():
+    """从 TravelRecord 全量重建汇总表，返回单元格数"""
+    cells = expected_cells()
+    TravelAggregate.objects.all().delete()
+    # 按记录首次出现的顺序插入，使汇总表中季节/地域的顺序与明细数据一致
+    ordered = sorted(cells.items(), key=lambda item: (item[1][2], list(DB_DIMENSIONS).index(item[0][2])))
+    TravelAggregate.objects.bulk_create(
+        [TravelAggregate(**dict(zip(CELL_KEY, key)), record_count=count, duration_sum=total)
+         for key, (count, total, _) in ordered],
+        batch_size=1000,
+    )
+    return len(cells)
+
+
+def check_summary(rel_tol=1e-9, abs_tol=1e-6):
+    """
+    对比汇总表与 TravelRecord 明细聚合结果
+    :return: 不一致的单元格列表 [(单元格, 汇总表中的(记录数, 总和), 明细聚合的(记录数, 总和))]
+    """
+    expected = {key: (count, total) for key, (count, total, _) in expected_cells().items()}
+    actual = {
+        (cell['season'], cell['region'], cell['dimension'], cell['label']): (cell['record_count'], cell['duration_sum'])
+        for cell in TravelAggregate.objects.values(*CELL_KEY, 'record_count', 'duration_sum')
+    }
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: tuple(str(v) for v in k)):
+        got, want = actual.get(key), expected.get(key)
+        if got is None or want is None or got[0] != want[0] or \
+                not math.isclose(got[1], want[1], rel_tol=rel_tol, abs_tol=abs_tol):
+            mismatches.append((key, got, want))
+    return mismatches
@@ -1,3 +1,1526 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import importlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock, skipIf
 
-# Create your tests here.
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Avg
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import KFold
+
+from data_preprocess import (
+    DEFAULT_RAW_DATA_PATH, clean_cost, get_age_segment, get_cost_range, get_region, get_season, preprocess_file,
+    preprocess_file_in_chunks, preprocess_shards, preprocess_travel_data, read_raw_data, resolve_input_files,
+    write_columnar,
+)
+
+from .aggregates import (
+    CUBE_COLUMNS, DB_DIMENSIONS, DIMENSIONS, REGION_COL, SEASON_COL, VALUE_COL, AggregateCube, DatabaseAggregator,
+    SummaryAggregator, get_aggregator,
+)
+from .artifacts import ArtifactStore
+from .batching import PredictionBatcher, PredictionResult
+from .cost import (
+    MSG_DURATION, MSG_FORMAT as MSG_COST_FORMAT, MSG_ROW as MSG_COST_ROW, SUGGESTIONS, compute_costs, expand_grid,
+    grid_size, suggestion_code, validate_cost_batch, validate_cost_input,
+)
+from .dataset import DatasetCache, read_cleaned_data
+from .executor import BoundedExecutor
+from .incremental import (
+    check_statistics, load_statistics, publish_incremental_model, refit_model, solve_statistics,
+    verify_incremental_model,
+)
+from .ingest import (
+    FIELD_COLUMNS, _upsert_batch, _write_batch_orm, delete_travel_records, import_travel_data, prepare_batch,
+)
+from .intervals import IntervalTable, calibrate_intervals
+from .metrics import registry
+from .model_registry import ModelRegistry
+from .model_sweep import RANDOM_STATE, publish_sweep_model, sweep_models
+from .models import TravelRecord
+from .prediction import MSG_COST, MSG_FORMAT, MSG_MISSING, MSG_ROW, predict_durations, validate_prediction_batch
+from .summary import check_summary, rebuild_summary
+from .training import FEATURE_COLS, TARGET_COL, TRAIN_CONFIG, TrainingCoordinator, train_pipeline, training_frame
+
+try:
+    import pyarrow
+except ImportError:  # 未安装pyarrow时跳过列式文件相关测试
+    pyarrow = None
+
+
+# ---------------------- 1. 清洁数据缓存 ----------------------
+class DatasetCacheTests(SimpleTestCase):
+    """清洁数据缓存只在文件 mtime/size 变化时重新加载"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        self.path = os.path.join(self.data_dir, 'cleaned.csv')
+
+    def write_csv(self, rows):
+        pd.DataFrame({'Duration (days)': np.arange(rows, dtype=float), 'Season': ['Summer'] * rows}).to_csv(
+            self.path, index=False)
+
+    def test_reload_on_file_change(self):
+        self.write_csv(3)
+        cache = DatasetCache(resolver=lambda: self.path)
+        first = cache.get()
+        self.assertIs(cache.get(), first)
+        self.assertEqual((cache.hits, cache.misses, cache.reloads), (1, 1, 0))
+
+        self.write_csv(5)
+        second = cache.get()
+        self.assertEqual(len(second), 5)
+        self.assertIs(cache.get(), second)
+        self.assertEqual((cache.hits, cache.misses, cache.reloads), (2, 2, 1))
+
+    def test_column_projection_and_categories(self):
+        self.write_csv(3)
+        df = DatasetCache(columns=['Season'], resolver=lambda: self.path).get()
+        self.assertEqual(list(df.columns), ['Season'])
+        self.assertEqual(df['Season'].dtype, 'category')
+
+    def test_missing_file(self):
+        cache = DatasetCache(resolver=lambda: self.path)
+        with self.assertRaises(FileNotFoundError):
+            cache.get()
+        self.assertFalse(cache.stats()['loaded'])
+
+
+# ---------------------- 2. 模型注册表 ----------------------
+class ModelRegistryTests(SimpleTestCase):
+    """模型注册表按 current 指针热替换，新版本加载失败时保留旧版本"""
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir, ignore_errors=True)
+        self.store = ArtifactStore(os.path.join(self.model_dir, 'artifacts'))
+        self.model_path = os.path.join(self.model_dir, 'travel_model.pkl')
+        self.mae_path = os.path.join(self.model_dir, 'model_mae.pkl')
+        self.registry = ModelRegistry(self.store, self.model_path, self.mae_path, check_interval=0)
+
+    @staticmethod
+    def fit_model(slope):
+        x = np.arange(10, dtype=float).reshape(-1, 1)
+        return LinearRegression().fit(x, slope * x.ravel())
+
+    def publish(self, slope):
+        return self.store.publish(self.fit_model(slope), {"mae": float(slope)}, {}, f"{slope:064d}")
+
+    def test_swap_to_new_version(self):
+        with self.assertRaises(FileNotFoundError):
+            self.registry.get()
+        first = self.publish(1)
+        self.assertEqual(self.registry.get().version, first)
+        self.assertIs(self.registry.get().model, self.registry.get().model)
+
+        second = self.publish(2)
+        bundle = self.registry.get()
+        self.assertEqual(bundle.version, second)
+        self.assertEqual(bundle.mae, 2.0)
+        self.assertEqual(self.registry.loads, 2)
+
+    def test_keep_current_version_when_reload_fails(self):
+        first = self.publish(1)
+        self.registry.get()
+        with open(self.store.pointer_path, 'w', encoding='utf-8') as f:
+            f.write('missing-version')
+        with self.assertLogs('travel_app', level='ERROR'):
+            bundle = self.registry.get()
+        self.assertEqual(bundle.version, first)
+        # 失败的版本在重试间隔内不再重复加载
+        with self.assertNoLogs('travel_app', level='ERROR'):
+            self.assertEqual(self.registry.get().version, first)
+
+    def test_legacy_model_files(self):
+        joblib.dump(self.fit_model(3), self.model_path)
+        joblib.dump(1.25, self.mae_path)
+        bundle = self.registry.get()
+        self.assertEqual(bundle.mae, 1.25)
+        self.assertIsNone(bundle.intervals.confidence)
+        # 发布版本化产物后优先使用产物
+        version = self.publish(4)
+        self.assertEqual(self.registry.get().version, version)
+
+
+# ---------------------- 3. 冷启动训练 ----------------------
+PREDICT_FORM = {'traveler_age': '30', 'accommodation_cost': '1000', 'transportation_cost': '500'}
+
+
+class TemporaryModelMixin:
+    """视图使用临时产物目录中的模型注册表与训练协调器（不读写 static/model 下的模型）"""
+
+    def setUp(self):
+        super().setUp()
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir, ignore_errors=True)
+        self.store = ArtifactStore(os.path.join(self.model_dir, 'artifacts'))
+        self.registry = ModelRegistry(self.store, os.path.join(self.model_dir, 'travel_model.pkl'),
+                                      os.path.join(self.model_dir, 'model_mae.pkl'), check_interval=0)
+        self.coordinator = TrainingCoordinator(self.registry, os.path.join(self.model_dir, '.train.lock'))
+        patcher = mock.patch('travel_app.views.training_coordinator', self.coordinator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def publish_model(self, coef=(0.02, -0.001, -0.001), intercept=8.0, metrics=None):
+        """发布系数已知的线性模型（PREDICT_FORM 的预测值为7.1天），返回版本号"""
+        x = np.random.default_rng(0).uniform(0, 2000, size=(50, 3))
+        model = LinearRegression().fit(x, x @ np.asarray(coef) + intercept)
+        return self.store.publish(model, metrics or {"mae": 1.5}, {}, '0' * 64)
+
+
+class ColdStartTrainingTests(TemporaryModelMixin, SimpleTestCase):
+    """模型缺失时由后台任务单独训练，请求等待超时返回503，训练完成后正常预测"""
+
+    def test_training_in_progress_returns_503(self):
+        release = threading.Event()
+
+        def slow_training(force=False, store=None):
+            release.wait(5)
+            self.publish_model()
+
+        with mock.patch('travel_app.training.train_pipeline', side_effect=slow_training) as train, \
+                override_settings(MODEL_TRAINING_WAIT_TIMEOUT=0.05, MODEL_TRAINING_RETRY_AFTER=7):
+            response = self.client.post('/predict-api/', PREDICT_FORM)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '7')
+            # 训练期间的其他请求共享同一个训练任务
+            job = self.coordinator.submit()
+            self.assertEqual(self.client.post('/predict-api/', PREDICT_FORM).status_code, 503)
+            release.set()
+            job.result(5)
+        self.assertEqual(train.call_count, 1)
+
+        response = self.client.post('/predict-api/', PREDICT_FORM)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pred_duration'], 7.1)
+
+    def test_existing_model_is_not_retrained(self):
+        self.publish_model()
+        with mock.patch('travel_app.training.train_pipeline') as train:
+            response = self.client.post('/predict-api/', PREDICT_FORM)
+        self.assertEqual(response.status_code, 200)
+        train.assert_not_called()
+
+    def test_training_failure_is_reported(self):
+        with mock.patch('travel_app.training.train_pipeline', side_effect=ValueError("训练数据无有效记录")), \
+                self.assertLogs('travel_app', level='ERROR'):
+            response = self.client.post('/predict-api/', PREDICT_FORM)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("训练数据无有效记录", response.json()['message'])
+
+
+# ---------------------- 4. 批量预测 ----------------------
+class PredictionBatchValidationTests(SimpleTestCase):
+    """批量校验与单条预测接口使用相同的规则，无效行单独返回错误信息"""
+
+    def test_row_errors(self):
+        frame = pd.DataFrame({
+            'traveler_age': [30, '45', True, '', 25, 40],
+            'accommodation_cost': [100, '200.5', 100, 100, -1, [1]],
+            'transportation_cost': [50, '0', 50, 50, 50, 50],
+        })
+        features, errors, valid = validate_prediction_batch(frame)
+        self.assertEqual(valid.tolist(), [True, True, False, False, False, False])
+        self.assertEqual(errors.tolist(), [None, None, MSG_FORMAT, MSG_MISSING, MSG_COST, MSG_FORMAT])
+        np.testing.assert_allclose(features[1], [45, 200.5, 0])
+
+    def test_malformed_rows_and_csv_column_names(self):
+        frame = pd.DataFrame({'Traveler age': [30, None], 'Accommodation cost': [100, None],
+                              'Transportation cost': [50, None]})
+        _, errors, valid = validate_prediction_batch(frame, np.array([False, True]))
+        self.assertEqual(valid.tolist(), [True, False])
+        self.assertEqual(errors[1], MSG_ROW)
+
+    def test_boolean_column(self):
+        frame = pd.DataFrame({'traveler_age': [True, False], 'accommodation_cost': [1, 2],
+                              'transportation_cost': [1, 2]})
+        _, errors, valid = validate_prediction_batch(frame)
+        self.assertFalse(valid.any())
+        self.assertEqual(errors.tolist(), [MSG_FORMAT, MSG_FORMAT])
+
+
+class PredictionBatchApiTests(TemporaryModelMixin, SimpleTestCase):
+    """批量预测接口：JSON数组/CSV文件，一次预测全部有效行"""
+
+    def setUp(self):
+        super().setUp()
+        self.publish_model()
+
+    def post_rows(self, payload):
+        return self.client.post('/predict-api/batch/', json.dumps(payload), content_type='application/json')
+
+    def test_rows_match_single_prediction(self):
+        response = self.post_rows([PREDICT_FORM, [45, 200, 1500], {'traveler_age': 'abc'}, 'oops', [1, 2]])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['total'], body['success_count'], body['error_count']), (5, 2, 3))
+        self.assertEqual([row['index'] for row in body['results']], [0, 1, 2, 3, 4])
+        self.assertEqual(body['results'][2]['message'], MSG_MISSING)
+        self.assertEqual(body['results'][3]['message'], MSG_ROW)
+        self.assertEqual(body['results'][4]['message'], MSG_ROW)
+
+        single = self.client.post('/predict-api/', PREDICT_FORM).json()
+        for key in ('pred_duration', 'lower_bound', 'upper_bound', 'analysis'):
+            self.assertEqual(body['results'][0][key], single[key])
+        self.assertEqual(body['confidence'], single['confidence'])
+
+    def test_rows_object(self):
+        response = self.post_rows({"rows": [[30, 1000, 500]]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['pred_duration'], 7.1)
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile(
+            'rows.csv', b'traveler_age,accommodation_cost,transportation_cost\n30,1000,500\n,1,1\n')
+        response = self.client.post('/predict-api/batch/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results[0]['pred_duration'], 7.1)
+        self.assertEqual(results[1]['message'], MSG_MISSING)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/predict-api/batch/').status_code, 405)
+        with self.assertLogs('travel_app', level='ERROR'):
+            self.assertEqual(self.post_rows([]).status_code, 400)
+        with self.assertLogs('travel_app', level='ERROR'):
+            self.assertEqual(self.post_rows({"rows": "30,1000,500"}).status_code, 400)
+        with override_settings(PREDICTION_BATCH_MAX_ROWS=2), self.assertLogs('travel_app', level='ERROR'):
+            self.assertEqual(self.post_rows([PREDICT_FORM] * 3).status_code, 400)
+
+    def test_all_rows_invalid_skips_model(self):
+        with mock.patch.object(self.coordinator, 'ensure_model') as ensure_model:
+            response = self.post_rows([{'traveler_age': -1, 'accommodation_cost': 1, 'transportation_cost': 1}])
+        self.assertEqual(response.json()['error_count'], 1)
+        ensure_model.assert_not_called()
+
+
+class PredictionInputTests(TemporaryModelMixin, SimpleTestCase):
+    """单条预测接口（同步/异步）拒绝 nan/inf 等非有限数值，错误信息与批量接口一致"""
+
+    def test_non_finite_values(self):
+        self.publish_model()
+        for url in ['/predict-api/', '/predict-api/async/']:
+            for field in ['traveler_age', 'accommodation_cost', 'transportation_cost']:
+                for value in ['nan', 'inf', '-Infinity']:
+                    with self.subTest(url=url, field=field, value=value), \
+                            self.assertLogs('travel_app', level='ERROR'):
+                        response = self.client.post(url, dict(PREDICT_FORM, **{field: value}))
+                        self.assertEqual(response.status_code, 400)
+                        self.assertEqual(response.json()['message'], MSG_FORMAT)
+
+        _, errors, _ = validate_prediction_batch(pd.DataFrame([dict(PREDICT_FORM, accommodation_cost='nan')]))
+        self.assertEqual(errors.tolist(), [MSG_FORMAT])
+
+
+# ---------------------- 5. 预聚合立方体 ----------------------
+def baseline_query(df, season=None, region=None):
+    """原多维度可视化视图的计算方式：筛选后逐列 groupby().mean()"""
+    filtered = df
+    if season and season in df[SEASON_COL].unique():
+        filtered = filtered[filtered[SEASON_COL] == season]
+    if region and region in df[REGION_COL].unique():
+        filtered = filtered[filtered[REGION_COL] == region]
+    result = {}
+    for dim, col in DIMENSIONS.items():
+        means = filtered.groupby(col)[VALUE_COL].mean().round(2).fillna(0)
+        result[dim] = {"labels": means.index.tolist(), "values": means.values.tolist()}
+    return result
+
+
+class BaselineAssertions:
+    def assert_matches_baseline(self, aggregator, df, ordered=True):
+        """聚合后端在全部 季节 × 地域 筛选组合（含不筛选）下与原groupby结果一致"""
+        seasons = df[SEASON_COL].unique().tolist()
+        regions = df[REGION_COL].unique().tolist()
+        if ordered:
+            self.assertEqual(aggregator.all_seasons, seasons)
+            self.assertEqual(aggregator.all_regions, regions)
+        else:
+            self.assertCountEqual(aggregator.all_seasons, seasons)
+            self.assertCountEqual(aggregator.all_regions, regions)
+
+        filters = [(season, region) for season in seasons + [''] for region in regions + ['']]
+        self.assertEqual(len(filters), 30)
+        for season, region in filters:
+            with self.subTest(aggregator=type(aggregator).__name__, season=season, region=region):
+                self.assertEqual(aggregator.query(season, region), baseline_query(df, season, region))
+
+
+class AggregateCubeTests(BaselineAssertions, SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = preprocess_travel_data(read_raw_data(DEFAULT_RAW_DATA_PATH))
+
+    def test_matches_baseline_groupby(self):
+        self.assert_matches_baseline(AggregateCube(self.df), self.df)
+
+    def test_missing_durations_and_labels(self):
+        df = self.df.copy()
+        # Oceania的女性旅行者全部缺失旅行周期（均值按0填充），部分记录缺失性别（不参与性别维度）
+        df.loc[(df[REGION_COL] == 'Oceania') & (df['Traveler gender'] == 'Female'), VALUE_COL] = np.nan
+        df.loc[df.index[:5], 'Traveler gender'] = np.nan
+        self.assert_matches_baseline(AggregateCube(df), df)
+
+    def test_categorical_columns(self):
+        df = self.df.astype({col: 'category' for col in DIMENSIONS.values()})
+        self.assert_matches_baseline(AggregateCube(df), self.df)
+
+    def test_missing_columns(self):
+        with self.assertRaises(KeyError):
+            AggregateCube(self.df.drop(columns=['Cost range']))
+
+
+# ---------------------- 6. 列式数据文件 ----------------------
+@skipIf(pyarrow is None, "未安装pyarrow")
+class ColumnarDatasetTests(SimpleTestCase):
+    """列式文件与CSV读取得到相同的数据（分类字段均为category类型）"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        df = preprocess_travel_data(read_raw_data(DEFAULT_RAW_DATA_PATH))
+        self.csv_path = os.path.join(self.data_dir, 'cleaned.csv')
+        self.columnar_path = os.path.join(self.data_dir, 'cleaned.parquet')
+        df.to_csv(self.csv_path, index=False)
+        self.assertTrue(write_columnar(df, self.columnar_path))
+
+    def test_columnar_matches_csv(self):
+        from_csv = read_cleaned_data(self.csv_path, CUBE_COLUMNS)
+        from_columnar = read_cleaned_data(self.columnar_path, CUBE_COLUMNS)
+        self.assertCountEqual(from_columnar.columns, CUBE_COLUMNS)
+        pd.testing.assert_frame_equal(from_columnar[from_csv.columns], from_csv, check_categorical=False)
+        self.assertEqual(AggregateCube(from_columnar).query('Summer'), AggregateCube(from_csv).query('Summer'))
+
+    def test_corrupt_columnar_file(self):
+        with open(self.columnar_path, 'wb') as f:
+            f.write(b'not a parquet file')
+        with self.assertRaises(ValueError):
+            read_cleaned_data(self.columnar_path)
+
+
+# ---------------------- 7. 派生字段（向量化） ----------------------
+# 原 data_preprocess.py 逐行 apply 的派生规则，作为向量化实现的对照
+def row_clean_cost(cost):
+    if isinstance(cost, str):
+        cost = ''.join(filter(str.isdigit, cost))
+        return float(cost) if cost else 0.0
+    return float(cost) if not pd.isna(cost) else 0.0
+
+
+def row_season(month):
+    if month in [3, 4, 5]:
+        return 'Spring'
+    elif month in [6, 7, 8]:
+        return 'Summer'
+    elif month in [9, 10, 11]:
+        return 'Autumn'
+    return 'Winter'
+
+
+def row_age_segment(age):
+    if age <= 25:
+        return '18-25'
+    elif age <= 40:
+        return '26-40'
+    return '40+'
+
+
+def row_cost_range(total_cost):
+    if total_cost <= 1000:
+        return 'Low'
+    elif total_cost <= 3000:
+        return 'Medium'
+    return 'High'
+
+
+def row_region(destination):
+    if pd.isna(destination):
+        return 'Unknown'
+    destination = destination.lower()
+    if any(reg in destination for reg in ['uk', 'france', 'germany', 'italy', 'spain']):
+        return 'Europe'
+    elif any(reg in destination for reg in ['usa', 'canada', 'mexico']):
+        return 'North America'
+    elif any(reg in destination for reg in ['thailand', 'indonesia', 'japan', 'korea', 'china']):
+        return 'Asia'
+    elif any(reg in destination for reg in ['australia', 'new zealand']):
+        return 'Oceania'
+    return 'Other'
+
+
+class VectorizedDerivationTests(SimpleTestCase):
+    """向量化的派生字段与原逐行规则的结果一致"""
+
+    def test_raw_dataset(self):
+        raw = read_raw_data(DEFAULT_RAW_DATA_PATH)
+        df = preprocess_travel_data(raw)
+        kept = raw.loc[df.index]
+        for col in ('Accommodation cost', 'Transportation cost'):
+            self.assertEqual(df[col].tolist(), [row_clean_cost(v) for v in kept[col]])
+        self.assertEqual(df['Season'].tolist(), [row_season(m) for m in df['Month'].astype(float)])
+        self.assertEqual(df['Age segment'].tolist(), [row_age_segment(a) for a in df['Traveler age']])
+        self.assertEqual(df['Cost range'].tolist(), [row_cost_range(c) for c in df['Total cost']])
+        self.assertEqual(df['Region'].tolist(), [row_region(d) for d in kept['Destination']])
+
+    def test_edge_values(self):
+        costs = pd.Series(['$1,500 ', '', None, '12 USD', 'free', 300], dtype=object)
+        self.assertEqual(clean_cost(costs).tolist(), [row_clean_cost(v) for v in costs])
+        numeric = pd.Series([1.5, np.nan, 20])
+        self.assertEqual(clean_cost(numeric).tolist(), [row_clean_cost(v) for v in numeric])
+
+        months = pd.Series([None] + list(range(1, 13)), dtype='Int64')
+        # 原实现中缺失月份为NaN
+        self.assertEqual(get_season(months).tolist(), [row_season(m) for m in months.astype(float)])
+        ages = pd.Series([18, 25, 25.5, 40, 40.5, 80])
+        self.assertEqual(get_age_segment(ages).tolist(), [row_age_segment(a) for a in ages])
+        totals = pd.Series([0, 1000, 1000.5, 3000, 3000.01])
+        self.assertEqual(get_cost_range(totals).tolist(), [row_cost_range(c) for c in totals])
+        destinations = pd.Series(['Paris, France', 'Tokyo, Japan', 'Sydney, Australia', 'Cancun, Mexico',
+                                  'Cape Town', None, 'UK, then Japan'], dtype=object)
+        self.assertEqual(get_region(destinations).tolist(), [row_region(d) for d in destinations])
+
+
+# ---------------------- 8. 分块流式预处理 ----------------------
+class ChunkedPreprocessTests(SimpleTestCase):
+    """分块处理的输出与一次性处理相同；处理失败时保留原有输出且不残留临时文件"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def test_chunked_output_matches_single_pass(self):
+        columnar = pyarrow is not None
+        preprocess_file(DEFAULT_RAW_DATA_PATH, self.path('full.csv'), self.path('full.parquet') if columnar else None)
+        progress = preprocess_file_in_chunks(DEFAULT_RAW_DATA_PATH, self.path('chunked.csv'), 25,
+                                             self.path('chunked.parquet') if columnar else None)
+        self.assertEqual(progress.chunks, 6)
+        pd.testing.assert_frame_equal(pd.read_csv(self.path('chunked.csv')), pd.read_csv(self.path('full.csv')))
+        if columnar:
+            pd.testing.assert_frame_equal(pd.read_parquet(self.path('chunked.parquet')),
+                                          pd.read_parquet(self.path('full.parquet')), check_categorical=False)
+
+    def test_failure_keeps_previous_output(self):
+        with open(self.path('cleaned.csv'), 'w', encoding='utf-8') as f:
+            f.write('previous')
+        calls = []
+
+        def failing_preprocess(chunk):
+            calls.append(len(chunk))
+            if len(calls) == 2:
+                raise RuntimeError("处理中断")
+            return preprocess_travel_data(chunk)
+
+        with mock.patch('data_preprocess.preprocess_travel_data', side_effect=failing_preprocess), \
+                self.assertRaises(RuntimeError):
+            preprocess_file_in_chunks(DEFAULT_RAW_DATA_PATH, self.path('cleaned.csv'), 25,
+                                      self.path('cleaned.parquet') if pyarrow is not None else None)
+        self.assertEqual(os.listdir(self.data_dir), ['cleaned.csv'])
+        with open(self.path('cleaned.csv'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'previous')
+
+
+# ---------------------- 9. 多进程分片预处理 ----------------------
+class ShardedPreprocessTests(SimpleTestCase):
+    """多个分片并行处理后按分片顺序合并，结果与一次性处理整个文件相同"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        self.shard_dir = os.path.join(self.data_dir, 'shards')
+        os.makedirs(self.shard_dir)
+        with open(DEFAULT_RAW_DATA_PATH, encoding='utf-8') as f:
+            header, *lines = f.readlines()
+        for i in range(3):
+            with open(os.path.join(self.shard_dir, f'shard-{i}.csv'), 'w', encoding='utf-8') as f:
+                f.writelines([header] + lines[i * 50:(i + 1) * 50])
+
+    def test_shards_match_single_pass(self):
+        output = os.path.join(self.data_dir, 'cleaned.csv')
+        expected = os.path.join(self.data_dir, 'expected.csv')
+        shards = resolve_input_files(self.shard_dir)
+        self.assertEqual([os.path.basename(p) for p in shards], ['shard-0.csv', 'shard-1.csv', 'shard-2.csv'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            progress, stats = preprocess_shards(shards, output, workers=2)
+        preprocess_file(DEFAULT_RAW_DATA_PATH, expected)
+
+        pd.testing.assert_frame_equal(pd.read_csv(output), pd.read_csv(expected))
+        self.assertEqual(progress.rows_out, sum(s['rows_out'] for s in stats))
+        # 分片的中间文件已删除
+        self.assertCountEqual(os.listdir(self.data_dir), ['shards', 'cleaned.csv', 'expected.csv'])
+
+    def test_missing_shards(self):
+        with self.assertRaises(FileNotFoundError):
+            resolve_input_files(os.path.join(self.data_dir, 'missing-*.csv'))
+
+
+# ---------------------- 10. 批量导入 ----------------------
+def records_frame():
+    """按记录id顺序读取 TravelRecord，列名与清洁数据CSV一致"""
+    rows = TravelRecord.objects.order_by('id').values(*FIELD_COLUMNS)
+    return pd.DataFrame(list(rows), columns=list(FIELD_COLUMNS)).rename(columns=FIELD_COLUMNS)
+
+
+def import_raw_data(**kwargs):
+    """将仓库自带的原始数据分多批导入测试数据库"""
+    return import_travel_data(DEFAULT_RAW_DATA_PATH, batch_size=40, **kwargs)
+
+
+class BulkImportTests(TestCase):
+    """分批upsert导入与一次性清洗整个文件的结果一致，重复导入不产生重复记录"""
+
+    def setUp(self):
+        self.expected = prepare_batch(read_raw_data(DEFAULT_RAW_DATA_PATH))
+
+    def assert_records_match(self):
+        df = records_frame().sort_values('Trip ID', ignore_index=True)
+        expected = pd.DataFrame(self.expected).rename(columns=FIELD_COLUMNS)
+        expected = expected.sort_values('Trip ID', ignore_index=True)
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+    def test_import_matches_single_pass(self):
+        result = import_raw_data()
+        self.assertEqual(result.rows_in, 139)
+        self.assertEqual(result.batches, 4)
+        self.assertEqual(result.rows_written, len(self.expected['trip_id']))
+        self.assertEqual(result.skipped, result.rows_in - result.rows_written)
+        self.assertEqual(TravelRecord.objects.count(), result.rows_written)
+        self.assert_records_match()
+
+    def test_reimport_updates_existing_records(self):
+        import_raw_data()
+        trip_id = self.expected['trip_id'][0]
+        TravelRecord.objects.filter(trip_id=trip_id).update(duration=99, destination='Nowhere')
+        import_raw_data()
+        self.assertEqual(TravelRecord.objects.count(), len(self.expected['trip_id']))
+        self.assert_records_match()
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            import_travel_data(DEFAULT_RAW_DATA_PATH, batch_size=0)
+
+
+@skipIf(connection.vendor != 'sqlite', "SQLite快速路径仅支持SQLite数据库")
+class SQLiteFastImportTests(TransactionTestCase):
+    """SQLite快速路径需要修改PRAGMA，不能在TestCase的外层事务中运行"""
+
+    def test_sqlite_fast_path_matches_orm(self):
+        expected = prepare_batch(read_raw_data(DEFAULT_RAW_DATA_PATH))
+        result = import_raw_data(sqlite_fast=True)
+        self.assertEqual(result.rows_written, len(expected['trip_id']))
+        fast = records_frame()
+
+        # 快速路径同样按trip_id upsert，重复导入不产生重复记录
+        import_raw_data(sqlite_fast=True)
+        self.assertEqual(TravelRecord.objects.count(), len(expected['trip_id']))
+
+        TravelRecord.objects.all().delete()
+        import_raw_data()
+        pd.testing.assert_frame_equal(fast, records_frame())
+
+
+# ---------------------- 11. ORM聚合后端 ----------------------
+class DatabaseAggregatorTests(BaselineAssertions, TestCase):
+
+    def setUp(self):
+        import_raw_data()
+
+    def test_matches_baseline_groupby(self):
+        self.assertGreater(TravelRecord.objects.count(), 0)
+        self.assert_matches_baseline(DatabaseAggregator(), records_frame())
+
+    def test_single_query_per_filter(self):
+        aggregator = DatabaseAggregator()
+        with self.assertNumQueries(1):
+            aggregator.all_seasons
+            aggregator.all_regions
+        for season, region in [('', ''), ('Summer', ''), ('Summer', 'Asia')]:
+            with self.subTest(season=season, region=region), self.assertNumQueries(1):
+                aggregator.query(season, region)
+
+    def test_empty_table(self):
+        TravelRecord.objects.all().delete()
+        aggregator = DatabaseAggregator()
+        self.assertEqual(aggregator.all_seasons, [])
+        self.assertEqual(aggregator.query(), {dim: {"labels": [], "values": []} for dim in DIMENSIONS})
+
+    def test_backend_selection(self):
+        with override_settings(TRAVEL_AGGREGATION_BACKEND='orm'):
+            self.assertIsInstance(get_aggregator(), DatabaseAggregator)
+        with override_settings(TRAVEL_AGGREGATION_BACKEND='unknown'):
+            with self.assertRaises(ImproperlyConfigured):
+                get_aggregator()
+
+    @override_settings(TRAVEL_AGGREGATION_BACKEND='orm')
+    def test_version_tracks_writes_outside_import(self):
+        cache.clear()
+        response = self.client.get('/api/visualization/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/visualization/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # 未经导入流程新增记录：汇总表不变，orm后端的版本与响应仍然更新
+        record = TravelRecord.objects.order_by('id').first()
+        record.pk = None
+        record.trip_id = 10 ** 6
+        record.season = 'Monsoon'
+        record.save()
+        response = self.client.get('/api/visualization/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Monsoon', json.loads(response.content)['seasons'])
+
+        record.delete()
+        self.assertNotEqual(self.client.get('/api/visualization/')['ETag'], response['ETag'])
+
+
+# ---------------------- 12. 仪表盘聚合的复合索引 ----------------------
+@skipIf(connection.vendor != 'sqlite', "查询计划断言基于SQLite的EXPLAIN QUERY PLAN输出")
+class AggregationIndexTests(TestCase):
+    """带季节+地域筛选的分组均值使用复合覆盖索引，不再全表扫描"""
+
+    def setUp(self):
+        import_raw_data()
+
+    def test_filtered_group_by_uses_covering_index(self):
+        queryset = TravelRecord.objects.filter(season='Summer', region='Asia')
+        for field, index in [('traveler_gender', 'tr_season_region_gender_idx'),
+                             ('age_segment', 'tr_season_region_age_idx'),
+                             ('cost_range', 'tr_season_region_cost_idx')]:
+            plan = queryset.values(field).annotate(avg_duration=Avg('duration')).order_by().explain()
+            with self.subTest(field=field):
+                self.assertIn(f'USING COVERING INDEX {index}', plan)
+
+    def test_region_filter_uses_covering_index(self):
+        queryset = TravelRecord.objects.filter(region='Asia')
+        plan = queryset.values('season').annotate(avg_duration=Avg('duration')).order_by().explain()
+        self.assertIn('USING COVERING INDEX tr_region_season_idx', plan)
+
+
+# ---------------------- 13. 增量维护的汇总表 ----------------------
+class SummaryAggregatorTests(BaselineAssertions, TestCase):
+    """导入/更新/删除时增量维护的汇总表与原groupby计算结果一致"""
+
+    def setUp(self):
+        import_raw_data()
+
+    def test_matches_baseline_groupby(self):
+        self.assertEqual(check_summary(), [])
+        self.assert_matches_baseline(SummaryAggregator(), records_frame())
+
+    def test_deltas_after_update_and_delete(self):
+        # 更新：修改部分记录的旅行周期与季节/地域，按trip_id重新upsert
+        columns = prepare_batch(read_raw_data(DEFAULT_RAW_DATA_PATH).iloc[:20])
+        columns['duration'] = [value + 3.5 for value in columns['duration']]
+        columns['season'] = ['Winter'] * len(columns['season'])
+        columns['region'] = columns['region'][::-1]
+        _upsert_batch(columns, lambda: _write_batch_orm(columns))
+        # 删除：移除另一部分记录
+        deleted = delete_travel_records(TravelRecord.objects.order_by('-id').values_list('trip_id', flat=True)[:15])
+        self.assertEqual(deleted, 15)
+
+        self.assertEqual(check_summary(), [])
+        # 单元格清零后重新创建会改变汇总表中季节/地域的先后顺序，只比较取值
+        self.assert_matches_baseline(SummaryAggregator(), records_frame(), ordered=False)
+        # 重建汇总表后恢复按记录首次出现的顺序
+        rebuild_summary()
+        self.assert_matches_baseline(SummaryAggregator(), records_frame())
+
+    def test_reimport_is_idempotent(self):
+        count = TravelRecord.objects.count()
+        import_raw_data()
+        self.assertEqual(TravelRecord.objects.count(), count)
+        self.assertEqual(check_summary(), [])
+
+    def test_check_summary_detects_drift(self):
+        TravelRecord.objects.filter(id=TravelRecord.objects.order_by('id').first().id).update(duration=999)
+        self.assertNotEqual(check_summary(), [])
+        rebuild_summary()
+        self.assertEqual(check_summary(), [])
+
+    def test_ignores_unknown_dimensions(self):
+        self.assertEqual(set(SummaryAggregator().query()), set(DB_DIMENSIONS))
+
+
+# ---------------------- 14. 可视化接口的条件请求与缓存 ----------------------
+class VisualizationDataMixin:
+    """使用临时目录中的清洁数据CSV作为 dataframe 后端的数据文件"""
+    url = '/api/visualization/'
+
+    def setUp(self):
+        super().setUp()
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        self.data_path = os.path.join(self.data_dir, 'cleaned.csv')
+        self.df = preprocess_travel_data(read_raw_data(DEFAULT_RAW_DATA_PATH))
+        self.df.to_csv(self.data_path, index=False)
+        for name, path in [('CLEANED_DATA_PATH', self.data_path),
+                           ('CLEANED_COLUMNAR_PATH', os.path.join(self.data_dir, 'cleaned.parquet'))]:
+            patcher = mock.patch(f'travel_app.dataset.{name}', path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        settings_override = override_settings(TRAVEL_AGGREGATION_BACKEND='dataframe')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def rewrite_data(self, df):
+        """改写数据文件（大小变化，mtime前移1秒，保证版本一定变化）"""
+        df.to_csv(self.data_path, index=False)
+        stat = os.stat(self.data_path)
+        os.utime(self.data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class VisualizationConditionalGetTests(VisualizationDataMixin, SimpleTestCase):
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag)
+        last_modified = response['Last-Modified']
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_data_change_invalidates_cache(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        seasons = json.loads(response.content)['seasons']
+
+        self.rewrite_data(self.df[self.df[SEASON_COL] != seasons[0]])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['seasons'], seasons[1:])
+
+    def test_missing_file(self):
+        os.remove(self.data_path)
+        with self.assertLogs('travel_app', level='ERROR'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+
+# ---------------------- 15. 可视化数据接口与页面外壳 ----------------------
+class VisualizationApiTests(VisualizationDataMixin, SimpleTestCase):
+
+    def test_series_match_baseline(self):
+        seasons = self.df[SEASON_COL].unique().tolist()
+        regions = self.df[REGION_COL].unique().tolist()
+        for season, region in [('', ''), (seasons[0], ''), ('', regions[-1]), (seasons[1], regions[0])]:
+            with self.subTest(season=season, region=region):
+                response = self.client.get(self.url, {'season': season, 'region': region})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertEqual(json.loads(response.content), {
+                    "season": season,
+                    "region": region,
+                    "seasons": seasons,
+                    "regions": regions,
+                    "series": baseline_query(self.df, season, region),
+                })
+
+    def test_invalid_filters_are_ignored(self):
+        payload = json.loads(self.client.get(self.url, {'season': 'Monsoon', 'region': 'Atlantis'}).content)
+        self.assertEqual(payload['season'], '')
+        self.assertEqual(payload['region'], '')
+        self.assertEqual(payload['series'], baseline_query(self.df))
+
+    def test_server_side_cache(self):
+        with mock.patch('travel_app.views.get_aggregator', wraps=get_aggregator) as aggregator:
+            first = self.client.get(self.url, {'season': 'Summer'})
+            second = self.client.get(self.url, {'season': 'Summer'})
+            self.assertEqual(aggregator.call_count, 1)
+            # 不同的筛选条件使用不同的缓存键
+            self.client.get(self.url, {'season': 'Winter'})
+            self.assertEqual(aggregator.call_count, 2)
+        self.assertEqual(first.content, second.content)
+
+    def test_page_shell_is_cacheable(self):
+        response = self.client.get('/visualization/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        self.assertContains(response, '/api/visualization/')
+
+
+# ---------------------- 16. 耗时统计与 /metrics 接口 ----------------------
+class MetricsEndpointTests(SimpleTestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_request_and_phase_histograms(self):
+        self.assertEqual(self.client.get('/cost-calculator/').status_code, 200)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode('utf-8')
+        self.assertIn('# TYPE travel_request_duration_seconds histogram', body)
+        self.assertIn('travel_request_duration_seconds_count{method="GET",status="200",view="cost_calculator"} 1',
+                      body)
+        self.assertIn('travel_view_phase_duration_seconds_count{phase="render",view="cost_calculator"} 1', body)
+        self.assertIn('le="+Inf"', body)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get('/cost-calculator/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(registry.collect(), ([], []))
+
+
+# ---------------------- 17. 基准测试数据生成 ----------------------
+BENCHMARKS_DIR = os.path.join(settings.BASE_DIR, 'benchmarks')
+
+
+def import_benchmark_module(name):
+    """benchmarks/ 下的脚本以 from common import ... 导入公共工具，需先将该目录加入sys.path"""
+    if BENCHMARKS_DIR not in sys.path:
+        sys.path.insert(0, BENCHMARKS_DIR)
+    return importlib.import_module(name)
+
+
+class BenchmarkDataTests(TestCase):
+
+    def setUp(self):
+        self.common = import_benchmark_module('common')
+        self.generate_data = import_benchmark_module('generate_data')
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+
+    def test_parse_rows(self):
+        for value, rows in [('500', 500), ('10k', 10000), ('1.5K', 1500), ('1M', 1000000), (' 10m ', 10000000)]:
+            with self.subTest(value=value):
+                self.assertEqual(self.common.parse_rows(value), rows)
+        for value in ['0', '-5', 'abc']:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                self.common.parse_rows(value)
+
+    def test_generated_data_is_reproducible(self):
+        path = os.path.join(self.data_dir, 'raw.csv')
+        chunked_path = os.path.join(self.data_dir, 'raw_chunked.csv')
+        self.assertEqual(self.generate_data.generate_raw_data(500, path), 500)
+        # 分块写入与一次写入结果相同（同一随机种子）
+        self.generate_data.generate_raw_data(500, chunked_path, chunk_rows=120)
+        with open(path, encoding='utf-8') as f, open(chunked_path, encoding='utf-8') as chunked:
+            self.assertEqual(f.read(), chunked.read())
+        # 临时文件写完后原子替换为目标文件，不留下 .tmp 文件
+        self.assertCountEqual(os.listdir(self.data_dir), ['raw.csv', 'raw_chunked.csv'])
+
+    def test_generated_data_imports_cleanly(self):
+        path = os.path.join(self.data_dir, 'raw.csv')
+        self.generate_data.generate_raw_data(500, path)
+        raw = read_raw_data(path)
+        self.assertEqual(raw['Trip ID'].tolist(), list(range(1, 501)))
+
+        result = import_travel_data(path, batch_size=200)
+        self.assertEqual(result.rows_in, 500)
+        self.assertEqual(result.batches, 3)
+        self.assertEqual(TravelRecord.objects.count(), result.rows_written)
+        self.assertEqual(result.rows_written, len(prepare_batch(raw)['trip_id']))
+
+
+# ---------------------- 18. 请求记录回放 ----------------------
+class RequestReplayTests(SimpleTestCase):
+
+    def setUp(self):
+        self.replay = import_benchmark_module('replay')
+        self.loadgen = import_benchmark_module('loadgen')
+
+    def test_parse_records(self):
+        parse = self.replay.parse_record
+        request = parse({"method": "get", "path": "/api/visualization/", "query": "?season=Summer&region="})
+        self.assertEqual(request.name, 'GET /api/visualization/')
+        self.assertEqual(request.query, [('season', 'Summer'), ('region', '')])
+
+        request = parse({"method": "POST", "path": "/predict-api/batch/", "json": [PREDICT_FORM], "name": "batch"})
+        self.assertEqual(request.name, 'batch')
+        self.assertEqual((request.data, request.content_type), ([PREDICT_FORM], 'application/json'))
+
+        # 需求清单等非请求记录被跳过
+        for record in [{"request_id": "user-001", "title": "..."}, {"method": "GET", "path": "predict-api/"},
+                       {"method": "GET", "path": "/", "query": 1}, []]:
+            with self.subTest(record=record):
+                self.assertIsNone(parse(record))
+
+    def test_load_requests_skips_invalid_lines(self):
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir, ignore_errors=True)
+        path = os.path.join(data_dir, 'requests.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"method": "GET", "path": "/cost-calculator/"}\n\n{"request_id": "user-001"}\nnot json\n')
+        requests, skipped = self.replay.load_requests(path)
+        self.assertEqual([r.path for r in requests], ['/cost-calculator/'])
+        self.assertEqual(skipped, 2)
+
+        requests, skipped = self.replay.load_requests(self.replay.DEFAULT_LOG_PATH)
+        self.assertGreater(len(requests), 0)
+        self.assertEqual(skipped, 0)
+
+    def test_in_process_replay(self):
+        requests = [self.loadgen.BenchRequest('cost', 'GET', '/cost-calculator/')]
+        samples, _ = self.loadgen.run_load(requests, concurrency=2, factory=self.loadgen.transport_factory(None),
+                                           total=4)
+        self.assertEqual([(s.name, s.status, s.error) for s in samples], [('cost', 200, None)] * 4)
+
+
+# ---------------------- 19. 异步视图与有界线程池 ----------------------
+class TestExecutorMixin:
+    """视图使用单个工作线程、无等待队列的测试线程池，占满后即可触发429"""
+
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(ASYNC_EXECUTOR_WORKERS=1, ASYNC_EXECUTOR_QUEUE_SIZE=0,
+                                              ASYNC_EXECUTOR_RETRY_AFTER=3)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.executor = BoundedExecutor('travel-test')
+        patcher = mock.patch('travel_app.views.cpu_executor', self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: self.executor._executor and self.executor._executor.shutdown())
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def occupy_executor(self):
+        """在另一个线程中提交一个阻塞任务占满线程池，返回释放函数（任务结束、名额归还后返回）"""
+        release = threading.Event()
+        thread = threading.Thread(target=lambda: asyncio.run(self.executor.run(release.wait, 5)))
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(release.set)
+        for _ in range(500):
+            if self.executor.stats()['pending']:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.executor.stats(), {"pending": 1, "capacity": 1})
+
+        def release_executor():
+            release.set()
+            # 名额在任务的完成回调中归还，先于等待该任务的协程返回
+            thread.join(5)
+            self.assertEqual(self.executor.stats()['pending'], 0)
+        return release_executor
+
+    def assert_rejected(self, response):
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+        _, counters = registry.collect()
+        self.assertIn((('travel_executor_rejected_total', (('executor', 'travel-test'),)), 1), counters)
+
+
+class AsyncPredictionTests(TestExecutorMixin, TemporaryModelMixin, SimpleTestCase):
+
+    def test_matches_sync_view(self):
+        self.publish_model()
+        response = self.client.post('/predict-api/async/', PREDICT_FORM)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.client.post('/predict-api/', PREDICT_FORM).json())
+
+    def test_invalid_input_and_method(self):
+        with self.assertLogs('travel_app', level='ERROR'):
+            response = self.client.post('/predict-api/async/', dict(PREDICT_FORM, traveler_age='abc'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], MSG_FORMAT)
+        self.assertEqual(self.client.get('/predict-api/async/').status_code, 405)
+
+    def test_busy_executor_returns_429(self):
+        self.publish_model()
+        release_executor = self.occupy_executor()
+        self.assert_rejected(self.client.post('/predict-api/async/', PREDICT_FORM))
+        release_executor()
+        self.assertEqual(self.client.post('/predict-api/async/', PREDICT_FORM).status_code, 200)
+
+
+class AsyncVisualizationTests(TestExecutorMixin, VisualizationDataMixin, SimpleTestCase):
+    url = '/api/visualization/async/'
+
+    def test_matches_sync_view(self):
+        response = self.client.get(self.url, {'season': 'Summer'})
+        self.assertEqual(response.status_code, 200)
+        sync = self.client.get('/api/visualization/', {'season': 'Summer'})
+        self.assertEqual(json.loads(response.content), json.loads(sync.content))
+        self.assertEqual(response['ETag'], sync['ETag'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        response = self.client.get(self.url, {'season': 'Summer'}, HTTP_IF_NONE_MATCH=sync['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_busy_executor_returns_429(self):
+        self.occupy_executor()
+        self.assert_rejected(self.client.get(self.url))
+
+
+# ---------------------- 20. 单条预测请求合并 ----------------------
+@override_settings(PREDICTION_COALESCE_ENABLED=True, ASYNC_EXECUTOR_RETRY_AFTER=3)
+class CoalescedPredictionTests(TemporaryModelMixin, SimpleTestCase):
+    """开启合并后单条预测接口的结果与逐条预测一致；队列已满返回429，等待超时返回503"""
+
+    def setUp(self):
+        super().setUp()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def get_model(self):
+        bundle = self.coordinator.ensure_model(wait_timeout=0, retry_after=1)
+        return bundle.model, bundle.intervals
+
+    def blocking_get_model(self):
+        self.release.wait(5)
+        return self.get_model()
+
+    def use_batcher(self, model_getter, **kwargs):
+        batcher = PredictionBatcher(model_getter, **kwargs)
+        patcher = mock.patch('travel_app.views.prediction_batcher', batcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return batcher
+
+    def test_matches_direct_prediction(self):
+        self.publish_model()
+        self.use_batcher(self.get_model, window=0.001)
+        with override_settings(PREDICTION_COALESCE_ENABLED=False):
+            expected = self.client.post('/predict-api/', PREDICT_FORM).json()
+        for url in ['/predict-api/', '/predict-api/async/']:
+            with self.subTest(url=url):
+                response = self.client.post(url, PREDICT_FORM)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected)
+
+    def test_concurrent_rows_share_one_batch(self):
+        self.publish_model()
+        getter = mock.Mock(side_effect=self.get_model)
+        batcher = PredictionBatcher(getter, window=0.2)
+        rows = [[20 + i, 500 + 100 * i, 300] for i in range(5)]
+        futures = [batcher.submit(row) for row in rows]
+        results = [future.result(5) for future in futures]
+
+        model, intervals = self.get_model()
+        pred, lower, upper, analysis = predict_durations(model, intervals, np.array(rows, dtype=float))
+        self.assertEqual(results, [
+            PredictionResult(*values, intervals.confidence)
+            for values in zip(pred.tolist(), lower.tolist(), upper.tolist(), analysis.tolist())
+        ])
+        self.assertEqual(getter.call_count, 1)
+        _, counters = registry.collect()
+        self.assertIn((('travel_prediction_batches_total', (('reason', 'window'),)), 1), counters)
+
+    def test_full_queue_returns_429(self):
+        self.publish_model()
+        batcher = self.use_batcher(self.blocking_get_model, window=0, max_queue=1)
+        first = batcher.submit([30, 1000, 500])
+        # 第一行已被后台线程取出（阻塞在获取模型上），第二行占满队列
+        for _ in range(500):
+            if not batcher._queue:
+                break
+            time.sleep(0.01)
+        second = batcher.submit([30, 1000, 500])
+
+        response = self.client.post('/predict-api/', PREDICT_FORM)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+        self.release.set()
+        self.assertEqual(first.result(5), second.result(5))
+
+    def test_timeout_returns_503(self):
+        self.publish_model()
+        self.use_batcher(self.blocking_get_model, window=0, timeout=0.05)
+        response = self.client.post('/predict-api/', PREDICT_FORM)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+
+    def test_failed_batch_does_not_stop_worker(self):
+        self.publish_model()
+        getter = mock.Mock(side_effect=[RuntimeError("boom"), self.get_model()])
+        batcher = PredictionBatcher(getter, window=0)
+        with self.assertRaises(RuntimeError):
+            batcher.predict([30, 1000, 500])
+        thread = batcher._thread
+        self.assertEqual(batcher.predict([30, 1000, 500]).pred_duration, 7.1)
+        self.assertIs(batcher._thread, thread)
+
+
+# ---------------------- 21. 版本化产物的训练流程 ----------------------
+class TrainingPipelineTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = preprocess_travel_data(read_raw_data(DEFAULT_RAW_DATA_PATH))
+
+    def setUp(self):
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir, ignore_errors=True)
+        self.store = ArtifactStore(os.path.join(model_dir, 'artifacts'))
+
+    def test_publishes_versioned_artifact(self):
+        outcome = train_pipeline(store=self.store, df=self.df)
+        self.assertFalse(outcome.skipped)
+        self.assertEqual(self.store.current_version(), outcome.version)
+
+        metrics = self.store.read_metrics(outcome.version)
+        self.assertEqual(metrics['n_train'] + metrics['n_test'], len(training_frame(self.df)))
+        self.assertEqual(metrics['interval']['level'], TRAIN_CONFIG['interval_level'])
+        manifest = self.store.read_manifest(outcome.version)
+        self.assertEqual(manifest['model_source'], 'pipeline')
+        self.assertEqual(manifest['train_config'], TRAIN_CONFIG)
+
+        artifact = self.store.load(outcome.version)
+        self.assertEqual(artifact.schema['features'], FEATURE_COLS)
+        self.assertEqual(artifact.model.predict(self.df[FEATURE_COLS].dropna().iloc[:5]).shape, (5,))
+
+    def test_skips_unchanged_data(self):
+        first = train_pipeline(store=self.store, df=self.df)
+        outcome = train_pipeline(store=self.store, df=self.df.copy())
+        self.assertTrue(outcome.skipped)
+        self.assertEqual(outcome.version, first.version)
+        self.assertEqual(outcome.metrics, first.metrics)
+
+        forced = train_pipeline(force=True, store=self.store, df=self.df)
+        self.assertFalse(forced.skipped)
+        self.assertNotEqual(forced.version, first.version)
+
+    def test_config_change_alone_is_skipped(self):
+        # 只比较数据集哈希：修改训练配置后需要force=True才会重新训练
+        first = train_pipeline(store=self.store, df=self.df)
+        with mock.patch.dict('travel_app.training.TRAIN_CONFIG', test_size=0.3):
+            self.assertTrue(train_pipeline(store=self.store, df=self.df).skipped)
+            forced = train_pipeline(force=True, store=self.store, df=self.df)
+        self.assertNotEqual(forced.version, first.version)
+        self.assertEqual(self.store.read_manifest(forced.version)['train_config']['test_size'], 0.3)
+
+    def test_retrains_on_changed_data(self):
+        first = train_pipeline(store=self.store, df=self.df)
+        changed = self.df.copy()
+        changed.loc[changed.index[0], TARGET_COL] += 1
+        outcome = train_pipeline(store=self.store, df=changed)
+        self.assertFalse(outcome.skipped)
+        self.assertNotEqual(outcome.version, first.version)
+
+    def test_missing_columns(self):
+        with self.assertRaises(KeyError):
+            train_pipeline(store=self.store, df=self.df.drop(columns=[TARGET_COL]))
+        self.assertIsNone(self.store.current_version())
+
+
+# ---------------------- 22. 增量训练 ----------------------
+class IncrementalModelTests(TestCase):
+    """训练统计量的正规方程求解结果与全量拟合 LinearRegression 一致"""
+
+    def setUp(self):
+        import_raw_data()
+
+    def assert_matches_refit(self):
+        self.assertEqual(check_statistics(), [])
+        stats, _ = load_statistics()
+        coef, intercept = solve_statistics(stats)
+        refit_coef, refit_intercept, rows = refit_model()
+        self.assertEqual(stats.row_count, rows)
+        np.testing.assert_allclose(coef, refit_coef, rtol=1e-6, atol=1e-9)
+        self.assertAlmostEqual(intercept, refit_intercept, places=6)
+        matched, details = verify_incremental_model()
+        self.assertTrue(matched, details)
+
+    def test_incremental_fit_equals_full_refit(self):
+        self.assert_matches_refit()
+
+    def test_incremental_fit_after_update_and_delete(self):
+        columns = prepare_batch(read_raw_data(DEFAULT_RAW_DATA_PATH).iloc[30:60])
+        columns['duration'] = [value * 2 for value in columns['duration']]
+        columns['traveler_age'] = [value + 10 for value in columns['traveler_age']]
+        _upsert_batch(columns, lambda: _write_batch_orm(columns))
+        delete_travel_records(columns['trip_id'][:10])
+        self.assert_matches_refit()
+
+    def test_empty_statistics_cannot_be_solved(self):
+        delete_travel_records(TravelRecord.objects.values_list('trip_id', flat=True))
+        stats, _ = load_statistics()
+        self.assertEqual(stats.row_count, 0)
+        with self.assertRaises(ValueError):
+            solve_statistics(stats)
+
+
+class IncrementalPublishTests(TestCase):
+    """增量发布只与统计量哈希比较，与训练流水线交替运行时不会来回重新发布"""
+
+    def setUp(self):
+        import_raw_data()
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir, ignore_errors=True)
+        self.store = ArtifactStore(os.path.join(model_dir, 'artifacts'))
+
+    def test_skips_unchanged_statistics(self):
+        outcome = publish_incremental_model(store=self.store)
+        self.assertFalse(outcome.skipped)
+        self.assertEqual(self.store.read_manifest(outcome.version)['model_source'], 'incremental')
+        self.assertEqual(outcome.metrics['n_test'], 0)
+        self.assertTrue(outcome.metrics['mae_estimated'])
+        self.assertTrue(publish_incremental_model(store=self.store).skipped)
+        self.assertFalse(publish_incremental_model(force=True, store=self.store).skipped)
+
+    def test_no_ping_pong_with_pipeline(self):
+        incremental = publish_incremental_model(store=self.store)
+        pipeline = train_pipeline(store=self.store, df=records_frame())
+        self.assertFalse(pipeline.skipped)
+
+        # 数据未变化：两种发布方式都保留当前（流水线发布的）版本
+        self.assertTrue(publish_incremental_model(store=self.store).skipped)
+        self.assertTrue(train_pipeline(store=self.store, df=records_frame()).skipped)
+        self.assertEqual(self.store.current_version(), pipeline.version)
+        self.assertNotEqual(pipeline.version, incremental.version)
+
+        # 数据变化后增量发布新版本
+        delete_travel_records(TravelRecord.objects.values_list('trip_id', flat=True)[:5])
+        self.assertFalse(publish_incremental_model(store=self.store).skipped)
+
+
+# ---------------------- 23. 候选模型交叉验证对比 ----------------------
+class ModelSweepTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = preprocess_travel_data(read_raw_data(DEFAULT_RAW_DATA_PATH))
+        cls.result, cls.models = sweep_models(cls.df, ['linear', 'ridge_1'], folds=3, n_jobs=1,
+                                              latency_budget_ms=1000, return_models=True)
+
+    def setUp(self):
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir, ignore_errors=True)
+        self.store = ArtifactStore(os.path.join(model_dir, 'artifacts'))
+
+    def test_cross_validated_metrics(self):
+        data = training_frame(self.df)
+        x, y = data[FEATURE_COLS].to_numpy(dtype=float), data[TARGET_COL].to_numpy(dtype=float)
+        maes = [
+            mean_absolute_error(y[test], LinearRegression().fit(x[train], y[train]).predict(x[test]))
+            for train, test in KFold(n_splits=3, shuffle=True, random_state=RANDOM_STATE).split(x)
+        ]
+        self.assertAlmostEqual(self.result.candidates['linear']['mae'], np.mean(maes), places=6)
+        self.assertEqual(self.result.rows, len(data))
+        self.assertEqual(list(self.result.candidates), sorted(self.result.candidates,
+                                                              key=lambda name: self.result.candidates[name]['mae']))
+        self.assertIn(self.result.best, ['linear', 'ridge_1'])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(KeyError):
+            sweep_models(self.df, ['linear', 'unknown'], n_jobs=1)
+        with self.assertRaises(ValueError):
+            sweep_models(self.df.iloc[:2], ['linear'], folds=3, n_jobs=1)
+
+    def test_published_sweep_model_is_kept_by_pipeline(self):
+        version = publish_sweep_model(self.result, self.models, self.df, store=self.store)
+        manifest = self.store.read_manifest(version)
+        self.assertEqual(manifest['model_source'], 'sweep')
+        self.assertEqual(manifest['train_config']['model'], self.result.best)
+        self.assertEqual(self.store.read_metrics(version)['cv_folds'], 3)
+
+        # 训练数据未变化：训练流水线保留模型对比选出的模型
+        outcome = train_pipeline(store=self.store, df=self.df)
+        self.assertTrue(outcome.skipped)
+        self.assertEqual(self.store.current_version(), version)
+
+    def test_no_candidate_within_budget(self):
+        result = self.result._replace(best=None)
+        with self.assertRaises(ValueError):
+            publish_sweep_model(result, self.models, self.df, store=self.store)
+
+
+# ---------------------- 24. 预测区间校准 ----------------------
+class IntervalCalibrationTests(SimpleTestCase):
+
+    def test_coverage_on_new_data(self):
+        rng = np.random.default_rng(0)
+        y_pred = rng.uniform(1, 30, size=4000)
+        # 残差的离散程度随预测值增大
+        y_true = y_pred + rng.normal(0, 1 + y_pred / 10)
+        interval = calibrate_intervals(y_true[:2000], y_pred[:2000], level=0.9)
+        self.assertEqual(len(interval['edges']), 3)
+
+        table = IntervalTable.from_metrics({"mae": 1.0, "interval": interval})
+        self.assertEqual(table.confidence, '90%')
+        lower, upper = table.bounds(y_pred[2000:])
+        coverage = np.mean((y_true[2000:] >= lower) & (y_true[2000:] <= upper))
+        self.assertGreaterEqual(coverage, 0.88)
+
+    def test_legacy_metrics_use_mae(self):
+        table = IntervalTable.from_metrics({"mae": 2.0})
+        self.assertIsNone(table.confidence)
+        lower, upper = table.bounds(np.array([10.0]))
+        self.assertEqual((lower[0], upper[0]), (8.0, 12.0))
+
+    def test_empty_calibration_data(self):
+        with self.assertRaises(ValueError):
+            calibrate_intervals([], [])
+
+
+class PredictionIntervalApiTests(TemporaryModelMixin, SimpleTestCase):
+    """预测接口返回训练时校准的区间与置信度；旧模型（只有MAE）的置信度为null"""
+    interval = {"method": "residual_quantile", "level": 0.95, "n_calibration": 50,
+                "lower": [-2.0], "upper": [3.0], "edges": []}
+
+    def test_calibrated_interval(self):
+        self.publish_model(metrics={"mae": 1.5, "interval": self.interval})
+        result = self.client.post('/predict-api/', PREDICT_FORM).json()
+        self.assertEqual((result['pred_duration'], result['lower_bound'], result['upper_bound']), (7.1, 5.1, 10.1))
+        self.assertEqual(result['confidence'], '95%')
+
+    def test_legacy_interval(self):
+        self.publish_model()
+        result = self.client.post('/predict-api/', PREDICT_FORM).json()
+        self.assertEqual((result['lower_bound'], result['upper_bound']), (5.6, 8.6))
+        self.assertIsNone(result['confidence'])
+
+    def test_lower_bound_is_at_least_one_day(self):
+        self.publish_model(coef=(0, 0, 0), intercept=2.0, metrics={"mae": 1.5, "interval": self.interval})
+        result = self.client.post('/predict-api/', PREDICT_FORM).json()
+        self.assertEqual((result['pred_duration'], result['lower_bound'], result['upper_bound']), (2.0, 1.0, 5.0))
+
+    def test_upper_bound_is_not_below_lower_bound(self):
+        # 预测值 + 区间上限偏移量低于1天：下限抬到1天后，上限同样不低于1天
+        self.publish_model(coef=(0, 0, 0), intercept=-3.0, metrics={"mae": 1.5, "interval": self.interval})
+        for url in ['/predict-api/', '/predict-api/batch/']:
+            with self.subTest(url=url):
+                if url.endswith('batch/'):
+                    response = self.client.post(url, json.dumps([PREDICT_FORM]), content_type='application/json')
+                    result = response.json()['results'][0]
+                else:
+                    result = self.client.post(url, PREDICT_FORM).json()
+                self.assertEqual((result['lower_bound'], result['upper_bound']), (1.0, 1.0))
+
+
+# ---------------------- 25. 费用方案批量计算 ----------------------
+class CostScenarioGridTests(SimpleTestCase):
+
+    def test_grid_matches_scalar_computation(self):
+        grid = {"duration": {"start": 1, "stop": 30}, "acc_cost": [80, 300, 900], "trans_cost": [0, 2000]}
+        self.assertEqual(grid_size(grid), 30 * 3 * 2)
+        frame = expand_grid(grid)
+        self.assertEqual(len(frame), 180)
+        # 时长变化最快
+        self.assertEqual(frame['duration'].iloc[:3].tolist(), [1.0, 2.0, 3.0])
+
+        values, errors, valid = validate_cost_batch(frame)
+        self.assertTrue(valid.all())
+        result = compute_costs(values)
+        for i, (duration, acc_cost, trans_cost) in enumerate(values):
+            total = acc_cost * duration + trans_cost
+            acc_ratio = acc_cost * duration / total * 100 if total else 0.0
+            trans_ratio = trans_cost / total * 100 if total else 0.0
+            self.assertEqual(result['total_cost'][i], round(total, 2))
+            self.assertEqual(result['daily_cost'][i], round(total / duration, 2))
+            self.assertEqual(result['suggestion_code'][i], suggestion_code(acc_ratio, trans_ratio, total / duration))
+
+    def test_invalid_rows(self):
+        frame = pd.DataFrame({'duration': [400, 'x'], 'acc_cost': [100, 100], 'trans_cost': [0, 0]})
+        _, errors, valid = validate_cost_batch(frame)
+        self.assertFalse(valid.any())
+        self.assertEqual(errors.tolist(), [MSG_DURATION, MSG_COST_FORMAT])
+
+    def test_invalid_grid(self):
+        with self.assertRaises(ValueError):
+            expand_grid({"duration": {"start": 5, "stop": 1}, "acc_cost": [100], "trans_cost": [0]})
+
+    def test_grid_size_overflow(self):
+        for spec in [{"start": -1e308, "stop": 1e308}, {"start": 0, "stop": 1e300, "step": 1e-300},
+                     {"start": 1, "stop": 1e6}]:
+            grid = {"duration": spec, "acc_cost": [100], "trans_cost": [0]}
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                grid_size(grid, max_rows=1000)
+        # 未指定上限时，只有无法表示的取值个数才抛出异常
+        self.assertEqual(grid_size({"duration": {"start": 1, "stop": 1e6}, "acc_cost": [1], "trans_cost": [0]}),
+                         1000000)
+        with self.assertRaises(ValueError):
+            grid_size({"duration": {"start": -1e308, "stop": 1e308}, "acc_cost": [100], "trans_cost": [0]})
+
+    def test_non_finite_single_input(self):
+        self.assertEqual(validate_cost_input('5', '200', '300'), (5.0, 200.0, 300.0))
+        for values in [('nan', '200', '300'), ('5', 'inf', '300'), ('5', '200', '-Infinity')]:
+            with self.subTest(values=values), self.assertRaises(ValueError) as cm:
+                validate_cost_input(*values)
+            self.assertEqual(str(cm.exception), MSG_COST_FORMAT)
+
+
+class CostScenarioApiTests(SimpleTestCase):
+    url = '/cost-calculator/scenarios/'
+    grid = {"duration": {"start": 1, "stop": 10}, "acc_cost": [100, 500], "trans_cost": [0, 800]}
+
+    def post_json(self, payload, **params):
+        url = self.url + ('?' + '&'.join(f'{k}={v}' for k, v in params.items()) if params else '')
+        return self.client.post(url, json.dumps(payload), content_type='application/json')
+
+    @override_settings(COST_SCENARIO_CHUNK_ROWS=7)
+    def test_grid_streams_json(self):
+        response = self.post_json({"grid": self.grid})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        payload = json.loads(b''.join(response.streaming_content))
+        self.assertEqual((payload['total'], payload['success_count'], payload['error_count']), (40, 40, 0))
+        self.assertEqual(payload['suggestions'], {str(k): v for k, v in SUGGESTIONS.items()})
+        self.assertEqual([row['index'] for row in payload['results']], list(range(40)))
+
+        values, _, _ = validate_cost_batch(expand_grid(self.grid))
+        expected = compute_costs(values)
+        for field in ['total_cost', 'daily_cost', 'suggestion_code']:
+            self.assertEqual([row[field] for row in payload['results']], expected[field].tolist())
+
+    @override_settings(COST_SCENARIO_CHUNK_ROWS=3)
+    def test_rows_stream_csv(self):
+        rows = [{"duration": 5, "acc_cost": 200, "trans_cost": 300}, [3, 100, 0], [1, 2], "x", [400, 100, 0]]
+        response = self.post_json(rows, format='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        frame = pd.read_csv(io.StringIO(b''.join(response.streaming_content).decode('utf-8')), keep_default_na=False)
+        self.assertEqual(frame['status'].tolist(), ['success', 'success', 'error', 'error', 'error'])
+        self.assertEqual(frame['total_cost'].tolist(), ['1300.0', '300.0', '', '', ''])
+        self.assertEqual(frame['message'].tolist()[2:], [MSG_COST_ROW, MSG_COST_ROW, MSG_DURATION])
+
+    @override_settings(COST_SCENARIO_MAX_ROWS=39)
+    def test_grid_over_limit(self):
+        with self.assertLogs('travel_app', level='ERROR'):
+            response = self.post_json({"grid": self.grid})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('39', response.json()['message'])
+
+    def test_grid_range_overflow(self):
+        for spec in [{"start": -1e308, "stop": 1e308}, {"start": 0, "stop": 1e300, "step": 1e-300}]:
+            with self.subTest(spec=spec), self.assertLogs('travel_app', level='ERROR'):
+                response = self.post_json({"grid": dict(self.grid, duration=spec)})
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        for payload, params in [({"grid": self.grid}, {'format': 'xml'}), ({"grid": [1]}, {}), ([], {}),
+                                ({"rows": "x"}, {})]:
+            with self.subTest(payload=payload, params=params), self.assertLogs('travel_app', level='ERROR'):
+                self.assertEqual(self.post_json(payload, **params).status_code, 400)
@@ -1,74 +1,104 @@
+import argparse
 import os
 import sys
-import pandas as pd
-import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
 
 # 修复：添加项目根目录到Python路径
 current_script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_script_dir)
 sys.path.append(project_root)
 
-
-def train_travel_duration_model():
-    # 1. 读取data_preprocess.py生成的清洁数据CSV文件
-    cleaned_data_path = os.path.join(
-        project_root,
-        'data/cleaned_travel_data.csv'  # 与data_preprocess.py的输出路径一致
-    )
-
-    # 校验文件是否存在
+from travel_app.artifacts import ArtifactStore, artifact_store
+from travel_app.dataset import get_cleaned_data, resolve_data_path
+from travel_app.model_sweep import (
+    CANDIDATES, DEFAULT_FOLDS, DEFAULT_LATENCY_BUDGET_MS, publish_sweep_model, sweep_models,
+)
+from travel_app.training import FEATURE_COLS, TARGET_COL, train_pipeline
+
+
+def train_travel_duration_model(force=False, store=None):
+    """
+    训练预测模型并发布为新版本产物（static/model/artifacts/<版本>/，current指向新版本）
+    只比较训练数据（数据集哈希）：数据未变化时跳过训练，只修改训练配置（TRAIN_CONFIG）时需传入force=True重新训练
+    """
+    # 1. 校验清洁数据文件是否存在（由data_preprocess.py生成，优先列式文件，回退CSV）
+    cleaned_data_path = resolve_data_path()
     if not os.path.exists(cleaned_data_path):
         print(f"错误：未找到清洁数据文件，请先运行data_preprocess.py！路径：{cleaned_data_path}")
-        return
-
-    df = pd.read_csv(cleaned_data_path)
-    print(f"原始预处理数据条数：{len(df)}")
-
-    # 2. 轻量缺失值校验（仅检查模型训练所需核心字段，不重复大规模清洗）
-    train_required_fields = ['Traveler age', 'Accommodation cost', 'Transportation cost', 'Duration (days)']
-    missing_stats = df[train_required_fields].isnull().sum()
-
-    print("\n模型训练核心字段缺失值统计（轻量校验）：")
-    print(missing_stats)
-
-    # 仅删除核心字段仍存在的缺失行（极端情况防护，理论上预处理已处理）
-    df = df.dropna(subset=train_required_fields)
-    print(f"\n轻量校验后有效数据条数：{len(df)}")
-
-    # 空数据校验
-    if df.empty:
-        print("警告：无有效训练数据（核心字段全缺失），无法训练模型！")
-        return
-
-    # 3. 划分特征（X）和目标（y）（适配CSV文件的字段名）
-    x = df[['Traveler age', 'Accommodation cost', 'Transportation cost']]
-    y = df['Duration (days)']
-
-    # 4. 分割训练集和测试集（数据量校验）
-    if len(df) < 5:  # 测试集占20%，至少需要5条数据
-        print("警告：有效数据量过少（<5条），无法分割训练/测试集！")
-        return
-
-    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
-
-    # 5. 训练线性回归模型
-    model = LinearRegression()
-    model.fit(x_train, y_train)
-
-    # 6. 评估模型
-    y_pred = model.predict(x_test)
-    r2 = r2_score(y_test, y_pred)
-    print(f"\n模型训练完成，R²分数：{round(r2, 3)}")
-
-    # 7. 保存模型
-    model_path = os.path.join(project_root, 'static/model/travel_model.pkl')
-    os.makedirs(os.path.dirname(model_path), exist_ok=True)
-    joblib.dump(model, model_path)
-    print(f"模型已保存到：{model_path}")
+        return None
+
+    # 2. 训练并发布（与冷启动训练、warm_model命令为同一条训练流水线）
+    store = store or artifact_store
+    try:
+        outcome = train_pipeline(force=force, store=store)
+    except (KeyError, ValueError) as e:
+        print(f"警告：无法训练模型：{str(e)}")
+        return None
+
+    # 3. 输出结果
+    metrics = outcome.metrics
+    if outcome.skipped:
+        print(f"训练数据未变化，跳过训练（当前版本：{outcome.version}）")
+    else:
+        print(f"模型训练完成：训练集 {metrics['n_train']} 条，测试集 {metrics['n_test']} 条")
+    r2 = metrics.get('r2')
+    print(f"MAE：{metrics['mae']:.2f} 天，R²分数：{'-' if r2 is None else round(r2, 3)}")
+    print(f"模型已保存到：{store.version_dir(outcome.version)}")
+    return outcome
+
+
+def sweep_travel_duration_models(candidates=None, folds=DEFAULT_FOLDS, n_jobs=-1,
+                                 latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS, publish=False, store=None):
+    """
+    候选模型对比：k折交叉验证（多进程并行）+ 单条预测延迟，
+    输出各候选模型的MAE与延迟；publish=True时发布满足延迟预算且MAE最小的模型
+    """
+    cleaned_data_path = resolve_data_path()
+    if not os.path.exists(cleaned_data_path):
+        print(f"错误：未找到清洁数据文件，请先运行data_preprocess.py！路径：{cleaned_data_path}")
+        return None
+
+    df = get_cleaned_data(FEATURE_COLS + [TARGET_COL])
+    try:
+        result, models = sweep_models(df, candidates, folds, n_jobs, latency_budget_ms, return_models=True)
+    except (KeyError, ValueError) as e:
+        print(f"警告：无法对比候选模型：{str(e)}")
+        return None
+
+    print(f"{result.rows} 条数据，{result.folds} 折交叉验证，耗时 {result.elapsed:.2f}s，"
+          f"单条预测延迟预算 p95 ≤ {result.latency_budget_ms}ms")
+    width = max(len(name) for name in result.candidates)
+    for name, r in result.candidates.items():
+        latency = r['latency']
+        mark = '*' if name == result.best else ('' if r['within_budget'] else '（超出延迟预算）')
+        print(f"  {name:<{width}}  MAE={r['mae']:.4f}±{r['mae_std']:.4f}  R²={r['r2']:.3f}  "
+              f"区间宽度={r['interval_width']:.2f}天  p50={latency['p50_ms']:.3f}ms  p95={latency['p95_ms']:.3f}ms  "
+              f"批量={latency['batch_rows_per_sec']:.0f}行/秒 {mark}")
+    if result.best is None:
+        print("没有候选模型满足延迟预算")
+    else:
+        print(f"推荐模型：{result.best}")
+        if publish:
+            store = store or artifact_store
+            version = publish_sweep_model(result, models, df, store)
+            print(f"模型已发布到：{store.version_dir(version)}")
+    return result
 
 
 if __name__ == "__main__":
-    train_travel_duration_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="训练旅行周期预测模型")
+    parser.add_argument('--force', action='store_true', help="训练数据未变化时也重新训练")
+    parser.add_argument('--artifact-root', help="产物目录（默认 static/model/artifacts）")
+    parser.add_argument('--sweep', action='store_true', help="对比候选模型（k折交叉验证 + 推理延迟）")
+    parser.add_argument('--candidates', nargs='+', choices=list(CANDIDATES), help="参与对比的候选模型（默认全部）")
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS, help="交叉验证折数")
+    parser.add_argument('--jobs', type=int, default=-1, help="并行进程数（-1表示全部CPU核心）")
+    parser.add_argument('--latency-budget-ms', type=float, default=DEFAULT_LATENCY_BUDGET_MS,
+                        help="单条预测的p95延迟预算（毫秒）")
+    parser.add_argument('--publish', action='store_true', help="发布对比选出的模型（与 --sweep 一起使用）")
+    args = parser.parse_args()
+    store = ArtifactStore(args.artifact_root) if args.artifact_root else None
+    if args.sweep:
+        sweep_travel_duration_models(args.candidates, args.folds, args.jobs, args.latency_budget_ms,
+                                     args.publish, store)
+    else:
+        train_travel_duration_model(args.force, store)
@@ -0,0 +1,260 @@
+"""
+预测模型训练流水线与训练协调器
+
+训练流水线（train_pipeline）是唯一的训练入口，train_model.py、model_mae.py、warm_model命令与冷启动训练共用：
+- 按训练数据计算数据集哈希，与当前版本记录的清洁数据哈希相同时跳过训练
+  （不论当前版本由哪种训练参数或模型对比产生；只修改训练参数时用 force 重新训练）
+- 训练线性回归模型，在20%测试集上计算MAE与R²，并按测试集残差分位数校准预测区间（见 intervals.py）
+- 模型、指标、特征列与数据集哈希作为一个新版本发布到产物目录（见 artifacts.py）
+
+冷启动（模型文件缺失）时保证同一时刻只有一个训练任务：
+- 进程内：所有请求共享同一个后台训练任务（single-flight），训练不在请求线程中执行
+- 进程间：训练前获取文件锁，其他进程拿到锁后发现模型已存在则直接加载
+- 请求最多等待 wait_timeout 秒，仍未完成时抛出 TrainingInProgress（视图返回503 + Retry-After）
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from .artifacts import artifact_store
+from .dataset import get_cleaned_data
+from .intervals import DEFAULT_LEVEL, calibrate_intervals
+from .model_registry import MODEL_DIR, model_registry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger('travel_app')
+
+TRAIN_LOCK_PATH = os.path.join(MODEL_DIR, '.train.lock')
+FEATURE_COLS = ['Traveler age', 'Accommodation cost', 'Transportation cost']
+TARGET_COL = 'Duration (days)'
+# 模型产物中的特征与目标列
+MODEL_SCHEMA = {"features": FEATURE_COLS, "target": TARGET_COL}
+# 训练配置（写入manifest的train_config，不参与数据集哈希计算）
+TRAIN_CONFIG = {"model": "LinearRegression", "test_size": 0.2, "random_state": 42, "interval_level": DEFAULT_LEVEL}
+
+# 一次训练流水线的结果：version为当前版本号，skipped为True表示数据未变化、未重新训练
+TrainingOutcome = namedtuple('TrainingOutcome', ['version', 'metrics', 'skipped'])
+
+
+class TrainingInProgress(Exception):
+    """模型正在训练中，调用方应稍后重试"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"模型正在训练中，请{retry_after}秒后重试")
+        self.retry_after = retry_after
+
+
+class FileLock:
+    """跨进程文件锁（POSIX使用fcntl，Windows使用msvcrt），进程退出时自动释放"""
+
+    def __init__(self, path, timeout=None, poll_interval=0.1):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def _try_lock(self, fd):
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                raise TimeoutError(f"等待训练文件锁超时：{self.path}")
+            time.sleep(self.poll_interval)
+        self._fd = fd
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def training_frame(df):
+    """校验并取出训练所需列（删除空值行）"""
+    missing_cols = [col for col in FEATURE_COLS + [TARGET_COL] if col not in df.columns]
+    if missing_cols:
+        raise KeyError(f"训练数据缺失列：{', '.join(missing_cols)}")
+
+    # 处理训练数据空值
+    df = df[FEATURE_COLS + [TARGET_COL]].dropna()
+    if df.empty:
+        raise ValueError("训练数据无有效记录（空值过滤后）")
+    return df
+
+
+def dataset_hash(df):
+    """训练数据（按行顺序）的SHA-256摘要"""
+    df = training_frame(df).astype('float64')
+    digest = hashlib.sha256(json.dumps(list(df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def train_duration_model(df):
+    """训练线性回归模型，返回 (model, metrics)；MAE、R²与预测区间在20%测试集上计算"""
+    df = training_frame(df)
+
+    # 拆分训练/测试集
+    x = df[FEATURE_COLS]
+    y = df[TARGET_COL]
+    x_train, x_test, y_train, y_test = train_test_split(
+        x, y, test_size=TRAIN_CONFIG['test_size'], random_state=TRAIN_CONFIG['random_state']
+    )
+
+    # 训练线性回归模型
+    model = LinearRegression()
+    model.fit(x_train, y_train)
+
+    # 计算MAE、R²与预测区间（测试集残差分位数）
+    y_pred = model.predict(x_test)
+    metrics = {
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "r2": float(r2_score(y_test, y_pred)) if len(y_test) > 1 else None,
+        "n_train": len(x_train),
+        "n_test": len(x_test),
+        "interval": calibrate_intervals(y_test, y_pred, level=TRAIN_CONFIG['interval_level']),
+    }
+    return model, metrics
+
+
+def train_pipeline(force=False, store=artifact_store, df=None):
+    """
+    训练并发布新版本产物；训练数据未变化时跳过训练，保留当前版本的模型（含模型对比选出的模型）
+    :param force: 为True时忽略数据集哈希，总是重新训练
+    :param df: 训练数据，默认读取清洁数据
+    :return: TrainingOutcome
+    """
+    if df is None:
+        df = get_cleaned_data(FEATURE_COLS + [TARGET_COL])
+    data_hash = dataset_hash(df)
+
+    if not force and store.current_data_hash('dataset') == data_hash:
+        version = store.current_version()
+        logger.info(f"训练数据未变化，跳过训练（当前版本 {version}）")
+        return TrainingOutcome(version, store.read_metrics(version), True)
+
+    started = time.perf_counter()
+    model, metrics = train_duration_model(df)
+    version = store.publish(model, metrics, MODEL_SCHEMA, data_hash, extra={"train_config": TRAIN_CONFIG})
+    logger.info(f"模型训练完成并发布版本 {version}！耗时 {time.perf_counter() - started:.2f}s")
+    return TrainingOutcome(version, metrics, False)
+
+
+class TrainingJob:
+    """一次训练任务的结果容器，等待方共享同一个结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.bundle = None
+        self.error = None
+
+    def result(self, timeout=None):
+        if not self.done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.bundle
+
+
+class TrainingCoordinator:
+    """single-flight训练协调器"""
+
+    def __init__(self, registry, lock_path, lock_timeout=600):
+        self.registry = registry
+        self.lock_path = lock_path
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._job = None
+
+    def submit(self, force=False):
+        """启动后台训练任务；已有任务在运行时直接返回该任务"""
+        with self._lock:
+            if self._job is not None:
+                return self._job
+            job = TrainingJob()
+            self._job = job
+        thread = threading.Thread(target=self._run, args=(job, force), name='travel-model-training', daemon=True)
+        thread.start()
+        return job
+
+    def _run(self, job, force):
+        try:
+            with FileLock(self.lock_path, timeout=self.lock_timeout):
+                bundle = None
+                if not force:
+                    # 拿到锁后再检查一次：其他进程可能已训练完成
+                    try:
+                        bundle = self.registry.get(force_check=True)
+                    except FileNotFoundError:
+                        bundle = None
+                if bundle is None:
+                    train_pipeline(force=force, store=self.registry.store)
+                    bundle = self.registry.get(force_check=True)
+            job.bundle = bundle
+        except PermissionError:
+            job.error = PermissionError(f"无权限保存模型到：{MODEL_DIR}")
+        except Exception as e:
+            job.error = e
+        finally:
+            with self._lock:
+                self._job = None
+            job.done.set()
+
+    def ensure_model(self, wait_timeout=None, retry_after=5):
+        """返回可用的模型快照；模型缺失时触发训练，并最多等待 wait_timeout 秒"""
+        try:
+            return self.registry.get()
+        except FileNotFoundError:
+            pass
+        job = self.submit()
+        bundle = job.result(wait_timeout)
+        if bundle is None:
+            raise TrainingInProgress(retry_after)
+        return bundle
+
+    def train(self, force=False):
+        """同步训练（用于管理命令预热），阻塞直到训练完成"""
+        return self.submit(force=force).result()
+
+
+# 进程级单例
+training_coordinator = TrainingCoordinator(model_registry, TRAIN_LOCK_PATH)
@@ -1,165 +1,205 @@
 from django.db import models
 from travel_app.models import TravelRecord
-import os
 import pandas as pd
-import joblib
 import numpy as np
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from .models import TravelRecord
+from .aggregates import get_aggregator, get_dataset_version
+from .training import TrainingInProgress, training_coordinator
+from .prediction import FEATURE_FIELDS, validate_prediction_input, validate_prediction_batch, predict_durations
+from .cost import (COST_FIELDS, SUGGESTIONS, compute_costs, expand_grid, grid_size, suggestion_code,
+                   validate_cost_batch, validate_cost_input)
+from .metrics import record_cache, render_metrics, span
+from .executor import ExecutorBusy, cpu_executor
+from .batching import PredictionBatcher, PredictionTimeout
 from datetime import datetime
+import csv
+import hashlib
+import io
+import json
 import logging
 from django.views.decorators.csrf import csrf_exempt
 
-# 配置日志记录器
+# 日志记录器（处理器与格式见 settings.LOGGING）
 logger = logging.getLogger('travel_app')
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('travel_app_error.log'),
-        logging.StreamHandler()
-    ]
-)
 
 
 # ---------------------- 1. 首页视图 ----------------------
 def index(request):
     """首页视图：展示4个功能入口"""
     try:
-        return render(request, 'index.html')
+        with span('index', 'render'):
+            return render(request, 'index.html')
     except Exception as e:
         logger.error(f"首页视图加载失败: {str(e)}", exc_info=True)
         return render(request, 'error.html', {"error_msg": "首页加载失败，请稍后重试"}, status=500)
 
 
 # ---------------------- 2. 多维度可视化视图 ----------------------
+# 2.1 可视化页面（静态外壳，图表数据由前端请求 /api/visualization/ 获取）
+@cache_control(public=True, max_age=settings.VISUALIZATION_PAGE_MAX_AGE)
 def multi_visualization(request):
-    """多维度可视化视图：支持季节/地域筛选，生成多维度旅行周期分析图表"""
+    """多维度可视化页面：不包含数据，可长期缓存；切换筛选条件时前端只重新请求数据接口"""
     try:
-        # 加载清洁数据
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-        data_path = os.path.join(data_dir, 'cleaned_travel_data.csv')
+        with span('visualization', 'render'):
+            return render(request, 'visualization.html')
+    except Exception as e:
+        logger.error(f"可视化页面加载失败: {str(e)}", exc_info=True)
+        return render(request, 'error.html', {"error_msg": "可视化加载失败，请联系管理员"}, status=500)
 
-        # 异常1：数据文件不存在/路径错误
-        if not os.path.exists(data_path):
-            raise FileNotFoundError(f"清洁数据文件不存在：{data_path}")
 
-        # 异常2：CSV文件读取失败（格式错误、权限不足等）
+# 2.2 可视化数据接口
+def _visualization_version(request):
+    """当前数据集版本（同一请求内只计算一次）；获取失败时返回None，由视图给出对应的错误响应"""
+    if not hasattr(request, '_dataset_version'):
         try:
-            df = pd.read_csv(data_path)
-        except PermissionError:
-            raise PermissionError(f"无读取权限：{data_path}")
-        except pd.errors.EmptyDataError:
-            raise ValueError(f"CSV文件为空：{data_path}")
-        except pd.errors.ParserError:
-            raise ValueError(f"CSV文件格式错误，无法解析：{data_path}")
-
-        # 1. 获取前端筛选参数（季节、地域）
-        selected_season = request.GET.get('season', '')
-        selected_region = request.GET.get('region', '')
-
-        # 2. 筛选数据（处理空值/无效值）
-        filtered_df = df.copy()
-        if selected_season and selected_season in df['Season'].unique():
-            filtered_df = filtered_df[filtered_df['Season'] == selected_season]
-        if selected_region and selected_region in df['Region'].unique():
-            filtered_df = filtered_df[filtered_df['Region'] == selected_region]
-
-        # 3. 计算5类对比数据（处理空数据场景）
-        def safe_groupby_mean(df, group_col, value_col):
-            """安全分组计算均值，处理空分组/空值"""
-            if group_col not in df.columns or value_col not in df.columns:
-                raise KeyError(f"缺失必要列：{group_col} 或 {value_col}")
-            if df.empty:
-                return pd.Series([], dtype=float)
-            result = df.groupby(group_col)[value_col].mean().round(2)
-            return result.fillna(0)  # 空值填充为0
-
-        # 3.1 性别 vs 旅行周期
-        gender_data = safe_groupby_mean(filtered_df, 'Traveler gender', 'Duration (days)')
-        gender_labels = gender_data.index.tolist()
-        gender_values = gender_data.values.tolist()
-
-        # 3.2 年龄分段 vs 旅行周期
-        age_data = safe_groupby_mean(filtered_df, 'Age segment', 'Duration (days)')
-        age_labels = age_data.index.tolist()
-        age_values = age_data.values.tolist()
-
-        # 3.3 费用区间 vs 旅行周期
-        cost_data = safe_groupby_mean(filtered_df, 'Cost range', 'Duration (days)')
-        cost_labels = cost_data.index.tolist()
-        cost_values = cost_data.values.tolist()
-
-        # 3.4 地域 vs 旅行周期
-        region_data = safe_groupby_mean(filtered_df, 'Region', 'Duration (days)')
-        region_labels = region_data.index.tolist()
-        region_values = region_data.values.tolist()
-
-        # 3.5 季节 vs 旅行周期
-        season_data = safe_groupby_mean(filtered_df, 'Season', 'Duration (days)')
-        season_labels = season_data.index.tolist()
-        season_values = season_data.values.tolist()
-
-        # 4. 准备ECharts基础配置
-        base_option = {
-            "title": {"text": "多维度旅行周期分析", "left": "center", "fontSize": 18},
-            "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
-            "legend": {"data": ["平均旅行周期（天）"], "bottom": 10},
-            "toolbox": {
-                "feature": {
-                    "saveAsImage": {"type": "png", "name": "旅行数据可视化"},
-                    "magicType": {"type": ["bar", "line", "pie"],
-                                  "title": {"bar": "柱状图", "line": "折线图", "pie": "饼图"}}
-                },
-                "right": 20
-            },
-            "dataZoom": [{"type": "slider", "xAxisIndex": 0, "bottom": 40}]
-        }
-
-        # 初始渲染性别对比（柱状图）
-        init_option = {
-            **base_option,
-            "xAxis": {"type": "category", "data": gender_labels, "axisLabel": {"rotate": 0}},
-            "yAxis": {"type": "value", "name": "天数", "min": 0},
-            "series": [
-                {"name": "平均旅行周期（天）", "type": "bar", "data": gender_values, "itemStyle": {"color": "#4895ef"}}]
-        }
-
-        # 传递所有数据到前端
-        context = {
-            "init_option": init_option,
-            "gender_data": {"labels": gender_labels, "values": gender_values},
-            "age_data": {"labels": age_labels, "values": age_values},
-            "cost_data": {"labels": cost_labels, "values": cost_values},
-            "region_data": {"labels": region_labels, "values": region_values},
-            "season_data": {"labels": season_labels, "values": season_values},
-            "all_seasons": df['Season'].unique().tolist(),
-            "all_regions": df['Region'].unique().tolist(),
-            "selected_season": selected_season,
-            "selected_region": selected_region
-        }
-        return render(request, 'visualization.html', context)
+            with span('visualization_api', 'version'):
+                request._dataset_version = get_dataset_version()
+        except Exception as e:
+            logger.error(f"可视化接口 - 获取数据集版本失败: {str(e)}", exc_info=True)
+            request._dataset_version = None
+    return request._dataset_version
+
+
+def _visualization_etag(request):
+    version = _visualization_version(request)
+    return version.tag if version is not None else None
+
+
+def _visualization_last_modified(request):
+    version = _visualization_version(request)
+    return version.last_modified if version is not None else None
+
+
+def _visualization_cache_key(version, season, region):
+    # 筛选参数取自查询字符串，摘要后作为键，避免超长或含特殊字符的缓存键
+    params = hashlib.md5(f"{season}\0{region}".encode('utf-8')).hexdigest()
+    return f"visualization-api:{version.tag}:{params}"
+
+
+def _visualization_error_response(e):
+    """可视化接口统一异常响应"""
+    if isinstance(e, FileNotFoundError):
+        logger.error(f"可视化接口 - 文件不存在: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": f"数据文件缺失：{str(e)}"}, status=404)
+    if isinstance(e, PermissionError):
+        logger.error(f"可视化接口 - 权限不足: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": f"无权限读取数据文件：{str(e)}"}, status=403)
+    if isinstance(e, KeyError):
+        logger.error(f"可视化接口 - 列缺失: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": f"数据文件缺少必要字段：{str(e)}"}, status=400)
+    if isinstance(e, ValueError):
+        logger.error(f"可视化接口 - 数据格式错误: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": f"数据格式错误：{str(e)}"}, status=400)
+    logger.error(f"可视化接口 - 未知错误: {str(e)}", exc_info=True)
+    return JsonResponse({"status": "error", "message": "可视化数据加载失败，请联系管理员"}, status=500)
+
+
+# 数据集版本未变化时：浏览器/反向代理携带 If-None-Match / If-Modified-Since 直接得到304，不加载数据；
+# 其他请求按 (数据集版本, 季节, 地域) 缓存序列化后的JSON，数据集更新后版本变化，旧缓存自然失效
+@cache_control(public=True, max_age=settings.VISUALIZATION_API_MAX_AGE)
+@condition(etag_func=_visualization_etag, last_modified_func=_visualization_last_modified)
+def visualization_api(request):
+    """
+    可视化数据接口：返回指定季节/地域筛选下5个维度的平均旅行周期
+    响应格式：{"season", "region", "seasons", "regions", "series": {维度: {"labels": [...], "values": [...]}}}
+    labels与values为等长的平行数组；无效的筛选值按不筛选处理（season/region返回空字符串）
+    """
+    selected_season = request.GET.get('season', '')
+    selected_region = request.GET.get('region', '')
+    version = _visualization_version(request)
+    cache_key = None
+    if version is not None:
+        cache_key = _visualization_cache_key(version, selected_season, selected_region)
+        with span('visualization_api', 'cache'):
+            cached = cache.get(cache_key)
+        record_cache('visualization_api', cached is not None)
+        if cached is not None:
+            return HttpResponse(cached, content_type='application/json')
 
-    # 细分异常处理
-    except FileNotFoundError as e:
-        logger.error(f"可视化视图 - 文件不存在: {str(e)}", exc_info=True)
-        return render(request, 'error.html', {"error_msg": f"数据文件缺失：{str(e)}"}, status=404)
-    except PermissionError as e:
-        logger.error(f"可视化视图 - 权限不足: {str(e)}", exc_info=True)
-        return render(request, 'error.html', {"error_msg": f"无权限读取数据文件：{str(e)}"}, status=403)
-    except KeyError as e:
-        logger.error(f"可视化视图 - 列缺失: {str(e)}", exc_info=True)
-        return render(request, 'error.html', {"error_msg": f"数据文件缺少必要字段：{str(e)}"}, status=400)
-    except ValueError as e:
-        logger.error(f"可视化视图 - 数据格式错误: {str(e)}", exc_info=True)
-        return render(request, 'error.html', {"error_msg": f"数据格式错误：{str(e)}"}, status=400)
+    try:
+        content = _visualization_content(selected_season, selected_region)
+        if cache_key is not None:
+            cache.set(cache_key, content, settings.VISUALIZATION_CACHE_TIMEOUT)
+        return HttpResponse(content, content_type='application/json')
     except Exception as e:
-        logger.error(f"可视化视图 - 未知错误: {str(e)}", exc_info=True)
-        return render(request, 'error.html', {"error_msg": "可视化加载失败，请联系管理员"}, status=500)
+        return _visualization_error_response(e)
+
+
+def _visualization_content(selected_season, selected_region, view='visualization_api'):
+    """加载聚合后端并生成序列化后的JSON（同步/异步接口共用，异常由调用方转换为错误响应）"""
+    # 获取聚合后端（默认为预聚合立方体，每个数据集版本只构建一次；文件不存在/为空/格式错误时抛出对应异常）
+    with span(view, 'load'):
+        cube = get_aggregator()
+
+    # 筛选条件（忽略空值/无效值）
+    with span(view, 'filter'):
+        season_filter = selected_season if selected_season in cube.all_seasons else None
+        region_filter = selected_region if selected_region in cube.all_regions else None
+
+    with span(view, 'aggregate'):
+        series = cube.query(season_filter, region_filter)
+    payload = {
+        "season": season_filter or "",
+        "region": region_filter or "",
+        "seasons": cube.all_seasons,
+        "regions": cube.all_regions,
+        "series": series,
+    }
+    # 紧凑格式（无多余空格、中文不转义），配合GZip中间件压缩传输
+    with span(view, 'serialize'):
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+# 2.3 可视化数据接口（异步版本，ASGI部署使用）
+# 数据集版本与聚合计算在有界线程池中执行，线程池已满时返回429；缓存、304与响应格式与同步接口一致
+@cache_control(public=True, max_age=settings.VISUALIZATION_API_MAX_AGE)
+async def visualization_api_async(request):
+    """异步可视化数据接口：先在线程池中取得数据集版本（供ETag/Last-Modified使用），再处理条件请求"""
+    try:
+        await cpu_executor.run(_visualization_version, request)
+    except ExecutorBusy as e:
+        return _busy_response('可视化接口（异步）', e)
+    return await _visualization_api_async(request)
+
+
+@condition(etag_func=_visualization_etag, last_modified_func=_visualization_last_modified)
+async def _visualization_api_async(request):
+    selected_season = request.GET.get('season', '')
+    selected_region = request.GET.get('region', '')
+    version = _visualization_version(request)  # 已在线程池中计算并保存在request上
+    cache_key = None
+    if version is not None:
+        cache_key = _visualization_cache_key(version, selected_season, selected_region)
+        with span('visualization_api_async', 'cache'):
+            cached = await cache.aget(cache_key)
+        record_cache('visualization_api', cached is not None)
+        if cached is not None:
+            return HttpResponse(cached, content_type='application/json')
+
+    try:
+        content = await cpu_executor.run(_visualization_content, selected_season, selected_region,
+                                         'visualization_api_async')
+        if cache_key is not None:
+            await cache.aset(cache_key, content, settings.VISUALIZATION_CACHE_TIMEOUT)
+        return HttpResponse(content, content_type='application/json')
+    except ExecutorBusy as e:
+        return _busy_response('可视化接口（异步）', e)
+    except Exception as e:
+        return _visualization_error_response(e)
+
+
+def _busy_response(view_name, e):
+    """线程池已满：返回429并通过Retry-After提示客户端重试间隔"""
+    logger.warning(f"{view_name} - 线程池已满: {str(e)}")
+    response = JsonResponse({"status": "error", "message": str(e)}, status=429)
+    response['Retry-After'] = str(e.retry_after)
+    return response
 
 
 # ---------------------- 3. 旅行周期预测视图 ----------------------
@@ -167,12 +207,37 @@ def multi_visualization(request):
 def travel_prediction(request):
     """预测页面：展示预测表单"""
     try:
-        return render(request, 'prediction.html')
+        with span('prediction', 'render'):
+            return render(request, 'prediction.html')
     except Exception as e:
         logger.error(f"预测页面加载失败: {str(e)}", exc_info=True)
         return render(request, 'error.html', {"error_msg": "预测页面加载失败，请稍后重试"}, status=500)
 
 
+def _get_model(wait=True):
+    """获取 (model, intervals)：进程内注册表常驻内存，模型文件更新后自动热替换；
+    模型缺失时由训练协调器在后台单独训练，请求最多等待 MODEL_TRAINING_WAIT_TIMEOUT 秒（wait为False时不等待）"""
+    try:
+        bundle = training_coordinator.ensure_model(
+            wait_timeout=getattr(settings, 'MODEL_TRAINING_WAIT_TIMEOUT', 10) if wait else 0,
+            retry_after=getattr(settings, 'MODEL_TRAINING_RETRY_AFTER', 5),
+        )
+    except (TrainingInProgress, FileNotFoundError, PermissionError, KeyError, ValueError):
+        raise
+    except Exception as e:
+        raise ValueError(f"加载模型失败：{str(e)}")
+    return bundle.model, bundle.intervals
+
+
+# 单条预测请求合并器（PREDICTION_COALESCE_ENABLED 开启时使用）：并发请求合并为一次模型预测；
+# 合并器的后台线程不等待冷启动训练（由提交请求的线程等待），避免训练期间阻塞所有合并的请求
+prediction_batcher = PredictionBatcher(lambda: _get_model(wait=False))
+
+
+def _coalesce_enabled():
+    return getattr(settings, 'PREDICTION_COALESCE_ENABLED', False)
+
+
 # 3.2 预测接口（处理AJAX请求）
 @csrf_exempt
 def predict_api(request):
@@ -186,184 +251,231 @@ def predict_api(request):
         }, status=405)
 
     try:
-        # 1. 获取输入参数（3个核心参数）
-        age_str = request.POST.get('traveler_age')
-        acc_cost_str = request.POST.get('accommodation_cost')
-        trans_cost_str = request.POST.get('transportation_cost')
-
-        # 异常2：参数缺失
-        if not all([age_str, acc_cost_str, trans_cost_str]):
-            raise ValueError("缺失必要参数：age/acc_cost/trans_cost")
-
-        # 异常3：参数类型转换失败
-        try:
-            age = float(age_str)
-            acc_cost = float(acc_cost_str)
-            trans_cost = float(trans_cost_str)
-        except ValueError:
-            raise ValueError("参数格式错误：age/acc_cost/trans_cost必须为数字")
-
-        # 异常4：参数值无效（负数/不合理值）
-        if age <= 0 or age > 120:
-            raise ValueError("年龄必须为0-120之间的正数")
-        if acc_cost < 0 or trans_cost < 0:
-            raise ValueError("住宿/交通费用不能为负数")
-
-        # 2. 加载或训练模型
-        model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static/model')
-        model_path = os.path.join(model_dir, 'travel_model.pkl')
-        mae_path = os.path.join(model_dir, 'model_mae.pkl')
-
-        if not os.path.exists(model_path) or not os.path.exists(mae_path):
-            # 训练模型（首次运行时）
-            data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data/cleaned_travel_data.csv')
-
-            # 检查数据文件
-            if not os.path.exists(data_path):
-                raise FileNotFoundError(f"训练数据文件不存在：{data_path}")
-
-            # 读取训练数据
-            try:
-                df = pd.read_csv(data_path)
-            except Exception as e:
-                raise ValueError(f"读取训练数据失败：{str(e)}")
-
-            # 检查训练数据列
-            required_cols = ['Traveler age', 'Accommodation cost', 'Transportation cost', 'Duration (days)']
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            if missing_cols:
-                raise KeyError(f"训练数据缺失列：{', '.join(missing_cols)}")
-
-            # 处理训练数据空值
-            df = df.dropna(subset=required_cols)
-            if df.empty:
-                raise ValueError("训练数据无有效记录（空值过滤后）")
-
-            # 拆分训练/测试集
-            x = df[['Traveler age', 'Accommodation cost', 'Transportation cost']]
-            y = df['Duration (days)']
-            x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
-
-            # 训练线性回归模型
-            model = LinearRegression()
-            model.fit(x_train, y_train)
-
-            # 计算MAE（用于预测区间）
-            y_pred = model.predict(x_test)
-            mae = mean_absolute_error(y_test, y_pred)
-
-            # 保存模型和MAE（确保目录存在）
-            os.makedirs(model_dir, exist_ok=True)
-            try:
-                joblib.dump(model, model_path)
-                joblib.dump(mae, mae_path)
-            except PermissionError:
-                raise PermissionError(f"无权限保存模型到：{model_dir}")
-            logger.info("模型训练完成并保存！")
-
-        # 加载模型和MAE
-        try:
-            model = joblib.load(model_path)
-            mae = joblib.load(mae_path)
-        except FileNotFoundError:
-            raise FileNotFoundError(f"模型文件缺失：{model_path} 或 {mae_path}")
-        except Exception as e:
-            raise ValueError(f"加载模型失败：{str(e)}")
+        # 1. 获取并校验输入参数
+        age, acc_cost, trans_cost = _read_prediction_input(request, 'predict_api')
 
-        # 3. 预测计算
-        input_data = np.array([[age, acc_cost, trans_cost]])
-        try:
-            pred_duration = model.predict(input_data)[0]
-        except Exception as e:
-            raise ValueError(f"模型预测失败：{str(e)}")
-        pred_duration = round(pred_duration, 1)
-
-        # 计算预测区间（pred ± mae）
-        lower_bound = round(pred_duration - mae, 1)
-        upper_bound = round(pred_duration + mae, 1)
-        lower_bound = max(lower_bound, 1)  # 确保至少1天
-
-        # 4. 结果解读
-        analysis = ""
-        if acc_cost > 1500:
-            analysis = "住宿费用较高，旅行周期偏短（高住宿成本可能压缩旅行时长）"
-        elif trans_cost > 1000:
-            analysis = "交通费用较高，旅行周期偏短（长途交通可能减少停留时间）"
-        elif age > 40:
-            analysis = "年龄较大，旅行周期偏长（中老年旅行者节奏较慢）"
-        else:
-            analysis = "旅行周期合理，符合同类旅行者的平均水平"
-
-        # 5. 返回结果
-        return JsonResponse({
-            "status": "success",
-            "pred_duration": pred_duration,
-            "lower_bound": lower_bound,
-            "upper_bound": upper_bound,
-            "analysis": analysis,
-            "confidence": "95%"
-        })
+        # 2-4. 获取模型、预测计算与结果解读
+        return JsonResponse(_predict_single(age, acc_cost, trans_cost, 'predict_api'))
 
     # 细分异常处理
-    except ValueError as e:
-        logger.error(f"预测接口 - 数值错误: {str(e)}", exc_info=True)
-        return JsonResponse({
-            "status": "error",
-            "message": str(e)
-        }, status=400)
-    except FileNotFoundError as e:
-        logger.error(f"预测接口 - 文件缺失: {str(e)}", exc_info=True)
-        return JsonResponse({
-            "status": "error",
-            "message": str(e)
-        }, status=404)
-    except PermissionError as e:
-        logger.error(f"预测接口 - 权限不足: {str(e)}", exc_info=True)
-        return JsonResponse({
-            "status": "error",
-            "message": str(e)
-        }, status=403)
-    except KeyError as e:
-        logger.error(f"预测接口 - 列缺失: {str(e)}", exc_info=True)
+    except Exception as e:
+        return _predict_error_response("预测接口", e)
+
+
+def _read_prediction_input(request, view):
+    """读取并校验单条预测参数（3个核心参数），返回 (age, acc_cost, trans_cost)"""
+    age_str = request.POST.get('traveler_age')
+    acc_cost_str = request.POST.get('accommodation_cost')
+    trans_cost_str = request.POST.get('transportation_cost')
+
+    # 异常2-4：参数缺失/格式错误/取值无效（与批量接口共用校验规则）
+    with span(view, 'validate'):
+        return validate_prediction_input(age_str, acc_cost_str, trans_cost_str)
+
+
+def _predict_single(age, acc_cost, trans_cost, view):
+    """单条预测：获取模型、预测并生成响应数据（同步/异步接口共用）"""
+    if _coalesce_enabled():
+        # 模型缺失时在本线程中等待冷启动训练，再与其他并发请求合并为一批预测（在合并器的后台线程中执行）
+        with span(view, 'model_load'):
+            _get_model()
+        with span(view, 'predict'):
+            return _prediction_result(prediction_batcher.predict([age, acc_cost, trans_cost]))
+
+    with span(view, 'model_load'):
+        model, intervals = _get_model()
+
+    # 预测计算 + 结果解读（与批量接口共用计算逻辑）
+    input_data = np.array([[age, acc_cost, trans_cost]])
+    with span(view, 'predict'):
+        pred, lower, upper, analysis = predict_durations(model, intervals, input_data)
+    return _prediction_result(
+        (float(pred[0]), float(lower[0]), float(upper[0]), str(analysis[0]), intervals.confidence))
+
+
+def _prediction_result(result):
+    """(预测值, 区间下限, 区间上限, 结果解读, 置信度) 转换为接口响应数据"""
+    pred_duration, lower_bound, upper_bound, analysis, confidence = result
+    return {
+        "status": "success",
+        "pred_duration": pred_duration,
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "analysis": analysis,
+        # 区间的校准覆盖率（如 "95%"）；未校准的旧模型（±MAE区间）为null
+        "confidence": confidence
+    }
+
+
+# 3.3 预测接口（异步版本，ASGI部署使用）
+# 参数校验在事件循环中完成（无效请求不占用线程池），模型加载与预测在有界线程池中执行，线程池已满时返回429
+@csrf_exempt
+async def predict_api_async(request):
+    """异步预测接口：请求与响应格式与 predict_api 一致"""
+    if request.method != 'POST':
+        logger.warning(f"预测接口（异步） - 非POST请求: {request.method}")
         return JsonResponse({
             "status": "error",
-            "message": str(e)
-        }, status=400)
+            "message": "仅支持POST请求"
+        }, status=405)
+
+    try:
+        age, acc_cost, trans_cost = _read_prediction_input(request, 'predict_api_async')
+        if _coalesce_enabled():
+            # 合并预测：等待结果期间不占用线程池；模型尚未加载时先在线程池中加载（或等待冷启动训练）
+            if not training_coordinator.registry.stats()['loaded']:
+                with span('predict_api_async', 'model_load'):
+                    await cpu_executor.run(_get_model)
+            with span('predict_api_async', 'predict'):
+                result = await prediction_batcher.apredict([age, acc_cost, trans_cost])
+            return JsonResponse(_prediction_result(result))
+        result = await cpu_executor.run(_predict_single, age, acc_cost, trans_cost, 'predict_api_async')
+        return JsonResponse(result)
     except Exception as e:
-        logger.error(f"预测接口 - 未知错误: {str(e)}", exc_info=True)
+        return _predict_error_response("预测接口（异步）", e)
+
+
+# 3.4 批量预测接口（JSON数组或CSV文件）
+@csrf_exempt
+def predict_batch_api(request):
+    """批量预测接口：整批数据一次向量化校验、一次模型预测，无效行单独返回错误信息"""
+    if request.method != 'POST':
+        logger.warning(f"批量预测接口 - 非POST请求: {request.method}")
         return JsonResponse({
             "status": "error",
-            "message": "预测服务异常，请联系管理员"
-        }, status=500)
+            "message": "仅支持POST请求"
+        }, status=405)
+
+    try:
+        # 1. 解析批量数据并校验行数
+        with span('predict_batch_api', 'parse'):
+            frame, malformed = _read_prediction_batch(request)
+        max_rows = getattr(settings, 'PREDICTION_BATCH_MAX_ROWS', 10000)
+        if not len(frame):
+            raise ValueError("批量预测数据为空")
+        if len(frame) > max_rows:
+            raise ValueError(f"单次批量预测最多{max_rows}条，当前{len(frame)}条")
+
+        # 2. 向量化校验（规则与单条预测接口一致）
+        with span('predict_batch_api', 'validate'):
+            features, errors, valid = validate_prediction_batch(frame, malformed)
+
+        # 3. 对全部有效行执行一次预测
+        results = [None] * len(frame)
+        confidence = None
+        for index, message in zip(np.flatnonzero(~valid).tolist(), errors[~valid].tolist()):
+            results[index] = {"index": index, "status": "error", "message": message}
+        if valid.any():
+            with span('predict_batch_api', 'model_load'):
+                model, intervals = _get_model()
+            confidence = intervals.confidence
+            with span('predict_batch_api', 'predict'):
+                pred, lower, upper, analysis = predict_durations(model, intervals, features[valid])
+            rows = zip(np.flatnonzero(valid).tolist(), pred.tolist(), lower.tolist(), upper.tolist(), analysis.tolist())
+            for index, pred_duration, lower_bound, upper_bound, text in rows:
+                results[index] = {
+                    "index": index,
+                    "status": "success",
+                    "pred_duration": pred_duration,
+                    "lower_bound": lower_bound,
+                    "upper_bound": upper_bound,
+                    "analysis": text,
+                }
+
+        # 4. 返回逐行结果
+        success_count = int(valid.sum())
+        with span('predict_batch_api', 'serialize'):
+            return JsonResponse({
+                "status": "success",
+                "total": len(results),
+                "success_count": success_count,
+                "error_count": len(results) - success_count,
+                "confidence": confidence,
+                "results": results
+            })
+
+    except Exception as e:
+        return _predict_error_response("批量预测接口", e)
+
+
+def _read_prediction_batch(request):
+    """
+    读取批量预测数据：上传的CSV文件（字段file），或JSON数组/{"rows": [...]}
+    :return: (frame, malformed)：malformed为格式错误的行掩码（CSV文件为None）
+    """
+    upload = request.FILES.get('file')
+    if upload is not None:
+        try:
+            return pd.read_csv(upload, dtype=str, keep_default_na=False), None
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError):
+            raise ValueError("CSV文件格式错误，无法解析")
+
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("请求体必须为JSON数组，或以file字段上传CSV文件")
+    if isinstance(payload, dict):
+        payload = payload.get('rows')
+    if not isinstance(payload, list):
+        raise ValueError("请求体必须为JSON数组，或以file字段上传CSV文件")
+
+    # 每行可以是对象（按字段名）或 [age, acc_cost, trans_cost] 数组，其他行单独返回格式错误
+    malformed = np.array([
+        not isinstance(row, dict) and not (isinstance(row, list) and len(row) == len(FEATURE_FIELDS))
+        for row in payload
+    ], dtype=bool)
+    if not all(isinstance(row, dict) for row in payload):
+        payload = [
+            row if isinstance(row, dict)
+            else dict(zip(FEATURE_FIELDS, row)) if not bad
+            else {}
+            for row, bad in zip(payload, malformed)
+        ]
+    return pd.DataFrame(payload, index=range(len(payload))), malformed
+
+
+def _predict_error_response(view_name, e):
+    """预测接口统一异常响应"""
+    if isinstance(e, ExecutorBusy):
+        return _busy_response(view_name, e)
+    if isinstance(e, TrainingInProgress):
+        logger.warning(f"{view_name} - 模型训练中: {str(e)}")
+        response = JsonResponse({"status": "error", "message": str(e)}, status=503)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+    if isinstance(e, PredictionTimeout):
+        logger.warning(f"{view_name} - 合并预测超时: {str(e)}")
+        response = JsonResponse({"status": "error", "message": str(e)}, status=503)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+    if isinstance(e, ValueError):
+        logger.error(f"{view_name} - 数值错误: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    if isinstance(e, FileNotFoundError):
+        logger.error(f"{view_name} - 文件缺失: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": str(e)}, status=404)
+    if isinstance(e, PermissionError):
+        logger.error(f"{view_name} - 权限不足: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": str(e)}, status=403)
+    if isinstance(e, KeyError):
+        logger.error(f"{view_name} - 列缺失: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    logger.error(f"{view_name} - 未知错误: {str(e)}", exc_info=True)
+    return JsonResponse({"status": "error", "message": "预测服务异常，请联系管理员"}, status=500)
 
 
 # ---------------------- 4. 旅行费用计算器视图 ----------------------
+# 4.1 费用计算器页面（单个方案，表单提交）
 def cost_calculator(request):
     """费用计算器视图：根据时长/日均住宿/总交通计算旅行费用"""
     try:
         if request.method == 'POST':
-            # 1. 获取输入参数
-            duration_str = request.POST.get('duration')
-            acc_cost_per_day_str = request.POST.get('acc_cost')
-            trans_cost_total_str = request.POST.get('trans_cost')
-
-            # 异常1：参数缺失
-            if not all([duration_str, acc_cost_per_day_str, trans_cost_total_str]):
-                raise ValueError("缺失必要参数：旅行时长/日均住宿费用/总交通费用")
-
-            # 异常2：参数类型转换失败
-            try:
-                duration = float(duration_str)
-                acc_cost_per_day = float(acc_cost_per_day_str)
-                trans_cost_total = float(trans_cost_total_str)
-            except ValueError:
-                raise ValueError("参数格式错误：所有参数必须为数字")
-
-            # 异常3：参数值无效
-            if duration <= 0 or duration > 365:
-                raise ValueError("旅行时长必须为0-365之间的正数")
-            if acc_cost_per_day < 0 or trans_cost_total < 0:
-                raise ValueError("住宿/交通费用不能为负数")
+            # 1. 获取并校验输入参数（规则与费用方案批量接口一致）
+            duration, acc_cost_per_day, trans_cost_total = validate_cost_input(
+                request.POST.get('duration'),
+                request.POST.get('acc_cost'),
+                request.POST.get('trans_cost'),
+            )
 
             # 2. 计算费用
             total_acc_cost = acc_cost_per_day * duration  # 总住宿费用
@@ -375,15 +487,7 @@ def cost_calculator(request):
             trans_ratio = (trans_cost_total / total_cost) * 100 if total_cost != 0 else 0
 
             # 4. 优化建议
-            suggestion = ""
-            if acc_ratio > 60:
-                suggestion = "住宿费用占比过高（>60%），建议选择性价比更高的住宿（如民宿、青旅），可降低10-20%成本"
-            elif trans_ratio > 50:
-                suggestion = "交通费用占比过高（>50%），建议提前预订机票/火车票，或选择更经济的交通方式（如高铁替代飞机）"
-            elif daily_cost < 200:
-                suggestion = "日均预算较低（<200元），建议提前规划行程，避免临时消费超支"
-            else:
-                suggestion = "费用分配合理，符合中等旅行预算水平，可按此计划出行"
+            suggestion = SUGGESTIONS[suggestion_code(acc_ratio, trans_ratio, daily_cost)]
 
             # 5. 返回结果
             context = {
@@ -397,10 +501,12 @@ def cost_calculator(request):
                 "acc_cost": acc_cost_per_day,
                 "trans_cost": trans_cost_total
             }
-            return render(request, 'cost_calculator.html', context)
+            with span('cost_calculator', 'render'):
+                return render(request, 'cost_calculator.html', context)
 
         # GET请求：展示计算器页面
-        return render(request, 'cost_calculator.html')
+        with span('cost_calculator', 'render'):
+            return render(request, 'cost_calculator.html')
 
     # 细分异常处理
     except ValueError as e:
@@ -408,4 +514,180 @@ def cost_calculator(request):
         return render(request, 'cost_calculator.html', {"error": str(e)}, status=400)
     except Exception as e:
         logger.error(f"费用计算器 - 未知错误: {str(e)}", exc_info=True)
-        return render(request, 'cost_calculator.html', {"error": "费用计算异常，请联系管理员"}, status=500)
\ No newline at end of file
+        return render(request, 'cost_calculator.html', {"error": "费用计算异常，请联系管理员"}, status=500)
+
+
+# 4.2 费用方案批量接口（方案网格、JSON数组或CSV文件，结果流式返回）
+@csrf_exempt
+def cost_scenarios_api(request):
+    """费用方案批量接口：整批方案一次向量化校验与计算，结果按块流式返回（JSON或CSV），无效行单独返回错误信息"""
+    if request.method != 'POST':
+        logger.warning(f"费用方案接口 - 非POST请求: {request.method}")
+        return JsonResponse({
+            "status": "error",
+            "message": "仅支持POST请求"
+        }, status=405)
+
+    try:
+        output = _cost_output_format(request)
+
+        # 1. 解析方案数据（网格在展开前检查行数）
+        max_rows = getattr(settings, 'COST_SCENARIO_MAX_ROWS', 100000)
+        with span('cost_scenarios_api', 'parse'):
+            frame, malformed = _read_cost_scenarios(request, max_rows)
+        if not len(frame):
+            raise ValueError("费用方案数据为空")
+        if len(frame) > max_rows:
+            raise ValueError(f"单次最多计算{max_rows}个费用方案，当前{len(frame)}个")
+
+        # 2. 向量化校验（规则与费用计算器一致）与计算
+        with span('cost_scenarios_api', 'validate'):
+            values, errors, valid = validate_cost_batch(frame, malformed)
+        with span('cost_scenarios_api', 'compute'), np.errstate(divide='ignore', invalid='ignore'):
+            # 无效行的计算结果不会输出
+            results = compute_costs(values)
+
+    except ValueError as e:
+        logger.error(f"费用方案接口 - 数值错误: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"费用方案接口 - 未知错误: {str(e)}", exc_info=True)
+        return JsonResponse({"status": "error", "message": "费用计算异常，请联系管理员"}, status=500)
+
+    # 3. 按块序列化并流式返回
+    chunk_rows = getattr(settings, 'COST_SCENARIO_CHUNK_ROWS', 1000)
+    if output == 'csv':
+        response = StreamingHttpResponse(_stream_cost_csv(values, errors, valid, results, chunk_rows),
+                                         content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="cost_scenarios.csv"'
+        return response
+    return StreamingHttpResponse(_stream_cost_json(values, errors, valid, results, chunk_rows),
+                                 content_type='application/json')
+
+
+def _cost_output_format(request):
+    """输出格式：?format=json|csv，未指定时按Accept请求头（text/csv）判断，默认JSON"""
+    output = request.GET.get('format')
+    if output is None:
+        return 'csv' if 'text/csv' in request.headers.get('Accept', '') else 'json'
+    if output not in ('json', 'csv'):
+        raise ValueError("format参数只能为json或csv")
+    return output
+
+
+def _read_cost_scenarios(request, max_rows):
+    """
+    读取费用方案：上传的CSV文件（字段file），JSON数组/{"rows": [...]}，
+    或方案网格 {"grid": {"duration": [...] 或 {"start", "stop", "step"}, "acc_cost": [...], "trans_cost": [...]}}
+    :return: (frame, malformed)：malformed为格式错误的行掩码（CSV文件与方案网格为None）
+    """
+    upload = request.FILES.get('file')
+    if upload is not None:
+        try:
+            return pd.read_csv(upload, dtype=str, keep_default_na=False), None
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError):
+            raise ValueError("CSV文件格式错误，无法解析")
+
+    message = "请求体必须为JSON数组、{\"grid\": {...}} 方案网格，或以file字段上传CSV文件"
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(message)
+    if isinstance(payload, dict) and 'grid' in payload:
+        grid = payload['grid']
+        if not isinstance(grid, dict):
+            raise ValueError(message)
+        size = grid_size(grid, max_rows)
+        if size > max_rows:
+            raise ValueError(f"单次最多计算{max_rows}个费用方案，方案网格展开后为{size}个")
+        return expand_grid(grid), None
+    if isinstance(payload, dict):
+        payload = payload.get('rows')
+    if not isinstance(payload, list):
+        raise ValueError(message)
+
+    # 每行可以是对象（按字段名）或 [duration, acc_cost, trans_cost] 数组，其他行单独返回格式错误
+    malformed = np.array([
+        not isinstance(row, dict) and not (isinstance(row, list) and len(row) == len(COST_FIELDS))
+        for row in payload
+    ], dtype=bool)
+    if not all(isinstance(row, dict) for row in payload):
+        payload = [
+            row if isinstance(row, dict)
+            else dict(zip(COST_FIELDS, row)) if not bad
+            else {}
+            for row, bad in zip(payload, malformed)
+        ]
+    return pd.DataFrame(payload, index=range(len(payload))), malformed
+
+
+def _cost_chunks(values, errors, valid, results, chunk_rows):
+    """按块生成逐行结果 [(index, 是否有效, 错误信息, 输入, 计算结果)]，每块只把当前块的数组转换为Python对象"""
+    fields = ['total_cost', 'daily_cost', 'acc_ratio', 'trans_ratio', 'suggestion_code']
+    for start in range(0, len(values), chunk_rows):
+        end = min(start + chunk_rows, len(values))
+        with span('cost_scenarios_api', 'serialize'):
+            columns = [results[field][start:end].tolist() for field in fields]
+            rows = zip(range(start, end), valid[start:end].tolist(), errors[start:end].tolist(),
+                       values[start:end].tolist(), zip(*columns))
+            yield list(rows)
+
+
+def _stream_cost_json(values, errors, valid, results, chunk_rows):
+    """
+    流式输出JSON：结构与批量预测接口一致（status/total/success_count/error_count/results），
+    建议内容只在 suggestions（代码 -> 内容）中出现一次，每行只返回建议代码
+    """
+    success_count = int(valid.sum())
+    yield ('{"status": "success", "total": %d, "success_count": %d, "error_count": %d, "suggestions": %s, "results": ['
+           % (len(values), success_count, len(values) - success_count, json.dumps(SUGGESTIONS)))
+    separator = ''
+    for rows in _cost_chunks(values, errors, valid, results, chunk_rows):
+        items = []
+        for index, is_valid, message, (duration, acc_cost, trans_cost), computed in rows:
+            if not is_valid:
+                items.append({"index": index, "status": "error", "message": message})
+                continue
+            total_cost, daily_cost, acc_ratio, trans_ratio, code = computed
+            items.append({
+                "index": index,
+                "status": "success",
+                "duration": duration,
+                "acc_cost": acc_cost,
+                "trans_cost": trans_cost,
+                "total_cost": total_cost,
+                "daily_cost": daily_cost,
+                "acc_ratio": acc_ratio,
+                "trans_ratio": trans_ratio,
+                "suggestion_code": code,
+            })
+        # 整块一次序列化，去掉首尾的方括号后拼接到results数组中
+        yield separator + json.dumps(items)[1:-1]
+        separator = ', '
+    yield ']}'
+
+
+def _stream_cost_csv(values, errors, valid, results, chunk_rows):
+    """流式输出CSV：每行一个方案，无效行只填写index/status/message"""
+    header = ['index', 'status', *COST_FIELDS, 'total_cost', 'daily_cost', 'acc_ratio', 'trans_ratio',
+              'suggestion_code', 'suggestion', 'message']
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for rows in _cost_chunks(values, errors, valid, results, chunk_rows):
+        for index, is_valid, message, inputs, computed in rows:
+            if is_valid:
+                writer.writerow([index, 'success', *inputs, *computed, SUGGESTIONS[computed[-1]], ''])
+            else:
+                writer.writerow([index, 'error'] + [''] * (len(header) - 3) + [message])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+# ---------------------- 5. 监控指标接口 ----------------------
+def metrics(request):
+    """Prometheus指标接口：请求/各阶段耗时直方图、缓存命中率、模型版本"""
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        return HttpResponse("指标接口未启用", status=404, content_type='text/plain; charset=utf-8')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')